@@ -0,0 +1,130 @@
+"""/question throughput: sync (threadpool) handler vs async handler, against a local stub LLM.
+
+    python -m benchmarks.bench_async_llm [--concurrency 50 100 250 500] [--duration 10]
+
+Starts three local processes: the stub chat-completions server, the real app
+(async endpoints) and a baseline app with the old plain-`def` handler, then
+drives each app with N concurrent clients for --duration seconds.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+STUB_PORT, ASYNC_PORT, SYNC_PORT = 8900, 8901, 8902
+
+
+def create_sync_app():
+    """The /question handler as it was before the async client (uvicorn --factory target)."""
+    from fastapi import FastAPI
+    from src.models.llm_socratic import generate_llm_question
+    from src.models.socratic_engine import generate_question, get_rich_context
+    from src.server.main import QuestionRequest
+    from src.utils.kg.kg_snapshot import load_kg
+
+    graph = load_kg(filename="batch_situations.yaml")
+    app = FastAPI()
+
+    @app.post("/question")
+    def get_question(req: QuestionRequest):
+        related_knowledge = get_rich_context(req.position, req.game_state, graph)
+        static_questions = generate_question(req.position, req.game_state, graph)
+        llm_question = generate_llm_question(req.position, req.game_state, related_knowledge)
+        return {"related_knowledge": related_knowledge, "questions": static_questions, "llm_question": llm_question}
+
+    return app
+
+
+def start_server(target, port, env, factory=False):
+    cmd = [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"]
+    if factory:
+        cmd.append("--factory")
+    return subprocess.Popen(cmd, env=env)
+
+
+def wait_until_up(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def drive(base_url, payload, concurrency, duration):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                try:
+                    (await client.post("/question", json=payload)).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--stub-latency-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1",
+        "OPENAI_MAX_CONCURRENCY": str(max(args.concurrency)),
+        "STUB_LATENCY_MS": str(args.stub_latency_ms),
+    }
+    procs = [
+        start_server("benchmarks.stub_openai:app", STUB_PORT, env),
+        start_server("src.server.main:app", ASYNC_PORT, env),
+        start_server("benchmarks.bench_async_llm:create_sync_app", SYNC_PORT, env, factory=True),
+    ]
+    try:
+        for port in (STUB_PORT, ASYNC_PORT, SYNC_PORT):
+            wait_until_up(f"http://127.0.0.1:{port}/docs")
+        payload = httpx.get(f"http://127.0.0.1:{ASYNC_PORT}/random-situation").json()
+
+        print(f"stub latency {args.stub_latency_ms:.0f} ms, {args.duration:.0f}s per run")
+        print(f"{'handler':>8} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for concurrency in args.concurrency:
+            for name, port in (("sync", SYNC_PORT), ("async", ASYNC_PORT)):
+                rps, latencies, errors = asyncio.run(
+                    drive(f"http://127.0.0.1:{port}", payload, concurrency, args.duration))
+                print(f"{name:>8} {concurrency:>8} {rps:8.1f} {percentile(latencies, 50) * 1000:8.0f} "
+                      f"{percentile(latencies, 99) * 1000:8.0f} {errors:>7}")
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
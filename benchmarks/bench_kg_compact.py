@@ -0,0 +1,93 @@
+"""Memory and query cost of the CompactKG against the networkx DiGraph it replaces.
+
+    python -m benchmarks.bench_kg_compact [--max-edges 1000000] [--calls 500]
+
+Memory is what a fresh process holds after unpickling each representation (so names and
+attribute strings are counted once, as after a load), measured with tracemalloc and
+scaled to a million edges. The networkx column counts the graph alone, the next one adds
+the AdjacencyIndex the server also keeps (the CompactKG is its own index). The shared
+situation index and sampler are left out of both.
+"""
+import argparse
+import gc
+import logging
+import pickle
+import random
+import time
+import tracemalloc
+
+import networkx as nx
+
+from benchmarks.bench_kg_index import EDGES_PER_SITUATION, time_per_call
+from benchmarks.synthetic import make_situations
+from src.models.socratic_engine import generate_question, get_related_knowledge
+from src.utils.kg.kg_compact import CompactKG
+from src.utils.kg.kg_index import ADJACENCY_INDEX_KEY, AdjacencyIndex
+from src.utils.kg.kg_loader import build_kg_from_situations
+
+
+def unpickled_bytes(obj, touch=None) -> int:
+    """Bytes allocated by unpickling obj (and by touch(copy), e.g. to build lazy indexes)."""
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    gc.collect()
+    tracemalloc.start()
+    copy = pickle.loads(data)
+    if touch is not None:
+        touch(copy)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copy
+    return size
+
+
+def bare_graph(G):
+    """G without the lookup indexes stored in G.graph."""
+    H = nx.DiGraph()
+    H.add_nodes_from(G.nodes(data=True))
+    H.add_edges_from(G.edges(data=True))
+    return H
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-edges", type=int, default=10**6)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    # Keep the file logger out of the measurement
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    print(f"{'edges':>10} {'nx MB/M':>8} {'nx+idx MB/M':>12} {'compact MB/M':>13} {'ratio':>6} "
+          f"{'convert s':>10} {'gen_q nx µs':>12} {'gen_q cpt µs':>13} {'related nx µs':>14} {'related cpt µs':>15}")
+    target = 10**4
+    while target <= args.max_edges:
+        graph = build_kg_from_situations(make_situations(int(target / EDGES_PER_SITUATION)))
+        edges = graph.number_of_edges()
+        start = time.perf_counter()
+        compact = CompactKG.from_networkx(graph)
+        convert = time.perf_counter() - start
+
+        bare = bare_graph(graph)
+        nx_bytes = unpickled_bytes(bare)
+        index_bytes = unpickled_bytes(graph.graph[ADJACENCY_INDEX_KEY]) if ADJACENCY_INDEX_KEY in graph.graph \
+            else unpickled_bytes(AdjacencyIndex.from_graph(graph))
+        del bare
+        compact_bytes = unpickled_bytes(CompactKG(compact.names, compact.strings, compact.predicates, compact.csr,
+                                                  compact._node_attrs), touch=lambda kg: kg.node_id(""))
+
+        rng = random.Random(0)
+        pairs = rng.choices(list(graph.graph["situation_index"]), k=args.calls)
+        compact.node_id("")  # build the name lookup before timing
+        per_million = 1e6 / edges / 2**20
+        print(f"{edges:>10} {nx_bytes * per_million:8.0f} {(nx_bytes + index_bytes) * per_million:12.0f} "
+              f"{compact_bytes * per_million:13.0f} {(nx_bytes + index_bytes) / compact_bytes:6.1f} {convert:10.2f} "
+              f"{time_per_call(generate_question, graph, pairs):12.1f} "
+              f"{time_per_call(generate_question, compact, pairs):13.1f} "
+              f"{time_per_call(get_related_knowledge, graph, pairs[:50]):14.1f} "
+              f"{time_per_call(get_related_knowledge, compact, pairs[:50]):15.1f}")
+        del graph, compact
+        target *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-call cost of generate_question / get_related_knowledge as the KG grows.
+
+    python -m benchmarks.bench_kg_index [--max-edges 1000000] [--scan-max-edges 100000]
+
+Compares the predicate-partitioned adjacency index against the previous
+full-graph edge scan (only run up to --scan-max-edges since it is O(E)).
+get_related_knowledge returns every edge of the position node, so its cost
+follows that node's degree (which grows with the number of game states) rather
+than the total edge count.
+"""
+import argparse
+import logging
+import random
+import time
+
+from benchmarks.synthetic import make_situations
+from src.models.socratic_engine import generate_question, get_related_knowledge
+from src.utils.kg.kg_loader import build_kg_from_situations
+
+EDGES_PER_SITUATION = 4.5
+
+
+def scan_generate_question(position, game_state, graph):
+    """The pre-index implementation: one pass over every edge in the graph."""
+    questions = []
+    for u, v, d in graph.edges(data=True):
+        pred = d.get("predicate")
+        if u == position and pred == "hasResponsibilityIn" and v == game_state:
+            questions.append(f"As a {position}, what is your responsibility in {game_state}?")
+        if u == game_state and pred == "triggers":
+            questions.append(f"When it’s {game_state}, and the play is '{v}', what should the {position} do?")
+        if pred == "isNotRecommended" and v == game_state:
+            questions.append(f"Why might '{u}' not be the best option in {v}?")
+        if u == position and pred == "covers":
+            questions.append(f"Why does the {position} cover {v} in this situation?")
+        if pred == "requiresUnderstandingOf":
+            if u == position:
+                questions.append(f"What does the {position} need to understand about '{v}'?")
+            elif u == game_state:
+                questions.append(f"What do you need to understand about '{v}' in the context of {game_state}?")
+    return questions
+
+
+def scan_get_related_knowledge(position, game_state, graph):
+    facts = []
+    for u, v, d in graph.edges(data=True):
+        if u in [position, game_state] or v in [position, game_state]:
+            facts.append(f"{u} --[{d.get('predicate')}]--> {v}")
+    return "; ".join(facts)
+
+
+def time_per_call(fn, graph, pairs):
+    start = time.perf_counter()
+    for position, game_state in pairs:
+        fn(position, game_state, graph)
+    return (time.perf_counter() - start) / len(pairs) * 1e6  # µs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-edges", type=int, default=10**6)
+    parser.add_argument("--scan-max-edges", type=int, default=10**5)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    # Keep the file logger out of the measurement
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    print(f"{'edges':>10} {'gen_q idx µs':>13} {'related idx µs':>15} {'gen_q scan µs':>14} {'related scan µs':>16}")
+    target = 10**3
+    while target <= args.max_edges:
+        graph = build_kg_from_situations(make_situations(int(target / EDGES_PER_SITUATION)))
+        rng = random.Random(0)
+        pairs = rng.choices(list(graph.graph["situation_index"]), k=args.calls)
+
+        gen_idx = time_per_call(generate_question, graph, pairs)
+        rel_idx = time_per_call(get_related_knowledge, graph, pairs)
+        if target <= args.scan_max_edges:
+            scan_pairs = pairs[:max(1, args.calls // 10)]
+            gen_scan = f"{time_per_call(scan_generate_question, graph, scan_pairs):14.1f}"
+            rel_scan = f"{time_per_call(scan_get_related_knowledge, graph, scan_pairs):16.1f}"
+        else:
+            gen_scan, rel_scan = f"{'-':>14}", f"{'-':>16}"
+        print(f"{graph.number_of_edges():>10} {gen_idx:13.1f} {rel_idx:15.1f} {gen_scan} {rel_scan}")
+        target *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Time and peak memory of building the KG: whole-file yaml.load vs streaming YAML/JSONL ingestion.
+
+    python -m benchmarks.bench_kg_ingest [--max-situations 100000] [--workers 1]
+
+"retained MB" is what the finished graph holds; "overhead MB" is the peak above that,
+i.e. what the loader needed on top of the graph itself.
+"""
+import argparse
+import logging
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+from benchmarks.synthetic import make_situations, write_situations
+from src.utils.kg.kg_ingest import YAML_LOADER
+from src.utils.kg.kg_loader import build_kg_from_situations, load_kg_from_file
+
+
+def load_whole_yaml(path):
+    with open(path) as f:
+        return build_kg_from_situations(yaml.load(f, Loader=YAML_LOADER))
+
+
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    graph = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del graph
+    return seconds, retained / 1e6, (peak - retained) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-situations", type=int, default=10**5)
+    parser.add_argument("--workers", type=int, default=1, help="process-pool size for streaming ingestion")
+    args = parser.parse_args()
+
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    print(f"{'situations':>10} {'loader':>14} {'seconds':>8} {'retained MB':>12} {'overhead MB':>12}")
+    n = 10**3
+    with tempfile.TemporaryDirectory() as tmp:
+        while n <= args.max_situations:
+            situations = make_situations(n)
+            yaml_path = Path(tmp) / f"synthetic_{n}.yaml"
+            jsonl_path = Path(tmp) / f"synthetic_{n}.jsonl"
+            write_situations(situations, yaml_path)
+            write_situations(situations, jsonl_path)
+            del situations
+
+            loaders = [
+                ("yaml.load", lambda: load_whole_yaml(yaml_path)),
+                ("stream yaml", lambda: load_kg_from_file(yaml_path, workers=args.workers)),
+                ("stream jsonl", lambda: load_kg_from_file(jsonl_path, workers=args.workers)),
+            ]
+            for name, fn in loaders:
+                seconds, retained, overhead = measure(fn)
+                print(f"{n:>10} {name:>14} {seconds:8.2f} {retained:12.1f} {overhead:12.1f}")
+            n *= 10
+
+
+if __name__ == "__main__":
+    main()
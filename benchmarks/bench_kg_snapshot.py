@@ -0,0 +1,59 @@
+"""Cold-load time of the KG: YAML (pure-Python and libyaml loaders) vs compiled snapshot.
+
+    python -m benchmarks.bench_kg_snapshot [--max-situations 100000]
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from benchmarks.synthetic import make_situations
+from src.utils.kg.kg_loader import build_kg_from_situations
+from src.utils.kg.kg_snapshot import load_kg, snapshot_path_for
+
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def load_pure_yaml(path):
+    with open(path) as f:
+        return build_kg_from_situations(yaml.load(f, Loader=yaml.SafeLoader))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-situations", type=int, default=10**5)
+    args = parser.parse_args()
+
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    print(f"{'situations':>10} {'yaml MB':>8} {'pure yaml s':>12} {'libyaml s':>10} {'snapshot s':>11} {'snap MB':>8}")
+    n = 10**3
+    with tempfile.TemporaryDirectory() as tmp:
+        while n <= args.max_situations:
+            path = Path(tmp) / f"synthetic_{n}.yaml"
+            with open(path, "w") as f:
+                yaml.dump(make_situations(n), f, Dumper=YAML_DUMPER, sort_keys=False)
+
+            pure = timed(lambda: load_pure_yaml(path))
+            # First load_kg call parses with libyaml and writes the snapshot; the second reads it back
+            c_yaml = timed(lambda: load_kg(path, use_snapshot=False))
+            load_kg(path)
+            snap = timed(lambda: load_kg(path))
+
+            yaml_mb = path.stat().st_size / 1e6
+            snap_mb = snapshot_path_for(path).stat().st_size / 1e6
+            print(f"{n:>10} {yaml_mb:8.1f} {pure:12.2f} {c_yaml:10.2f} {snap:11.2f} {snap_mb:8.1f}")
+            n *= 10
+
+
+if __name__ == "__main__":
+    main()
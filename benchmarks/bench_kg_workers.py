@@ -0,0 +1,131 @@
+"""Per-worker memory and startup time of N server workers, each holding the KG.
+
+    python -m benchmarks.bench_kg_workers [--situations 20000] [--workers 1 4 16]
+
+Starts N worker processes at once, as `uvicorn --workers N` would, for each way of
+holding the KG: the networkx graph loaded from its snapshot, the CompactKG built from
+it, and the shared file mapped read-only (published once beforehand, as
+`python -m src.utils.kg.kg_shared` does before the server starts). Each worker loads
+the KG, answers a few hundred question lookups and reports its memory while all N
+are alive, from /proc/self/smaps_rollup:
+
+- PSS counts shared pages split between the processes mapping them, so N × PSS is
+  what the workers cost together.
+- USS is the memory only that worker holds.
+
+Both are reported above a worker that only imports the server modules. "start s" is
+the time from spawning to ready, with N workers competing for the CPUs.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import make_situations, write_situations
+from src.models.socratic_engine import generate_question, get_rich_context
+from src.utils.kg.kg_compact import CompactKG
+from src.utils.kg.kg_index import get_situation_index, get_situation_questions
+from src.utils.kg.kg_shared import ensure_published, open_kg_file
+from src.utils.kg.kg_snapshot import load_kg
+
+MODES = ("import only", "networkx", "compact", "shared")
+
+
+def memory_kb() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[key] = int(value.split()[0])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def load(mode, source, shared_dir):
+    if mode == "networkx":
+        return load_kg(source)
+    if mode == "compact":
+        return CompactKG.from_networkx(load_kg(source))
+    return open_kg_file(Path(shared_dir) / ensure_published(source, shared_dir)["file"])
+
+
+def worker(mode, source, shared_dir, queries):
+    """Load the KG, run some lookups, report, then stay alive until stdin closes."""
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+    start = time.perf_counter()
+    if mode != "import only":
+        kg = load(mode, source, shared_dir)
+        load_seconds = time.perf_counter() - start
+        rng = random.Random(os.getpid())
+        precomputed = get_situation_questions(kg)
+        for key in rng.choices(list(get_situation_index(kg)), k=queries):
+            questions = precomputed.get(key) if precomputed is not None else None
+            if questions is None:
+                generate_question(*key, kg)
+            get_rich_context(*key, kg)
+    else:
+        load_seconds = 0.0
+    print(json.dumps({"load_seconds": load_seconds, **memory_kb()}), flush=True)
+    sys.stdin.read()
+
+
+def run_workers(n, mode, source, shared_dir, queries) -> dict:
+    command = [sys.executable, "-m", "benchmarks.bench_kg_workers", "--worker", mode,
+               "--source", str(source), "--shared-dir", str(shared_dir), "--queries", str(queries)]
+    start = time.perf_counter()
+    procs = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(n)]
+    reports = [json.loads(p.stdout.readline()) for p in procs]  # all N are alive from here on
+    ready = time.perf_counter() - start
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+    mean = lambda key: sum(r[key] for r in reports) / n  # noqa: E731
+    return {"start": ready, "load": mean("load_seconds"), "rss": mean("rss"), "pss": mean("pss"), "uss": mean("uss")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--situations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    parser.add_argument("--shared-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.source, args.shared_dir, args.queries)
+
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_situations(make_situations(args.situations), Path(tmp) / "situations.yaml")
+        shared_dir = Path(tmp) / "shared"
+        graph = load_kg(source)  # writes the snapshot the networkx and compact workers load
+        start = time.perf_counter()
+        pointer = ensure_published(source, shared_dir)
+        size = (shared_dir / pointer["file"]).stat().st_size
+        print(f"{args.situations} situations, {graph.number_of_edges()} edges; shared file "
+              f"{size / 2**20:.1f} MB, published in {time.perf_counter() - start:.1f}s")
+        open_kg_file(shared_dir / pointer["file"])
+        del graph
+
+        print(f"{'workers':>7} {'mode':>9} {'start s':>8} {'load s':>7} {'RSS MB':>7} {'PSS MB':>7} "
+              f"{'USS MB':>7} {'N×PSS MB':>9}")
+        for n in args.workers:
+            base = run_workers(n, "import only", source, shared_dir, args.queries)
+            for mode in MODES[1:]:
+                r = run_workers(n, mode, source, shared_dir, args.queries)
+                over = {key: (r[key] - base[key]) / 1024 for key in ("rss", "pss", "uss")}
+                print(f"{n:>7} {mode:>9} {r['start']:8.2f} {r['load']:7.2f} {over['rss']:7.1f} "
+                      f"{over['pss']:7.1f} {over['uss']:7.1f} {n * over['pss']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Calibrate the local answer grader and report its bypass rate and latency.
+
+    python -m benchmarks.bench_local_grader [--target-precision 0.99]
+
+Labelled examples are derived from the real situation corpus:
+  correct    the recommended play, reworded (case/punctuation, ordinals,
+             filler words, a typo)
+  incorrect  another situation's play, only the first half of the play,
+             the play negated, contradicted ("... instead of ..."), hedged
+             with other targets, or its words shuffled
+The threshold is the lowest score at which local [CORRECT] calls reach the
+target precision; the bypass rate is the share of correct answers that would
+then skip the LLM. Latency is compared with difflib-based evaluate_answer.
+"""
+import argparse
+import logging
+import random
+import time
+
+from src.models.evaluate_answers import LocalGrader, calibrate_threshold, evaluate_answer
+from src.utils.kg.kg_index import get_situation_index
+from src.utils.kg.kg_snapshot import load_kg
+
+ORDINAL_WORDS = {"1st": "first", "2nd": "second", "3rd": "third"}
+
+
+def typo(text, rng):
+    words = text.split()
+    i = rng.randrange(len(words))
+    w = words[i]
+    if len(w) > 3:
+        j = rng.randrange(len(w) - 1)
+        words[i] = w[:j] + w[j + 1] + w[j] + w[j + 2:]
+    return " ".join(words)
+
+
+def positives(action, rng):
+    words_ordinals = " ".join(ORDINAL_WORDS.get(w, w) for w in action.split())
+    return [
+        action,
+        action.lower().rstrip(".") + "!",
+        words_ordinals,
+        "I would " + action.lower().replace("the ", ""),
+        typo(action, rng),
+    ]
+
+
+def negatives(action, other_action, rng):
+    words = action.split()
+    shuffled = words[:]
+    rng.shuffle(shuffled)
+    return [
+        other_action,
+        " ".join(words[:max(1, len(words) // 2)]),
+        "Don't " + action.lower(),
+        f"{other_action} instead of {action.lower()}",
+        f"{action}, or maybe {other_action.lower()}",
+        " ".join(shuffled),
+    ]
+
+
+def build_examples(situations, seed=0):
+    rng = random.Random(seed)
+    examples = []
+    for s in situations:
+        actions = list(s.recommended_actions)
+        action = " and ".join(actions)
+        others = [o for o in situations if o.recommended_actions != s.recommended_actions]
+        other_action = " and ".join(rng.choice(others).recommended_actions)
+        examples += [(a, actions, True) for a in positives(action, rng)]
+        examples += [(a, actions, False) for a in negatives(action, other_action, rng)]
+    return examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-precision", type=float, default=0.99)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    graph = load_kg()
+    situations = list(get_situation_index(graph).values())
+    grader = LocalGrader.from_graph(graph)
+    examples = build_examples(situations)
+
+    threshold = calibrate_threshold(grader, examples, args.target_precision)
+    grader.threshold = threshold
+    results = [(grader.grade(a, actions)["is_correct"], label) for a, actions, label in examples]
+    true_pos = sum(1 for local, label in results if local and label)
+    false_pos = sum(1 for local, label in results if local and not label)
+    n_pos = sum(1 for _, label in results if label)
+    print(f"examples: {len(examples)} ({n_pos} correct), calibrated threshold: {threshold:.3f}")
+    print(f"bypass rate on correct answers: {true_pos / n_pos:.1%}, "
+          f"on all answers: {(true_pos + false_pos) / len(results):.1%}, false [CORRECT]: {false_pos}")
+
+    actions = list(situations[0].recommended_actions)
+    for label, answer in (("short", "catch it and throw to first"),
+                          ("long", " ".join(["I think I should catch the ball and throw it to first base"] * 10))):
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            grader.grade(answer, actions)
+        local_us = (time.perf_counter() - start) / args.calls * 1e6
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            evaluate_answer(answer, actions)
+        difflib_us = (time.perf_counter() - start) / args.calls * 1e6
+        print(f"{label:>5} answer ({len(answer)} chars): local {local_us:.1f} µs, difflib {difflib_us:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
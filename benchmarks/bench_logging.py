@@ -0,0 +1,111 @@
+"""Per-request logging overhead: synchronous DEBUG FileHandler with f-strings vs queued JSON with lazy %-args.
+
+    python -m benchmarks.bench_logging [--requests 20000]
+
+Each "request" makes the log calls a /question + /evaluate_answer round used to make
+(including the DEBUG dump of the evaluation prompt), timed on the calling thread.
+"""
+import argparse
+import logging
+import logging.handlers
+import queue
+import tempfile
+import time
+from pathlib import Path
+
+from src.utils.logging.logging import DeferredQueueHandler, JsonFormatter, RequestIdFilter
+
+PROMPT = "The player is a Shortstop. The situation is: 1 out, runner on 1st. " * 15
+PAYLOAD = {"position": "Shortstop", "game_state": "1 out, runner on 1st", "player_answer": "throw to second",
+           "recommended_actions": ["Field the ball", "Throw to 2nd base"], "concepts": ["Double play"]}
+
+
+def old_request(logger, i):
+    logger.info(f"Received question request for player: position: {PAYLOAD['position']}, game_state: {PAYLOAD['game_state']}")
+    logger.info("Generating questions based on the position and game state using rules...")
+    logger.info(f"Generated {4} questions.")
+    logger.info("Questions generated successfully.")
+    logger.info("Generating LLM question (async)...")
+    logger.info(f"[OpenAI] Tokens used - Prompt: {97}, Completion: {14}, Total: {111}")
+    logger.info("LLM question generated successfully.")
+    logger.info("Question generation completed successfully.")
+    logger.info("Evaluating answer with LLM (async)...")
+    logger.debug(f"LLM Evaluation User prompt: {PROMPT} {PAYLOAD}")
+    logger.info(f"[OpenAI] Tokens used - Prompt: {310}, Completion: {60}, Total: {370}")
+    logger.info("LLM evaluation completed successfully.")
+    logger.info("Answer evaluation completed successfully.")
+
+
+def new_request(logger, i):
+    logger.info("Received question request for position: %s, game_state: %s", PAYLOAD["position"], PAYLOAD["game_state"])
+    logger.debug("Generating questions based on the position and game state using rules...")
+    logger.debug("Generated %d questions.", 4)
+    logger.info("Generating LLM question (async)...")
+    logger.info("[OpenAI] Tokens used - Prompt: %d, Completion: %d, Total: %d", 97, 14, 111)
+    logger.info("LLM question generated successfully.")
+    logger.debug("Question generation completed successfully.")
+    logger.info("Evaluating answer with LLM (async)...")
+    logger.debug("LLM Evaluation User prompt: %s %s", PROMPT, PAYLOAD)
+    logger.info("[OpenAI] Tokens used - Prompt: %d, Completion: %d, Total: %d", 310, 60, 370)
+    logger.info("LLM evaluation completed successfully.")
+    logger.debug("Answer evaluation completed successfully.")
+
+
+def old_logger(path):
+    logger = logging.getLogger("bench.old")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s"))
+    logger.addHandler(handler)
+    return logger, handler.close
+
+
+def new_logger(path, level):
+    logger = logging.getLogger(f"bench.new.{level}")
+    logger.propagate = False
+    logger.setLevel(level)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+
+    def close():
+        listener.stop()
+        handler.close()
+    return logger, close
+
+
+def run(request, logger, close, n):
+    start = time.perf_counter()
+    for i in range(n):
+        request(logger, i)
+    caller = time.perf_counter() - start
+    close()  # waits for a queue listener to drain
+    total = time.perf_counter() - start
+    return caller / n * 1e6, total / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'setup':>36} {'µs/request (caller)':>20} {'µs/request (incl. drain)':>25}")
+    with tempfile.TemporaryDirectory() as tmp:
+        setups = [
+            ("before: FileHandler DEBUG, f-strings", old_request, old_logger(Path(tmp) / "old.log")),
+            ("after: queue JSON INFO, %-args", new_request, new_logger(Path(tmp) / "new_info.log", "INFO")),
+            ("after: queue JSON DEBUG, %-args", new_request, new_logger(Path(tmp) / "new_debug.log", "DEBUG")),
+        ]
+        for name, request, (logger, close) in setups:
+            caller, total = run(request, logger, close, args.requests)
+            print(f"{name:>36} {caller:20.1f} {total:25.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-answer write cost vs history length: whole-file JSON rewrite vs the SQLite player store.
+
+    python -m benchmarks.bench_player_store [--answers 200]
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from src.utils.players.player_store import PlayerStore
+
+CONCEPTS = ["Force out", "Tag out", "Double play", "Cutoff throw", "Backing up"]
+
+
+def json_answer(path, player, i):
+    """What player_tracker used to do per answer: append, then rewrite the whole file."""
+    player["history"].append({"timestamp": "2025-01-01T00:00:00", "game_state": f"state {i}",
+                              "position": "Shortstop", "concepts": CONCEPTS[:2]})
+    for concept in CONCEPTS[:2]:
+        if concept not in player["mastered_concepts"]:
+            player["mastered_concepts"].append(concept)
+    with open(path, "w") as f:
+        json.dump(player, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=int, default=200, help="answers timed at each history length")
+    args = parser.parse_args()
+
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    print(f"{'history':>8} {'json µs/answer':>15} {'store µs/answer':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for history in (100, 1_000, 10_000, 100_000):
+            entries = [{"timestamp": "2025-01-01T00:00:00", "game_state": f"state {i}", "position": "Shortstop",
+                        "concepts": CONCEPTS[:2]} for i in range(history)]
+            player = {"name": "p", "history": entries, "mastered_concepts": list(CONCEPTS[:2]),
+                      "struggled_concepts": [], "last_active": None}
+
+            path = Path(tmp) / f"p_{history}.json"
+            start = time.perf_counter()
+            for i in range(args.answers):
+                json_answer(path, player, i)
+            json_us = (time.perf_counter() - start) / args.answers * 1e6
+
+            store = PlayerStore(Path(tmp) / f"players_{history}.sqlite", flush_interval=3600)
+            store.import_player({**player, "history": entries})
+            start = time.perf_counter()
+            for i in range(args.answers):
+                store.log_concepts("p", f"state {i}", "Shortstop", CONCEPTS[:2])
+            store.flush()  # include the commit in the cost
+            store_us = (time.perf_counter() - start) / args.answers * 1e6
+            store.close()
+
+            print(f"{history:>8} {json_us:15.0f} {store_us:16.0f}")
+
+
+if __name__ == "__main__":
+    main()
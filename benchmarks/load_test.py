@@ -0,0 +1,224 @@
+"""End-to-end load test: simulated players play full games against the app, backed by the stub LLM.
+
+    python -m benchmarks.load_test [--players 1 10 50 100] [--duration 60] [--innings 9]
+    python -m benchmarks.load_test --app-url http://localhost:8001 ...   # drive an app that is already running
+
+Each player plays like src/client/app.py: the first play comes from /next-play/stream, later
+ones from /next-play (the client prefetches them), and every answer goes to
+/evaluate_answer/stream, with the play's session_id, until it is correct or the player has
+3 strikes. Three strikes make an out, three outs end an inning, and a game is --innings
+innings. A player knows the recommended action with probability --accuracy (graded
+locally); other answers go to the stub LLM, which calls them incorrect with probability
+--stub-incorrect-rate.
+
+Reports throughput, p50/p95/p99 latency per endpoint and the error rate at each player
+count. Streamed endpoints are timed until their `done` event.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_async_llm import percentile, start_server, wait_until_up
+
+STUB_PORT, APP_PORT = 8900, 8911
+WRONG_ANSWERS = ["I'd just hold the ball", "Run to the dugout", "Throw it to the crowd", "Not sure, wait?"]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.games = 0
+        self.plays = 0
+
+    def ok(self, endpoint, seconds):
+        self.latencies[endpoint].append(seconds)
+
+    def error(self, endpoint):
+        self.errors[endpoint] += 1
+
+
+async def read_sse(client, path, payload):
+    """POST to a streaming endpoint and return the `done` data (raises on an `error` event)."""
+    event = None
+    async with client.stream("POST", path, json=payload) as res:
+        res.raise_for_status()
+        async for line in res.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                if event == "done":
+                    return json.loads(line[len("data: "):])
+                if event == "error":
+                    raise RuntimeError(json.loads(line[len("data: "):]).get("detail", "stream failed"))
+    raise RuntimeError(f"{path} ended without a result")
+
+
+async def timed(rec, endpoint, call):
+    start = time.perf_counter()
+    try:
+        result = await call
+    except (httpx.HTTPError, RuntimeError, ValueError):
+        rec.error(endpoint)
+        return None
+    rec.ok(endpoint, time.perf_counter() - start)
+    return result
+
+
+async def next_play(client, rec, first, game_id):
+    if first:
+        return await timed(rec, "/next-play/stream",
+                           read_sse(client, f"/next-play/stream?game_id={game_id}", {}))
+
+    async def fetch():
+        res = await client.post("/next-play", params={"game_id": game_id})
+        res.raise_for_status()
+        return res.json()
+    return await timed(rec, "/next-play", fetch())
+
+
+async def play_game(client, rec, rng, args, stop_at):
+    """Play one game; returns False if the run ended before the game did."""
+    innings, outs, first = 1, 0, True
+    game_id = f"{rng.getrandbits(64):016x}"
+    while innings <= args.innings:
+        if time.perf_counter() >= stop_at:
+            return False
+        data = await next_play(client, rec, first, game_id)
+        if data is None:
+            continue
+        first = False
+        recommended = [a["action"] for a in data["related_knowledge"]["recommended_actions"]]
+        strikes = 0
+        while True:
+            if time.perf_counter() >= stop_at:
+                return False
+            if args.think_seconds:
+                await asyncio.sleep(rng.expovariate(1 / args.think_seconds))
+            knows = recommended and rng.random() < args.accuracy
+            answer = rng.choice(recommended) if knows else rng.choice(WRONG_ANSWERS)
+            payload = {"session_id": data["session_id"], "player_answer": answer}
+            result = await timed(rec, "/evaluate_answer/stream",
+                                 read_sse(client, "/evaluate_answer/stream", payload))
+            if result is None:
+                break  # the player sees an error and moves on to the next play
+            if result["evaluation"] == "correct":
+                break
+            strikes += 1
+            if strikes >= 3:
+                outs += 1
+                break
+        rec.plays += 1
+        if outs >= 3:
+            outs, innings = 0, innings + 1
+    rec.games += 1
+    return True
+
+
+async def run_level(base_url, players, args):
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=players, max_keepalive_connections=players)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        stop_at = time.perf_counter() + args.duration
+
+        async def player(i):
+            rng = random.Random(i)
+            while await play_game(client, rec, rng, args, stop_at):
+                pass
+
+        start = time.perf_counter()
+        await asyncio.gather(*(player(i) for i in range(players)))
+        elapsed = time.perf_counter() - start
+
+    requests = sum(len(v) for v in rec.latencies.values()) + sum(rec.errors.values())
+    return {
+        "players": players,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "plays_per_second": rec.plays / elapsed,
+        "games_completed": rec.games,
+        "error_rate": sum(rec.errors.values()) / max(1, requests),
+        "endpoints": {
+            endpoint: {
+                "count": len(rec.latencies[endpoint]),
+                "errors": rec.errors[endpoint],
+                "p50_ms": percentile(rec.latencies[endpoint], 50) * 1000,
+                "p95_ms": percentile(rec.latencies[endpoint], 95) * 1000,
+                "p99_ms": percentile(rec.latencies[endpoint], 99) * 1000,
+            }
+            for endpoint in sorted(rec.latencies.keys() | rec.errors.keys())
+        },
+    }
+
+
+def print_level(r):
+    print(f"\n{r['players']} players: {r['requests_per_second']:.1f} req/s, {r['plays_per_second']:.1f} plays/s, "
+          f"{r['games_completed']} games completed, error rate {r['error_rate']:.2%}")
+    print(f"{'endpoint':>24} {'count':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, e in r["endpoints"].items():
+        print(f"{endpoint:>24} {e['count']:>7} {e['errors']:>7} {e['p50_ms']:8.0f} {e['p95_ms']:8.0f} {e['p99_ms']:8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--duration", type=float, default=60, help="seconds per player count")
+    parser.add_argument("--innings", type=int, default=9)
+    parser.add_argument("--accuracy", type=float, default=0.3, help="chance a player gives the recommended action")
+    parser.add_argument("--think-seconds", type=float, default=0, help="mean pause before each answer")
+    parser.add_argument("--app-url", help="drive this app instead of starting the app and the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=300)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--stub-incorrect-rate", type=float, default=0.9)
+    parser.add_argument("--out", type=Path, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    procs = []
+    base_url = args.app_url
+    if base_url is None:
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1",
+            "OPENAI_MAX_CONCURRENCY": str(max(64, max(args.players))),
+            "STUB_LATENCY_MS": str(args.stub_latency_ms),
+            "STUB_LATENCY_JITTER_MS": str(args.stub_latency_ms / 2),
+            "STUB_ERROR_RATE": str(args.stub_error_rate),
+            "STUB_RATE_LIMIT_RATE": str(args.stub_rate_limit_rate),
+            "STUB_INCORRECT_RATE": str(args.stub_incorrect_rate),
+        }
+        procs = [start_server("benchmarks.stub_openai:app", STUB_PORT, env),
+                 start_server("src.server.main:app", APP_PORT, env)]
+        base_url = f"http://127.0.0.1:{APP_PORT}"
+    try:
+        if procs:
+            wait_until_up(f"http://127.0.0.1:{STUB_PORT}/docs")
+        wait_until_up(f"{base_url}/health")
+
+        results = []
+        for players in args.players:
+            result = asyncio.run(run_level(base_url, players, args))
+            results.append(result)
+            print_level(result)
+        if procs:
+            print(f"\nstub: {httpx.get(f'http://127.0.0.1:{STUB_PORT}/stub/stats').json()}")
+        if args.out:
+            args.out.write_text(json.dumps({"args": vars(args) | {"out": str(args.out)}, "results": results},
+                                           indent=2))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
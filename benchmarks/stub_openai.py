@@ -0,0 +1,129 @@
+"""Local stand-in for the OpenAI chat-completions API, for benchmarks and load tests.
+
+    STUB_LATENCY_MS=300 uvicorn benchmarks.stub_openai:app --port 8900
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1 (any OPENAI_API_KEY works).
+STUB_ERROR_RATE and STUB_RATE_LIMIT_RATE make that fraction of calls fail with a 500 or a
+429; STUB_INCORRECT_RATE tags that fraction of replies [INCORRECT] instead of [CORRECT], so
+simulated players can strike out. GET /stub/stats counts what was served.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "300"))  # time to first token
+STUB_LATENCY_JITTER_MS = float(os.getenv("STUB_LATENCY_JITTER_MS", "0"))  # +/- uniform around the latency
+STUB_TOKEN_DELAY_MS = float(os.getenv("STUB_TOKEN_DELAY_MS", "20"))  # between streamed tokens
+STUB_REPLY = os.getenv(
+    "STUB_REPLY",
+    "Nice thinking! Where would you throw the ball to get the lead runner? [CORRECT]",
+)
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+STUB_RATE_LIMIT_RATE = float(os.getenv("STUB_RATE_LIMIT_RATE", "0"))
+STUB_INCORRECT_RATE = float(os.getenv("STUB_INCORRECT_RATE", "0"))
+
+app = FastAPI()
+stats = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0, "incorrect": 0}
+
+
+def latency_seconds():
+    jitter = random.uniform(-STUB_LATENCY_JITTER_MS, STUB_LATENCY_JITTER_MS) if STUB_LATENCY_JITTER_MS else 0
+    return max(0.0, STUB_LATENCY_MS + jitter) / 1000
+
+
+def pick_reply():
+    if STUB_INCORRECT_RATE and random.random() < STUB_INCORRECT_RATE:
+        stats["incorrect"] += 1
+        return STUB_REPLY.replace("[CORRECT]", "[INCORRECT]")
+    return STUB_REPLY
+
+
+def injected_error():
+    """A 429 or 500 response for the configured fraction of calls, else None."""
+    roll = random.random()
+    if roll < STUB_RATE_LIMIT_RATE:
+        stats["rate_limited"] += 1
+        return JSONResponse({"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                            status_code=429, headers={"Retry-After": "0"})
+    if roll < STUB_RATE_LIMIT_RATE + STUB_ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Internal error (stub)", "type": "server_error"}},
+                            status_code=500)
+    return None
+
+
+def completion_body(model, content, prompt_tokens):
+    completion_tokens = len(content.split())
+    return {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def chunk_body(chunk_id, model, delta=None, finish_reason=None, usage=None):
+    return {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage else [{"index": 0, "delta": delta or {}, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+async def stream_completion(model, content, prompt_tokens, include_usage):
+    chunk_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+    await asyncio.sleep(latency_seconds())
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(STUB_TOKEN_DELAY_MS / 1000)
+        piece = word if i == 0 else " " + word
+        yield f"data: {json.dumps(chunk_body(chunk_id, model, {'content': piece}))}\n\n"
+    yield f"data: {json.dumps(chunk_body(chunk_id, model, finish_reason='stop'))}\n\n"
+    if include_usage:
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        yield f"data: {json.dumps(chunk_body(chunk_id, model, usage=usage))}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    stats["requests"] += 1
+    error = injected_error()
+    if error is not None:
+        return error
+    body = await request.json()
+    model = body.get("model", "stub")
+    prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+    if body.get("stream"):
+        stats["streamed"] += 1
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(stream_completion(model, pick_reply(), prompt_tokens, include_usage),
+                                 media_type="text/event-stream")
+    await asyncio.sleep(latency_seconds())
+    return completion_body(model, pick_reply(), prompt_tokens)
+
+
+@app.get("/stub/stats")
+def stub_stats():
+    return stats
@@ -0,0 +1,200 @@
+"""Scaling suite for the KG hot paths: load time, graph memory and per-call cost vs corpus size.
+
+    python -m benchmarks.suite [--sizes 100,1000,10000,100000] [--out benchmarks/results] [--compare old.json]
+
+For each size a synthetic JSONL corpus is written and loaded with load_kg_from_file, then
+get_rich_context, generate_question, get_related_knowledge and get_random_situation are
+timed on random situations. "slope" is the log-log growth of each timing across the sizes
+(0 = constant, 1 = linear). Results go to <out>/<utc>_<commit>.json; --compare prints the
+ratio against an earlier file and exits 1 if any timing got slower than --threshold or any
+slope grew by more than --slope-threshold. Absolute timings only compare on the same machine
+(and vary by 20-40% run to run on a shared VM); slopes travel better.
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.synthetic import make_situations, write_situations
+from src.models.socratic_engine import generate_question, get_related_knowledge, get_rich_context
+from src.utils.kg.kg_loader import load_kg_from_file
+from src.utils.kg.kg_questiongen import get_random_situation
+
+DEFAULT_OUT = Path(__file__).resolve().parent / "results"
+
+CALLS = {
+    "get_rich_context": lambda graph, pos, gs: get_rich_context(pos, gs, graph),
+    "generate_question": lambda graph, pos, gs: generate_question(pos, gs, graph),
+    "get_related_knowledge": lambda graph, pos, gs: get_related_knowledge(pos, gs, graph),
+    "get_random_situation": lambda graph, pos, gs: get_random_situation(graph),
+}
+
+
+def time_calls(fn, graph, pairs, budget_seconds, round_seconds=0.01):
+    """Per-call µs: median and mean over rounds of ~round_seconds each (fast calls are
+    timed in batches so timer overhead and noise don't dominate), within a time budget."""
+    start = time.perf_counter()
+    for pos, gs in pairs[:20]:  # warm-up
+        fn(graph, pos, gs)
+    single = (time.perf_counter() - start) / min(20, len(pairs))
+    batch = max(1, min(100, int(round_seconds / max(single, 1e-9))))
+
+    per_call, calls = [], 0
+    deadline = time.perf_counter() + budget_seconds
+    gc.disable()
+    try:
+        for i in range(0, len(pairs), batch):
+            chunk = pairs[i:i + batch]
+            start = time.perf_counter()
+            for pos, gs in chunk:
+                fn(graph, pos, gs)
+            end = time.perf_counter()
+            per_call.append((end - start) / len(chunk) * 1e6)
+            calls += len(chunk)
+            if end > deadline:
+                break
+    finally:
+        gc.enable()
+    return {"p50_us": statistics.median(per_call), "mean_us": statistics.fmean(per_call), "calls": calls}
+
+
+def bench_size(n, args, tmp):
+    path = write_situations(make_situations(n, n_positions=args.positions, n_concepts=args.concepts),
+                            Path(tmp) / f"synthetic_{n}.jsonl")
+
+    start = time.perf_counter()
+    load_kg_from_file(path)
+    load_seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    graph = load_kg_from_file(path)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    random.seed(0)
+    pairs = rng.choices(list(graph.graph["situation_index"]), k=args.calls)
+    result = {
+        "situations": n,
+        "nodes": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "file_mb": path.stat().st_size / 1e6,
+        "load_seconds": load_seconds,
+        "graph_mb": retained / 1e6,
+        "load_peak_mb": peak / 1e6,
+        "calls": {name: time_calls(fn, graph, pairs, args.budget) for name, fn in CALLS.items()},
+    }
+    path.unlink()
+    return result
+
+
+def slopes(results):
+    """Log-log slope of each timing between the smallest and largest size."""
+    if len(results) < 2:
+        return {}
+    first, last = results[0], results[-1]
+    span = math.log(last["situations"] / first["situations"])
+    out = {"load_seconds": math.log(last["load_seconds"] / first["load_seconds"]) / span}
+    for name in CALLS:
+        out[name] = math.log(last["calls"][name]["p50_us"] / first["calls"][name]["p50_us"]) / span
+    return out
+
+
+def timings(report):
+    """Flatten a report to {(situations, metric): value} for comparison."""
+    flat = {}
+    for r in report["results"]:
+        flat[(r["situations"], "load_seconds")] = r["load_seconds"]
+        for name, t in r["calls"].items():
+            flat[(r["situations"], name)] = t["p50_us"]
+    return flat
+
+
+def compare(old, new, threshold, slope_threshold):
+    """Print new/old ratios and slope changes; return the metrics that regressed."""
+    old_t, new_t = timings(old), timings(new)
+    regressions = []
+    print(f"\nvs {old['commit']} ({old['created']}):")
+    for key in sorted(new_t.keys() & old_t.keys()):
+        ratio = new_t[key] / old_t[key] if old_t[key] else float("inf")
+        flag = "  <-- slower" if ratio > threshold else ""
+        print(f"{key[0]:>10} {key[1]:>22} {ratio:7.2f}x{flag}")
+        if flag:
+            regressions.append(key)
+    for name in sorted(new["slopes"].keys() & old["slopes"].keys()):
+        change = new["slopes"][name] - old["slopes"][name]
+        flag = "  <-- scales worse" if change > slope_threshold else ""
+        print(f"{'slope':>10} {name:>22} {old['slopes'][name]:5.2f} -> {new['slopes'][name]:5.2f}{flag}")
+        if flag:
+            regressions.append(("slope", name))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000",
+                        help="comma-separated situation counts (up to 1000000)")
+    parser.add_argument("--positions", type=int, default=9)
+    parser.add_argument("--concepts", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=2000, help="calls timed per function and size")
+    parser.add_argument("--budget", type=float, default=5.0, help="max seconds per function and size")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio that counts as a regression")
+    parser.add_argument("--slope-threshold", type=float, default=0.3, help="slope increase that counts as a regression")
+    args = parser.parse_args()
+
+    logging.getLogger("socratic_coach").setLevel(logging.WARNING)
+
+    results = []
+    print(f"{'situations':>10} {'edges':>9} {'load s':>7} {'graph MB':>9} "
+          + " ".join(f"{name + ' µs':>24}" for name in CALLS))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(s) for s in args.sizes.split(",")):
+            r = bench_size(n, args, tmp)
+            results.append(r)
+            print(f"{n:>10} {r['edges']:>9} {r['load_seconds']:7.2f} {r['graph_mb']:9.1f} "
+                  + " ".join(f"{r['calls'][name]['p50_us']:24.1f}" for name in CALLS))
+
+    report = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"positions": args.positions, "concepts": args.concepts, "calls": args.calls},
+        "results": results,
+        "slopes": slopes(results),
+    }
+    print("slopes: " + ", ".join(f"{name} {s:.2f}" for name, s in report["slopes"].items()))
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    out_path = args.out / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{report['commit']}.json"
+    out_path.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out_path}")
+
+    if args.compare:
+        if compare(json.loads(args.compare.read_text()), report, args.threshold, args.slope_threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Synthetic situation corpora for benchmarking the KG hot paths.
+
+    python -m benchmarks.synthetic 100000 /tmp/syn_100k.jsonl [--positions 9] [--game-states N] [--concepts 10]
+
+Writes YAML or JSONL depending on the file suffix; the files load with load_kg_from_file.
+"""
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+import yaml
+
+POSITIONS = [
+    "Pitcher", "Catcher", "First Base", "Second Base", "Third Base",
+    "Shortstop", "Left Field", "Center Field", "Right Field",
+]
+RUNNERS = [
+    "bases empty", "runner on 1st", "runner on 2nd", "runner on 3rd",
+    "runners on 1st and 2nd", "runners on 1st and 3rd", "runners on 2nd and 3rd", "bases loaded",
+]
+OUTS = ["0 outs", "1 out", "2 outs"]
+BASE_GAME_STATES = [f"{o}, {r}" for o in OUTS for r in RUNNERS]
+PLAY_KINDS = ["Ground ball", "Line drive", "Fly ball", "Bunt", "Pop up", "Bloop single"]
+ACTIONS = [
+    "Field the ball cleanly", "Throw to 1st base", "Throw to 2nd base", "Throw to 3rd base",
+    "Throw home", "Hit the cutoff man", "Cover 2nd base", "Back up the throw",
+    "Tag the runner", "Step on the base", "Call for the ball", "Check the runner",
+]
+CONCEPTS = [
+    "Force out", "Tag out", "Double play", "Cutoff throw", "Backing up", "Lead runner",
+    "Tag up", "Infield fly", "Relay throw", "Communication",
+]
+
+
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def _names(base, n, variant="variant"):
+    """Return n distinct names: the real ones first, then numbered variants of them."""
+    names = list(base[:n])
+    i = len(names)
+    while len(names) < n:
+        names.append(f"{base[i % len(base)]} ({variant} {i // len(base)})")
+        i += 1
+    return names
+
+
+def game_states(n):
+    """Return n distinct game-state strings (the 24 real ones first, then numbered variants)."""
+    return _names(BASE_GAME_STATES, n)
+
+
+def make_situations(n, n_game_states=None, n_positions=len(POSITIONS), n_concepts=len(CONCEPTS), seed=0):
+    """Generate n situation records in the same shape as batch_situations.yaml.
+
+    Each situation gets its own play node, so the edge count grows linearly with n
+    (about 4.5 edges per situation). By default the number of game states grows
+    with n too, keeping the degree of each game-state node roughly constant.
+    Positions and concepts stay at the real nine and ten unless asked otherwise.
+    """
+    rng = random.Random(seed)
+    states = game_states(n_game_states or max(len(BASE_GAME_STATES), n // 20))
+    positions = _names(POSITIONS, n_positions, "squad")
+    concepts = _names(CONCEPTS, n_concepts)
+    situations = []
+    for i in range(n):
+        position = rng.choice(positions)
+        situations.append({
+            "situation_id": f"syn_{i}",
+            "game_state": rng.choice(states),
+            "position": position,
+            "play": f"{rng.choice(PLAY_KINDS)} to {position} #{i}",
+            "recommended_actions": rng.sample(ACTIONS, rng.randint(1, 3)),
+            "key_concepts": rng.sample(concepts, rng.randint(1, min(2, len(concepts)))),
+            "explanation": f"Synthetic explanation for situation {i}.",
+        })
+    return situations
+
+
+def write_situations(situations, path):
+    """Write situations as JSONL (.jsonl/.ndjson) or YAML (anything else)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        if path.suffix in (".jsonl", ".ndjson"):
+            f.writelines(json.dumps(s) + "\n" for s in situations)
+        else:
+            yaml.dump(situations, f, Dumper=YAML_DUMPER, sort_keys=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic situation corpus (YAML or JSONL).")
+    parser.add_argument("situations", type=int)
+    parser.add_argument("path", help="output file; .jsonl writes JSON lines, anything else YAML")
+    parser.add_argument("--positions", type=int, default=len(POSITIONS))
+    parser.add_argument("--game-states", type=int, default=None, help="default: max(24, situations / 20)")
+    parser.add_argument("--concepts", type=int, default=len(CONCEPTS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    situations = make_situations(args.situations, n_game_states=args.game_states, n_positions=args.positions,
+                                 n_concepts=args.concepts, seed=args.seed)
+    path = write_situations(situations, args.path)
+    print(f"Wrote {len(situations)} situations to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
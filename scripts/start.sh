@@ -11,12 +11,14 @@ echo "🎯 Launching Streamlit on port $PORT..."
 streamlit run src/client/app.py --server.port $PORT --server.address 0.0.0.0 &
 
 echo "🚀 Starting FastAPI (port 8001)..."
+# Load the knowledge graph in the background; /ready flips once it is loaded
+export KG_BACKGROUND_LOAD=${KG_BACKGROUND_LOAD:-1}
 uvicorn src.server.main:app --host 0.0.0.0 --port=8001 &
 
 # Wait for FastAPI health check
 echo "⏳ Waiting for FastAPI to be ready..."
 for i in {1..240}; do
-  if curl -s http://localhost:8001/health > /dev/null; then
+  if curl -sf http://localhost:8001/ready > /dev/null; then
     echo "✅ FastAPI is up!"
     break
   else
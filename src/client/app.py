@@ -1,7 +1,10 @@
 import streamlit as st
 import sys
 import os
+import json
+import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Local imports
@@ -21,6 +24,64 @@ logger = setup_logger()
 load_dotenv()
 
 API_URL = "http://localhost:8001"
+PREFETCH_TIMEOUT = 60  # seconds; a hung prefetch is abandoned rather than waited on
+
+COACH_BUBBLE = (
+    "<div style='background-color:{color}; padding:10px; border-radius:10px; margin-bottom:{margin}px;'>"
+    "<b>🧠 Coach:</b> {text}</div>"
+)
+
+
+def get_http_session(name="http_session"):
+    """This user's keep-alive session to the API, kept across reruns.
+
+    requests.Session is not thread-safe, so each user gets their own, and the prefetch
+    thread uses a separate one (name="prefetch_http_session").
+    """
+    if name not in st.session_state:
+        st.session_state[name] = requests.Session()
+    return st.session_state[name]
+
+
+def get_prefetch_executor():
+    """This user's background thread for fetching the next play while they read the debrief.
+
+    Per user, so one user's prefetch never queues behind another's LLM call.
+    """
+    if "prefetch_executor" not in st.session_state:
+        st.session_state.prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="next-play")
+    return st.session_state.prefetch_executor
+
+
+def fetch_next_play(session, game_id):
+    """Situation, context and LLM question for a new play, in one request."""
+    res = session.post(f"{API_URL}/next-play", params={"game_id": game_id}, timeout=PREFETCH_TIMEOUT)
+    res.raise_for_status()
+    return res.json()
+
+
+def stream_coach_reply(path, payload, placeholder, color="#e8f0fe", margin=5):
+    """POST to a server-sent-events endpoint, render the coach's text as it streams in,
+    and return the data of the final `done` event."""
+    text = ""
+    with get_http_session().post(f"{API_URL}{path}", json=payload, stream=True) as res:
+        res.raise_for_status()
+        event = None
+        for line in res.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "token":
+                    text += data["text"]
+                    placeholder.markdown(COACH_BUBBLE.format(color=color, margin=margin, text=text + " ▌"),
+                                         unsafe_allow_html=True)
+                elif event == "done":
+                    return data
+                elif event == "error":
+                    raise RuntimeError(data.get("detail", "stream failed"))
+    raise RuntimeError(f"{path} ended without a result")
+
 
 # Initialize session state
 if "asked" not in st.session_state:
@@ -55,6 +116,8 @@ if "concepts" not in st.session_state:
     st.session_state.concepts = []
 if "concepts_all" not in st.session_state:
     st.session_state.concepts_all = set()
+if "game_id" not in st.session_state:
+    st.session_state.game_id = uuid.uuid4().hex  # the server avoids repeating a play within a game
 
 
 st.title("⚾ Socratic Sports Coach")
@@ -92,6 +155,8 @@ else:
         st.session_state.score = 0
         st.session_state.game_over = False
         st.session_state.strike_count = 0
+        st.session_state.game_id = uuid.uuid4().hex
+        st.session_state.pop("next_play", None)
         st.rerun()
 
 
@@ -103,25 +168,28 @@ else:
 if not st.session_state.asked:
     
     try:
-         # Randomly pick new (position, game_state) by calling FastAPI route
-        res = requests.get(f"{API_URL}/random-situation")
-        res.raise_for_status()
-        data = res.json()
+        # Use the play prefetched during the last debrief if it is ready, else ask the
+        # server to pick a random (position, game_state) and stream its Socratic question
+        data = None
+        game_id, prefetched = st.session_state.pop("next_play", (None, None))
+        if prefetched is not None and (game_id != st.session_state.game_id or not prefetched.done()):
+            prefetched.cancel()  # still running, or fetched for a game that has since ended
+        elif prefetched is not None:
+            try:
+                data = prefetched.result()
+            except Exception as e:
+                logger.warning("Prefetched play failed, fetching a new one: %s", e)
+        if data is None:
+            question_placeholder = st.empty()
+            data = stream_coach_reply(f"/next-play/stream?game_id={st.session_state.game_id}", {},
+                                      question_placeholder)
+            question_placeholder.empty()
         st.session_state.position = data["position"]
         st.session_state.game_state = data["game_state"]
 
-        # Get Socratic question from LLM for the given (position, game_state)
-        payload = {
-            #"player_name": player_name,
-            "position": st.session_state.position,
-            "game_state": st.session_state.game_state,
-        }
-        res = requests.post(f"{API_URL}/question", json=payload)
-        res.raise_for_status()
-        data = res.json()
-
         # Update session state
         st.session_state.asked = True
+        st.session_state.session_id = data["session_id"]
         st.session_state.llm_question = data["llm_question"]
         st.session_state.context = data["related_knowledge"]
         st.session_state.concepts = data["related_knowledge"].get("key_concepts", [])
@@ -148,7 +216,7 @@ if st.session_state.asked:
     # Show chat
     st.markdown("### 💬 Conversation")
     for i, turn in enumerate(st.session_state.conversation, 1):
-        logger.info(f"Turn {i}: {turn}")
+        logger.debug("Turn %d: %s", i, turn)
         if turn.get("question"):
             st.markdown(
                 f"<div style='background-color:#e8f0fe; padding:10px; border-radius:10px; margin-bottom:5px;'>"
@@ -170,47 +238,30 @@ if st.session_state.asked:
 
     # Get player answer and evaluate with API call  
     if not st.session_state.evaluation_done:
-        logger.info("Waiting for player answer...")
+        logger.debug("Waiting for player answer...")
         with st.form("answer_form", clear_on_submit=True):
             player_answer = st.text_input("Your answer:", key="player_answer_input")
             submitted = st.form_submit_button("Submit Answer")
 
             if submitted and not st.session_state.evaluation_done:
                 logger.info("Submit button clicked.")
-                logger.debug(f"Player answer: {player_answer}")
+                logger.debug("Player answer: %s", player_answer)
                 if not player_answer.strip():
                     logger.warning("Player answer is empty.")
                     st.warning("Please enter an answer.")
                 else:
                     try:
-                        # Compilet conversation history to feed to LLM
-                        conversation_history = ""
-                        for turn in st.session_state.conversation:
-                            if turn.get("question"):
-                                conversation_history += f"Coach: {turn['question']}\n"
-                            if turn.get("answer"):
-                                conversation_history += f"Player: {turn['answer']}\n"
-                            if turn.get("feedback"):
-                                conversation_history += f"Coach: {turn['feedback']}\n"
-
-                        # Build payload for LLM evaluation
+                        # The server keeps the play's context and the conversation in its session
                         payload = {
-                            #"player_name": player_name,
-                            "position": st.session_state.position,
-                            "game_state": st.session_state.game_state,
+                            "session_id": st.session_state.session_id,
                             "player_answer": player_answer,
-                            "recommended_actions": [a["action"] for a in st.session_state.context["recommended_actions"]],
-                            "explanation": st.session_state.context["explanation"],
-                            "conversation_history": conversation_history,
-                            "concepts": st.session_state.concepts
-                        }  
+                        }
 
-                        logger.debug(f"Payload for evaluation: {payload}")
+                        logger.debug("Payload for evaluation: %s", payload)
 
-                        response = requests.post(f"{API_URL}/evaluate_answer", json=payload)
-                        response.raise_for_status()
-                        result = response.json()
-                        logger.info(f"Evaluation result: {result}")
+                        result = stream_coach_reply("/evaluate_answer/stream", payload, st.empty(),
+                                                    color="#dcefe2", margin=15)
+                        logger.info("Evaluation result: %s", result.get("evaluation"))
 
                         # ⛏️ Store the answer and feedback in the conversation session variable (to be loaded into the chat)
                         st.session_state.conversation.append({
@@ -224,7 +275,7 @@ if st.session_state.asked:
                         # Strike handling
                         if result["evaluation"] != "correct":
                             st.session_state.strike_count += 1
-                            logger.info(f"Strike count: {st.session_state.strike_count}")
+                            logger.debug("Strike count: %d", st.session_state.strike_count)
                         
                         # End of question-answer handling
                         if result["evaluation"] == "correct":
@@ -232,20 +283,17 @@ if st.session_state.asked:
                             st.session_state.outcome = "correct"
                             st.session_state.evaluation_done = True
                             st.session_state.score += 1
-                            logger.info("Correct answer.")
-                            logger.info(f"Player answer is correct. Strike count: {st.session_state.strike_count}")
+                            logger.info("Player answer is correct. Strike count: %d", st.session_state.strike_count)
                         elif st.session_state.strike_count >= 3:
                             st.error("☠️ 3 strikes! Here's what you could have done:")
                             st.markdown(f"**Coach Explains:** {st.session_state.context['explanation']}")
                             st.session_state.evaluation_done = True
                             st.session_state.outcome = "3 strikes"
                             st.session_state.outs += 1
-                            logger.info("3 strikes reached.")
-                            logger.info(f"Player answer is incorrect, no more attempts. Strike count: {st.session_state.strike_count}")
+                            logger.info("Player answer is incorrect, no more attempts. Strike count: %d", st.session_state.strike_count)
                         else:
                             st.warning("Keep trying! You can do it!")
-                            logger.info("Incorrect answer, but keep trying.")
-                            logger.info(f"Player answer is incorrect, still more attempts. Strike count: {st.session_state.strike_count}")
+                            logger.info("Player answer is incorrect, still more attempts. Strike count: %d", st.session_state.strike_count)
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error evaluating answer: {e}")
@@ -271,6 +319,12 @@ if st.session_state.asked:
         st.session_state.logged_this_turn = True
 
     if st.session_state.evaluation_done:
+        # Fetch the next play in the background while the player reads the debrief
+        if "next_play" not in st.session_state:
+            game_id = st.session_state.game_id
+            st.session_state.next_play = (game_id, get_prefetch_executor().submit(
+                fetch_next_play, get_http_session("prefetch_http_session"), game_id))
+
         if st.button("Next Play"):
             # Reset session state for the next question
             st.session_state.asked = False
@@ -1,4 +1,13 @@
 import difflib
+import math
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
 
 def evaluate_answer(player_answer: str, recommended_actions: list[str]) -> dict:
     normalized_answer = player_answer.strip().lower()
@@ -17,3 +26,252 @@ def evaluate_answer(player_answer: str, recommended_actions: list[str]) -> dict:
         "score": best_score,
         "all_matches": matches
     }
+
+
+# --- Vectorized local grader -------------------------------------------------
+#
+# Grades an answer against all of a situation's recommended actions at once, so
+# /evaluate_answer can skip the GPT-4 call when the answer clearly is the play.
+# Each action is precomputed into hashed token and character-3-gram feature
+# arrays; grading an answer is one sorted lookup + np.bincount per feature type.
+# Coverage (how much of the play the answer mentions) is combined with precision
+# (how much of the answer is about the play) so extra or contradicting content,
+# or the right words in the wrong order, cost score.
+
+# Share of the coverage from (IDF-weighted) tokens; the rest is 3-gram coverage, which tolerates typos
+TOKEN_WEIGHT = 0.6
+# Shares of the precision from tokens and from token bigrams (word order); the rest from 3-grams
+PRECISION_TOKEN_WEIGHT = 0.4
+PRECISION_BIGRAM_WEIGHT = 0.3
+NGRAM_SIZE = 3
+DEFAULT_LOCAL_THRESHOLD = float(os.getenv("LOCAL_GRADER_THRESHOLD", "0.9"))
+
+ORDINALS = {"1st": "first", "2nd": "second", "3rd": "third"}
+STOPWORDS = {
+    "a", "an", "the", "to", "and", "of", "it", "i", "would", "will", "should", "then",
+    "in", "on", "at", "for", "is", "be", "my", "me", "you", "your", "so", "that", "this",
+    "i'd", "i'll", "i'm", "we", "we'd", "just", "it's", "he", "she", "they", "them",
+}
+NEGATIONS = {"not", "don't", "dont", "never", "no", "shouldn't", "wouldn't", "won't", "wont", "nothing"}
+# Where a play sends the ball or a player; an answer naming one the play doesn't is escalated
+TARGETS = {
+    "first", "second", "third", "home", "plate", "base", "bag", "dugout", "mound", "pitcher", "catcher",
+    "shortstop", "baseman", "outfield", "infield", "left", "center", "right", "cutoff", "relay", "backup",
+}
+
+
+def _tokens(text):
+    return [ORDINALS.get(w, w) for w in re.findall(r"[a-z0-9']+", text.lower())]
+
+
+def _content_tokens(tokens):
+    return [t for t in tokens if t not in STOPWORDS]
+
+
+def _ngrams(tokens):
+    joined = " ".join(tokens)
+    return {joined[i:i + NGRAM_SIZE] for i in range(len(joined) - NGRAM_SIZE + 1)}
+
+
+def _bigrams(tokens):
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def _hash_ids(features):
+    return np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32)
+
+
+def _feature_ids(features):
+    """Sorted hashed ids of a set of features."""
+    return np.sort(_hash_ids(features))
+
+
+def _isin_sorted(values, sorted_ids):
+    """np.isin for a sorted lookup array (much cheaper than np.isin on arrays this small)."""
+    if not len(sorted_ids):
+        return np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_ids, values), len(sorted_ids) - 1)
+    return sorted_ids[pos] == values
+
+
+class ActionMatcher:
+    """Precomputed feature arrays for one situation's recommended actions."""
+
+    def __init__(self, actions, idf, default_idf):
+        self.actions = list(actions)
+        tok_ids, tok_weights, tok_rows, gram_ids, gram_rows = [], [], [], [], []
+        bigrams = set()
+        for row, action in enumerate(self.actions):
+            tokens = sorted(set(_content_tokens(_tokens(action))))
+            tok_ids.extend(zlib.crc32(t.encode("utf-8")) for t in tokens)
+            tok_weights.extend(idf.get(t, default_idf) for t in tokens)
+            tok_rows.extend([row] * len(tokens))
+            grams = _ngrams(_content_tokens(_tokens(action)))
+            gram_ids.extend(zlib.crc32(g.encode("utf-8")) for g in grams)
+            gram_rows.extend([row] * len(grams))
+            bigrams |= _bigrams(_content_tokens(_tokens(action)))
+
+        n = len(self.actions)
+        self._tok_ids = np.array(tok_ids, dtype=np.uint32)
+        self._tok_weights = np.array(tok_weights, dtype=np.float64)
+        self._tok_rows = np.array(tok_rows, dtype=np.intp)
+        self._tok_totals = np.maximum(np.bincount(self._tok_rows, weights=self._tok_weights, minlength=n), 1e-9)
+        self._gram_ids = np.array(gram_ids, dtype=np.uint32)
+        self._gram_rows = np.array(gram_rows, dtype=np.intp)
+        self._gram_totals = np.maximum(np.bincount(self._gram_rows, minlength=n), 1)
+        # The whole play's vocabulary, for answer-side precision
+        self._vocab_tok = np.unique(self._tok_ids)
+        self._vocab_gram = np.unique(self._gram_ids)
+        self._vocab_bigram = _feature_ids(bigrams)
+        self.tokens = {t for action in self.actions for t in _tokens(action)}
+
+    def similarities(self, answer_tok_ids, answer_gram_ids) -> np.ndarray:
+        """How much of each action (0..1) the answer covers, for all actions at once."""
+        n = len(self.actions)
+        tok_hit = _isin_sorted(self._tok_ids, answer_tok_ids)
+        tok_cov = np.bincount(self._tok_rows[tok_hit], weights=self._tok_weights[tok_hit], minlength=n) / self._tok_totals
+        gram_hit = _isin_sorted(self._gram_ids, answer_gram_ids)
+        gram_cov = np.bincount(self._gram_rows[gram_hit], minlength=n) / self._gram_totals
+        return TOKEN_WEIGHT * tok_cov + (1 - TOKEN_WEIGHT) * gram_cov
+
+    def precision(self, tok_ids, tok_weights, gram_ids, bigram_ids) -> float:
+        """How much of the answer (0..1) is about the play: its features found in any of the actions."""
+        parts = []
+        for ids, vocab, weights in ((tok_ids, self._vocab_tok, tok_weights), (gram_ids, self._vocab_gram, None),
+                                    (bigram_ids, self._vocab_bigram, None)):
+            if not len(ids):
+                parts.append(1.0)  # e.g. a one-word answer has no bigrams to get wrong
+                continue
+            hit = _isin_sorted(ids, vocab)
+            parts.append(float(weights[hit].sum() / weights.sum()) if weights is not None else float(hit.mean()))
+        tok, gram, bigram = parts
+        return (PRECISION_TOKEN_WEIGHT * tok + PRECISION_BIGRAM_WEIGHT * bigram
+                + (1 - PRECISION_TOKEN_WEIGHT - PRECISION_BIGRAM_WEIGHT) * gram)
+
+
+class LocalGrader:
+    """Grades answers locally and says when the LLM is still needed.
+
+    The score is the F1 of the mean coverage over all recommended actions (an
+    answer has to cover the whole play, not just "catch the ball") and the
+    answer's precision against them (it shouldn't say much else, or say it out
+    of order). Answers with a negation ("don't throw home") or naming a base or
+    player the play doesn't ("throw to 2nd instead of 1st") are always escalated.
+    """
+
+    def __init__(self, idf=None, threshold=DEFAULT_LOCAL_THRESHOLD, max_matchers=4096):
+        self.idf = idf or {}
+        self.default_idf = max(self.idf.values(), default=1.0)
+        self.threshold = threshold
+        self.max_matchers = max_matchers
+        self._matchers = OrderedDict()  # tuple(actions) -> ActionMatcher (LRU)
+        self.stats = {"graded": 0, "local_correct": 0, "escalated": 0, "seconds": 0.0}
+
+    @classmethod
+    def from_actions(cls, action_lists, **kwargs):
+        """Fit token IDF weights on every situation's actions and precompute their matchers."""
+        action_lists = [tuple(actions) for actions in action_lists]
+        doc_freq = {}
+        for actions in action_lists:
+            for action in actions:
+                for t in set(_content_tokens(_tokens(action))):
+                    doc_freq[t] = doc_freq.get(t, 0) + 1
+        n_docs = max(1, sum(len(actions) for actions in action_lists))
+        idf = {t: math.log((1 + n_docs) / (1 + df)) + 1 for t, df in doc_freq.items()}
+
+        grader = cls(idf=idf, **kwargs)
+        for actions in action_lists[:grader.max_matchers]:
+            grader.matcher(actions)
+        return grader
+
+    @classmethod
+    def from_graph(cls, graph, **kwargs):
+        from src.utils.kg.kg_index import get_situation_index
+        situation_index = get_situation_index(graph) or {}
+        return cls.from_actions((s.recommended_actions for s in situation_index.values()), **kwargs)
+
+    def matcher(self, actions) -> ActionMatcher:
+        key = tuple(actions)
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = ActionMatcher(key, self.idf, self.default_idf)
+            self._matchers[key] = matcher
+            if len(self._matchers) > self.max_matchers:
+                self._matchers.popitem(last=False)
+        else:
+            self._matchers.move_to_end(key)
+        return matcher
+
+    def score(self, player_answer, recommended_actions):
+        """Return (score, per-action similarities, must_escalate) for an answer.
+
+        must_escalate is set for a negation or a target (base, player) the play doesn't name.
+        """
+        tokens = _tokens(player_answer)
+        content = _content_tokens(tokens)
+        unique = list(dict.fromkeys(content))
+        grams = _ngrams(content)
+        matcher = self.matcher(recommended_actions)
+        sims = matcher.similarities(_feature_ids(unique), _feature_ids(grams))
+        coverage = float(sims.mean()) if len(sims) else 0.0
+        precision = matcher.precision(
+            _hash_ids(unique), np.array([self.idf.get(t, self.default_idf) for t in unique]),
+            _hash_ids(grams), _hash_ids(_bigrams(content)))
+        score = 2 * coverage * precision / (coverage + precision) if coverage + precision else 0.0
+        escalate = any(t in NEGATIONS or (t in TARGETS and t not in matcher.tokens) for t in tokens)
+        return score, sims, escalate
+
+    def grade(self, player_answer: str, recommended_actions: list[str]) -> dict:
+        start = time.perf_counter()
+        if not recommended_actions:
+            score, sims, must_escalate = 0.0, np.zeros(0), False
+        else:
+            score, sims, must_escalate = self.score(player_answer, recommended_actions)
+        is_correct = score >= self.threshold and not must_escalate
+        elapsed = time.perf_counter() - start
+
+        self.stats["graded"] += 1
+        self.stats["local_correct" if is_correct else "escalated"] += 1
+        self.stats["seconds"] += elapsed
+        return {
+            "is_correct": is_correct,
+            "score": score,
+            "best_match": recommended_actions[int(sims.argmax())] if len(sims) else "",
+            "must_escalate": must_escalate,
+            "seconds": elapsed,
+        }
+
+    def summary(self) -> dict:
+        graded = self.stats["graded"]
+        return {
+            **self.stats,
+            "threshold": self.threshold,
+            "bypass_rate": self.stats["local_correct"] / graded if graded else 0.0,
+            "avg_latency_ms": 1000 * self.stats["seconds"] / graded if graded else 0.0,
+        }
+
+
+def calibrate_threshold(grader: LocalGrader, examples, target_precision=0.99) -> float:
+    """Lowest threshold at which local [CORRECT] calls reach the target precision.
+
+    examples: iterable of (player_answer, recommended_actions, is_correct) labelled by a human or the LLM.
+    """
+    scored = []
+    for answer, actions, label in examples:
+        score, _, must_escalate = grader.score(answer, actions)
+        if not must_escalate:
+            scored.append((score, bool(label)))
+    scored.sort(reverse=True)
+
+    best = 1.0
+    correct = 0
+    for i, (score, label) in enumerate(scored, 1):
+        correct += label
+        if correct / i >= target_precision:
+            best = score
+    return best
+
+
+def local_correct_feedback(recommended_actions) -> str:
+    """Coach feedback for an answer the local grader accepted (ends with the tag the client parses)."""
+    return f"That's it! {' and then '.join(recommended_actions)} is exactly the right play. Great baseball thinking! [CORRECT]"
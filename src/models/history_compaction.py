@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")  # GPT-4 / GPT-3.5 tokenizer
+except Exception:  # not installed, or its BPE file can't be fetched
+    _encoding = None
+
+ROLES = ("Coach:", "Player:")
+WORD_OR_PUNCT = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = re.compile(r"(?<=[.?!])\s")
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens in text: exact with tiktoken, else one per word or punctuation mark (close for English)."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(WORD_OR_PUNCT.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """The first max_tokens tokens of text (with "…" if anything was cut)."""
+    if max_tokens <= 0:
+        return ""
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        return text if len(tokens) <= max_tokens else _encoding.decode(tokens[:max_tokens]).rstrip() + "…"
+    for i, match in enumerate(WORD_OR_PUNCT.finditer(text)):
+        if i == max_tokens:
+            return text[:match.start()].rstrip() + "…"
+    return text
+
+
+def parse_turns(history: str) -> list:
+    """Split "Coach: …" / "Player: …" history into one string per message (continuation lines kept)."""
+    turns = []
+    for line in history.splitlines():
+        if line.startswith(ROLES) or not turns:
+            turns.append(line)
+        elif line.strip():
+            turns[-1] += "\n" + line
+    return [t.strip() for t in turns if t.strip()]
+
+
+def summary_item(turn: str, max_tokens=30) -> str:
+    """A one-line digest of an older message: its first sentence, capped."""
+    role, _, text = turn.partition(":")
+    first_sentence = SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    return f"{role}: {truncate_tokens(first_sentence, max_tokens)}"
+
+
+class HistoryCompactor:
+    """Keeps the evaluation prompt's conversation history at a roughly constant size.
+
+    The last `keep_turns` messages are sent verbatim; older ones are folded into a short
+    extractive summary (the first sentence of each, always starting with the coach's
+    original question). Summaries are cached per session and extended as more messages
+    fold, not rebuilt. The whole prompt is then held under `prompt_budget` tokens by
+    folding more messages, dropping the summary, then truncating the explanation and the
+    history, and as a last resort the prompt itself.
+    """
+
+    def __init__(self, keep_turns=4, summary_tokens=150, prompt_budget=1500, cache_size=10_000):
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self.prompt_budget = prompt_budget
+        self.cache_size = cache_size
+        self._summaries = OrderedDict()  # session key -> list of summary items for the folded messages
+        self._lock = threading.Lock()
+        self.stats = {"evaluations": 0, "compacted": 0, "over_budget": 0, "summary_hits": 0,
+                      "raw_tokens": 0, "prompt_tokens": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "4")),
+            summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "150")),
+            prompt_budget=int(os.getenv("EVALUATION_PROMPT_BUDGET", "1500")),
+        )
+
+    @staticmethod
+    def session_key(payload, turns):
+        """Plays are identified by their situation and the coach's opening question."""
+        opening = turns[0] if turns else ""
+        return hashlib.sha1(f"{payload['position']}\0{payload['game_state']}\0{opening}".encode()).hexdigest()
+
+    def _summary_items(self, key, turns, folded):
+        with self._lock:
+            items = self._summaries.get(key)
+            if items is not None and len(items) <= folded:
+                self._summaries.move_to_end(key)
+                self.stats["summary_hits"] += 1
+            else:
+                items = []
+            items = items + [summary_item(t) for t in turns[len(items):folded]]
+            self._summaries[key] = items
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        return items
+
+    def _render_summary(self, items):
+        """Join the items, keeping the first (the original question) and as many recent ones as fit."""
+        if not items:
+            return ""
+        kept, budget = [], self.summary_tokens - count_tokens(items[0])
+        for item in reversed(items[1:]):
+            cost = count_tokens(item)
+            if cost > budget:
+                kept.append("…")
+                break
+            kept.append(item)
+            budget -= cost
+        return "\n".join(["Earlier in this play (summary):", items[0], *reversed(kept)])
+
+    def history_for(self, payload, keep_turns=None, with_summary=True) -> str:
+        turns = parse_turns(payload.get("conversation_history") or "")
+        keep = self.keep_turns if keep_turns is None else keep_turns
+        folded = max(0, len(turns) - keep)
+        recent = "\n".join(turns[folded:])
+        if not folded or not with_summary:
+            return recent
+        summary = self._render_summary(self._summary_items(self.session_key(payload, turns), turns, folded))
+        return f"{summary}\nMost recent messages:\n{recent}"
+
+    def build_prompt(self, payload, build):
+        """Return build(payload) with its conversation_history compacted to fit the budget."""
+        raw = build(payload)
+        raw_tokens = count_tokens(raw)
+
+        prompt, compacted, over_budget = raw, False, False
+        turns = len(parse_turns(payload.get("conversation_history") or ""))
+        if turns > self.keep_turns or raw_tokens > self.prompt_budget:
+            compacted = True
+            # Fold more and more of the history until the prompt fits, then drop the summary
+            attempts = [(keep, True) for keep in range(min(self.keep_turns, turns), 0, -1)] + [(1, False)]
+            for keep, with_summary in attempts:
+                history = self.history_for(payload, keep_turns=keep, with_summary=with_summary)
+                prompt = build({**payload, "conversation_history": history})
+                if count_tokens(prompt) <= self.prompt_budget:
+                    break
+            else:
+                # Still too long (e.g. a huge explanation)
+                over_budget = True
+                prompt = self._truncate(payload, history, build)
+                logger.warning("⚠️ Evaluation prompt over the %d-token budget; truncated.", self.prompt_budget)
+
+        prompt_tokens = count_tokens(prompt)
+        with self._lock:
+            self.stats["evaluations"] += 1
+            self.stats["compacted"] += compacted
+            self.stats["over_budget"] += over_budget
+            self.stats["raw_tokens"] += raw_tokens
+            self.stats["prompt_tokens"] += prompt_tokens
+        return prompt, raw_tokens, prompt_tokens
+
+    def _truncate(self, payload, history, build):
+        """The prompt cut to the budget: explanation first, then whatever history still fits."""
+        budget = self.prompt_budget
+        payload = {**payload, "conversation_history": ""}
+        explanation = payload.get("explanation") or ""
+        limit = count_tokens(explanation)
+        prompt = build(payload)
+        while count_tokens(prompt) > budget and limit > 0:
+            limit = max(0, limit - (count_tokens(prompt) - budget) - 1)  # one more for the "…"
+            payload["explanation"] = truncate_tokens(explanation, limit)
+            prompt = build(payload)
+
+        room = budget - count_tokens(prompt)
+        if room > 1:
+            with_history = build({**payload, "conversation_history": truncate_tokens(history, room - 1)})
+            if count_tokens(with_history) <= budget:
+                prompt = with_history
+
+        # The rest of the prompt (e.g. a huge answer) is over the budget on its own
+        full, cut = prompt, budget
+        while count_tokens(prompt) > budget and cut > 0:
+            cut -= 1
+            prompt = truncate_tokens(full, cut)
+        return prompt
+
+    def summary(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        evaluations = max(1, stats["evaluations"])
+        return {
+            **stats,
+            "tokenizer": "tiktoken" if _encoding is not None else "approximate",
+            "mean_raw_tokens": stats["raw_tokens"] / evaluations,
+            "mean_prompt_tokens": stats["prompt_tokens"] / evaluations,
+            "cached_sessions": len(self._summaries),
+        }
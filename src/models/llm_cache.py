@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+# Get the project root (assumes this script is in src/models)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+DEFAULT_CACHE_PATH = PROJECT_ROOT / "data/cache/llm_responses.sqlite"
+
+
+class LLMResponseCache:
+    """Two-tier cache of LLM responses: an in-memory LRU in front of a SQLite table.
+
+    Keys hash (model, temperature, system prompt, user prompt). Each key keeps up
+    to `variants` different responses so repeated questions stay varied:
+
+    - until `variants` responses are stored, every lookup is a miss (a live call
+      adds a new variant);
+    - after that, hits serve the stored variants round-robin, and after
+      `refresh_after` hits one lookup is a miss again so a fresh response
+      replaces the oldest variant (`refresh_after=0` never refreshes).
+
+    Variants expire after `ttl_seconds`; each tier evicts least-recently-used
+    keys beyond its size limit. Disk reads don't write: the access times they
+    update are batched into the next put's commit. SQLite runs under its own
+    lock, so memory hits never wait on the disk; async code should use aget()
+    and aput(), which run the disk tier on a worker thread.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_memory_entries=1024, max_disk_entries=50_000,
+                 ttl_seconds=7 * 24 * 3600, variants=5, refresh_after=None):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants = max(1, variants)
+        self.refresh_after = self.variants if refresh_after is None else refresh_after
+
+        self._memory = OrderedDict()  # key -> entry dict (most recently used last)
+        self._lock = threading.Lock()  # memory tier and stats
+        self._db_lock = threading.Lock()  # SQLite connection
+        self._accessed = {}  # key -> last disk read, written with the next put
+        self._puts_since_evict = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "refreshes": 0,
+                      "evictions": 0, "saved_seconds": 0.0}
+
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, entry TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            db_path=os.getenv("LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH)) or None,
+            max_memory_entries=int(os.getenv("LLM_CACHE_MAX_MEMORY", "1024")),
+            max_disk_entries=int(os.getenv("LLM_CACHE_MAX_DISK", "50000")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            variants=int(os.getenv("LLM_CACHE_VARIANTS", "5")),
+            refresh_after=int(os.getenv("LLM_CACHE_REFRESH_AFTER")) if os.getenv("LLM_CACHE_REFRESH_AFTER") else None,
+        )
+
+    @staticmethod
+    def make_key(model, temperature, system_prompt, user_prompt) -> str:
+        raw = json.dumps([model, temperature, system_prompt, user_prompt], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return a cached response, or None if the caller should make a live call (and put() it)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return self._serve(entry, "memory_hits", now)
+        entry = self._load(key, now)
+        with self._lock:
+            if key in self._memory:  # loaded or put by another thread meanwhile
+                entry = self._memory[key]
+            elif entry is not None:
+                self._remember(key, entry)
+            return self._serve(entry, "disk_hits", now)
+
+    def put(self, key, response, latency=0.0):
+        """Store a fresh response for the key, replacing the oldest variant when full."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None:
+            entry = self._load(key, now)
+        with self._lock:
+            entry = self._memory.get(key) or entry or {"variants": [], "cursor": 0, "hits_since_refresh": 0}
+            entry["variants"].append({"response": response, "created_at": now, "latency": latency})
+            entry["variants"] = entry["variants"][-self.variants:]
+            entry["hits_since_refresh"] = 0
+            self._remember(key, entry)
+            data = json.dumps(entry)
+        self._store(key, data, now)
+
+    def _in_memory(self, key) -> bool:
+        with self._lock:
+            return key in self._memory
+
+    async def aget(self, key):
+        """get() for the event loop: a memory hit is answered inline, the disk tier on a thread."""
+        if self._db is None or self._in_memory(key):
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key, response, latency=0.0):
+        if self._db is None:
+            return self.put(key, response, latency)
+        await asyncio.to_thread(self.put, key, response, latency)
+
+    def summary(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._accessed.clear()
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    # --- internals ---
+
+    def _serve(self, entry, tier, now):
+        """Pick the variant to serve from entry, or None for a miss (self._lock held)."""
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        entry["variants"] = [v for v in entry["variants"] if now - v["created_at"] < self.ttl_seconds]
+        if len(entry["variants"]) < self.variants:
+            self.stats["misses"] += 1
+            return None
+        if self.refresh_after and entry["hits_since_refresh"] >= self.refresh_after:
+            self.stats["misses"] += 1
+            self.stats["refreshes"] += 1
+            return None
+
+        variant = entry["variants"][entry["cursor"] % len(entry["variants"])]
+        entry["cursor"] += 1
+        entry["hits_since_refresh"] += 1
+        self.stats[tier] += 1
+        self.stats["saved_seconds"] += variant["latency"]
+        return variant["response"]
+
+    def _remember(self, key, entry):
+        """Add entry to the memory tier, evicting the least recently used (self._lock held)."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _load(self, key, now):
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT entry FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = now
+        return json.loads(row[0])
+
+    def _store(self, key, data, now):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._accessed.pop(key, None)
+            if self._accessed:
+                self._db.executemany("UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                                     [(t, k) for k, t in self._accessed.items()])
+                self._accessed.clear()
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, entry, accessed_at) VALUES (?, ?, ?)",
+                (key, data, now),
+            )
+            # Checking the table size on every put would cost a COUNT(*) per miss
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 100:
+                self._puts_since_evict = 0
+                excess = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_entries
+                if excess > 0:
+                    self._db.execute(
+                        "DELETE FROM llm_cache WHERE key IN "
+                        "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)", (excess,))
+                    with self._lock:
+                        self.stats["evictions"] += excess
+            self._db.commit()
@@ -1,7 +1,13 @@
+import asyncio
 import os
-from openai import OpenAI, OpenAIError
+import time
+from contextlib import contextmanager
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI, OpenAIError
 from dotenv import load_dotenv
+from src.models.llm_cache import LLMResponseCache
 from src.utils.logging.logging import setup_logger
+from src.utils.metrics.metrics import Counter, Gauge, Histogram, endpoint_var
 
 logger = setup_logger()
 
@@ -14,29 +20,207 @@ if not api_key:
     logger.error("❌ OPENAI_API_KEY not found in environment.")
     raise OpenAIError("❌ OPENAI_API_KEY is required but not set.")
 
-client = OpenAI(api_key=api_key)
+# Optional: point the clients at another chat-completions server (e.g. a local stub)
+base_url = os.getenv("OPENAI_BASE_URL") or None
+
+# Async client settings: per-call timeout and how many LLM calls may be in flight at once
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "64"))
+
+client = OpenAI(api_key=api_key, base_url=base_url)
 logger.info("✅ OpenAI client initialized.")
 
-def call_openai_chat(system_prompt, user_prompt, model="gpt-3.5-turbo", temperature=0.7):
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=temperature,
+# Response cache for calls made with use_cache=True (LLM_CACHE_ENABLED=0 turns it off)
+response_cache = LLMResponseCache.from_env() if os.getenv("LLM_CACHE_ENABLED", "1") == "1" else None
+
+# Created on first use so they bind to the running event loop (and recreated if the loop changes)
+_async_client = None
+_async_semaphore = None
+_async_loop = None
+
+LLM_TOKENS = Counter("llm_tokens_total", "OpenAI tokens used, by model, endpoint and kind (prompt/completion)",
+                     labelnames=("model", "endpoint", "kind"))
+LLM_CALL_SECONDS = Histogram("llm_call_seconds", "OpenAI call duration (whole stream for streamed calls)",
+                             labelnames=("model", "endpoint"))
+LLM_IN_FLIGHT = Gauge("llm_calls_in_flight", "OpenAI calls currently in flight", labelnames=("model",))
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client backed by one pooled, keep-alive HTTP connection pool."""
+    global _async_client, _async_semaphore, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_loop = loop
+        _async_semaphore = None
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONCURRENCY,
+                max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=10.0),
         )
-        content = response.choices[0].message.content.strip()
+        _async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        logger.info(f"✅ Async OpenAI client initialized (max {OPENAI_MAX_CONCURRENCY} concurrent calls).")
+    return _async_client
+
+
+def _get_async_semaphore() -> asyncio.Semaphore:
+    global _async_semaphore
+    get_async_client()
+    if _async_semaphore is None:
+        _async_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return _async_semaphore
+
+
+async def close_async_client():
+    """Close the pooled connections (called on app shutdown)."""
+    global _async_client, _async_semaphore, _async_loop
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = None
+    _async_semaphore = None
+    _async_loop = None
+
+
+def _build_messages(system_prompt, user_prompt):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _record_usage(usage, model):
+    logger.info("[OpenAI] Tokens used - Prompt: %d, Completion: %d, Total: %d",
+                usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
+    endpoint = endpoint_var.get()
+    LLM_TOKENS.labels(model, endpoint, "prompt").inc(usage.prompt_tokens)
+    LLM_TOKENS.labels(model, endpoint, "completion").inc(usage.completion_tokens)
+
+
+@contextmanager
+def _track_call(model):
+    """Count the call as in flight and time it."""
+    in_flight = LLM_IN_FLIGHT.labels(model)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        in_flight.dec()
+        LLM_CALL_SECONDS.labels(model, endpoint_var.get()).observe(time.perf_counter() - start)
+
+
+def _response_content(response, model):
+    content = response.choices[0].message.content.strip()
+
+    # Log usage if available
+    usage = getattr(response, "usage", None)
+    if usage:
+        _record_usage(usage, model)
+
+    return content
+
 
-        # Log usage if available
-        usage = getattr(response, "usage", None)
-        if usage:
-            logger.info(f"[OpenAI] Tokens used - Prompt: {usage.prompt_tokens}, "
-                        f"Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
+def _cache_key(use_cache, model, temperature, system_prompt, user_prompt):
+    if not use_cache or response_cache is None:
+        return None
+    return response_cache.make_key(model, temperature, system_prompt, user_prompt)
 
+
+def call_openai_chat(system_prompt, user_prompt, model="gpt-3.5-turbo", temperature=0.7, use_cache=False):
+    cache_key = _cache_key(use_cache, model, temperature, system_prompt, user_prompt)
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        start = time.perf_counter()
+        with _track_call(model):
+            response = client.chat.completions.create(
+                model=model,
+                messages=_build_messages(system_prompt, user_prompt),
+                temperature=temperature,
+            )
+        content = _response_content(response, model)
+        if cache_key:
+            response_cache.put(cache_key, content, latency=time.perf_counter() - start)
+        return content
+
+    except Exception as e:
+        logger.error(f"💥 OpenAI API call failed: {e}")
+        raise
+
+
+async def call_openai_chat_async(system_prompt, user_prompt, model="gpt-3.5-turbo", temperature=0.7,
+                                 timeout=None, use_cache=False):
+    """Async counterpart of call_openai_chat.
+
+    Waits for a free slot if OPENAI_MAX_CONCURRENCY calls are already in flight.
+    """
+    cache_key = _cache_key(use_cache, model, temperature, system_prompt, user_prompt)
+    if cache_key:
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        async with _get_async_semaphore():
+            start = time.perf_counter()
+            with _track_call(model):
+                response = await get_async_client().chat.completions.create(
+                    model=model,
+                    messages=_build_messages(system_prompt, user_prompt),
+                    temperature=temperature,
+                    timeout=timeout or OPENAI_TIMEOUT,
+                )
+        content = _response_content(response, model)
+        if cache_key:
+            await response_cache.aput(cache_key, content, latency=time.perf_counter() - start)
         return content
 
     except Exception as e:
         logger.error(f"💥 OpenAI API call failed: {e}")
         raise
+
+
+async def stream_openai_chat_async(system_prompt, user_prompt, model="gpt-3.5-turbo", temperature=0.7,
+                                   timeout=None, use_cache=False):
+    """Yield the completion text in pieces as the model produces them.
+
+    A cache hit is yielded as one piece. Shares the concurrency limit with call_openai_chat_async.
+    """
+    cache_key = _cache_key(use_cache, model, temperature, system_prompt, user_prompt)
+    if cache_key:
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    try:
+        async with _get_async_semaphore():
+            start = time.perf_counter()
+            with _track_call(model):
+                stream = await get_async_client().chat.completions.create(
+                    model=model,
+                    messages=_build_messages(system_prompt, user_prompt),
+                    temperature=temperature,
+                    timeout=timeout or OPENAI_TIMEOUT,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                pieces = []
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        pieces.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                    usage = getattr(chunk, "usage", None)
+                    if usage:
+                        _record_usage(usage, model)
+
+        if cache_key:
+            await response_cache.aput(cache_key, "".join(pieces).strip(), latency=time.perf_counter() - start)
+
+    except Exception as e:
+        logger.error(f"💥 OpenAI streaming call failed: {e}")
+        raise
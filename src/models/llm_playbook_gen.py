@@ -1,33 +1,161 @@
+import hashlib
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import openai
+import yaml
 from src.models.llm_openai import call_openai_chat
-from src.utils.files.yaml_json import parse_yaml_output, save_json, save_yaml
+from src.utils.files.yaml_json import PROJECT_ROOT, parse_yaml_output, save_json, save_yaml
 from src.utils.logging.logging import setup_logger
+from src.utils.ratelimit.token_bucket import TokenBucket
 logger = setup_logger()
 
+DEFAULT_CHECKPOINT_PATH = PROJECT_ROOT / "data/game_situations/generation_checkpoint.jsonl"
+GENERATION_MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You're a smart, friendly youth baseball coach. "
+
+# Errors worth another try; anything else (bad request, auth) fails the chunk straight away
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
 
 def call_gpt_for_situations(user_prompt):
     logger.info("Generating LLM game situations...")
-    system_prompt = "You're a smart, friendly youth baseball coach. "
     # call open AI
     try:
-        response = call_openai_chat(system_prompt, user_prompt)
+        response = call_openai_chat(SYSTEM_PROMPT, user_prompt, model=GENERATION_MODEL)
     except Exception as e:
         logger.error(f"💥 OpenAI API call failed: {e}")
         raise
     logger.info("Response received from OpenAI.")
     return response
 
-def batch_generate_situations(positions, prompt_template):
-    all_situations = []
 
-    for pos in positions:
-        print(f"⚾ Generating for: {pos}...")
-        prompt = prompt_template.format(position=pos)
-        yaml_text = call_gpt_for_situations(prompt)
+def chunk_key(prompt) -> str:
+    """Checkpoint key of one chunk: a hash of its full prompt, the system prompt and the model.
+
+    The prompt is the template filled in for the chunk, so a new template, model or
+    chunking gets new keys and stale checkpointed situations are not reused.
+    """
+    raw = json.dumps([GENERATION_MODEL, SYSTEM_PROMPT, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_checkpoint(path) -> dict:
+    """Read finished chunks from a checkpoint file: {chunk_key: [situations]}.
+
+    A truncated last line (from a crash mid-write) and records without a key (from
+    before chunks were keyed) are ignored.
+    """
+    done = {}
+    path = Path(path)
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ Skipping unreadable checkpoint line in {path}")
+                continue
+            if "key" in record:
+                done[record["key"]] = record["situations"]
+    return done
+
+
+def _append_checkpoint(f, key, position, chunk, situations):
+    f.write(json.dumps({"key": key, "position": position, "chunk": chunk, "situations": situations}) + "\n")
+    f.flush()
+
+
+def generate_chunk(prompt, bucket=None, max_retries=4, backoff_seconds=1.0):
+    """Ask the LLM for one chunk of situations and parse it.
+
+    Transient API errors and unparseable replies are retried with jittered exponential backoff.
+    """
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            bucket.acquire()
         try:
-            parsed = parse_yaml_output(yaml_text)
-            all_situations.extend(parsed)
-        except Exception as e:
-            print(f"❌ Error parsing YAML for {pos}: {e}")
-            continue
+            parsed = parse_yaml_output(call_gpt_for_situations(prompt))
+            if not isinstance(parsed, list):
+                raise ValueError(f"expected a YAML list, got {type(parsed).__name__}")
+            return parsed
+        except TRANSIENT_ERRORS + (ValueError, yaml.YAMLError) as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_seconds * 2 ** attempt * (1 + random.random())
+            logger.warning(f"⚠️ Attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def batch_generate_situations(positions, prompt_template, chunks_per_position=1, max_workers=8,
+                              rate_per_second=2.0, burst=4, max_retries=4,
+                              checkpoint_path=DEFAULT_CHECKPOINT_PATH):
+    """Generate situations for every position, `chunks_per_position` LLM calls each, in parallel.
+
+    The prompt is built with prompt_template.format(position=..., chunk=..., chunks=...), so a
+    template may use {chunk}/{chunks} to ask each call for different situations.
+    Finished chunks are appended to `checkpoint_path` (JSONL) as they complete; rerunning with
+    the same checkpoint skips chunks whose prompt (see chunk_key) is unchanged, so a crashed
+    run picks up where it stopped. Pass checkpoint_path=None to disable checkpointing.
+    """
+    prompts = {(pos, chunk): prompt_template.format(position=pos, chunk=chunk + 1, chunks=chunks_per_position)
+               for pos in positions for chunk in range(chunks_per_position)}
+    keys = {pc: chunk_key(prompt) for pc, prompt in prompts.items()}
+    restored = load_checkpoint(checkpoint_path) if checkpoint_path else {}
+    done = {pc: restored[key] for pc, key in keys.items() if key in restored}
+    todo = [pc for pc in prompts if pc not in done]
+    logger.info(f"⚾ {len(done)} chunks restored from checkpoint, {len(todo)} to generate "
+                f"({max_workers} workers, {rate_per_second} calls/s).")
+
+    bucket = TokenBucket(rate_per_second, burst)
+    failed = []
+    start = time.perf_counter()
+
+    checkpoint = None
+    if checkpoint_path:
+        Path(checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+        checkpoint = open(checkpoint_path, "a+", encoding="utf-8")
+        # Start on a fresh line if the last run died mid-write
+        if checkpoint.tell() > 0:
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(generate_chunk, prompts[(pos, chunk)], bucket, max_retries): (pos, chunk)
+                for pos, chunk in todo
+            }
+            for future in as_completed(futures):
+                pos, chunk = futures[future]
+                try:
+                    situations = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Giving up on {pos} (chunk {chunk + 1}): {e}")
+                    failed.append((pos, chunk))
+                    continue
+                done[(pos, chunk)] = situations
+                if checkpoint:
+                    _append_checkpoint(checkpoint, keys[(pos, chunk)], pos, chunk, situations)
+                logger.info(f"✅ {pos} chunk {chunk + 1}: {len(situations)} situations")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    all_situations = []
+    for pos in positions:
+        for chunk in range(chunks_per_position):
+            all_situations.extend(done.get((pos, chunk), []))
 
-    return all_situations
\ No newline at end of file
+    logger.info(f"Generated {len(all_situations)} situations in {time.perf_counter() - start:.1f}s; "
+                f"{len(failed)} chunks failed" + (" (rerun to retry them)." if failed else "."))
+    return all_situations
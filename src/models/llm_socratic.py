@@ -1,22 +1,35 @@
 import re
-from src.models.llm_openai import call_openai_chat
+from src.models.history_compaction import HistoryCompactor
+from src.models.llm_openai import call_openai_chat, call_openai_chat_async, stream_openai_chat_async
+from src.utils.metrics.metrics import Histogram
 from src.utils.logging.logging import setup_logger
 logger = setup_logger()
 
-def generate_llm_question(position, game_state, related_knowledge):
-    system_prompt = (
-        "You're a smart, friendly youth baseball coach. "
-        "You ask kids thoughtful questions to help them understand plays. "
-        "Use the context to ask a clear, age-appropriate question that encourages reasoning."
-    )
+QUESTION_SYSTEM_PROMPT = (
+    "You're a smart, friendly youth baseball coach. "
+    "You ask kids thoughtful questions to help them understand plays. "
+    "Use the context to ask a clear, age-appropriate question that encourages reasoning."
+)
+
+EVALUATION_SYSTEM_PROMPT = "You are a smart and encouraging baseball coach helping a young player reason through a defensive play."
+EVALUATION_MODEL = "gpt-4"
+
+# Older turns of long conversations are summarised so evaluation prompts stay under a token budget
+history_compactor = HistoryCompactor.from_env()
+EVALUATION_PROMPT_TOKENS = Histogram(
+    "evaluation_prompt_tokens", "Evaluation prompt size in tokens, before (raw) and after (sent) history compaction.",
+    labelnames=("kind",), buckets=(100, 200, 300, 400, 600, 800, 1000, 1500, 2000, 3000, 5000, 10000),
+)
 
+
+def generate_llm_question(position, game_state, related_knowledge):
     user_prompt = build_llm_prompt_from_context(position, game_state, related_knowledge)
-    
+
     logger.info("Generating LLM question...")
 
     # Call the OpenAI API
     try:
-        response = call_openai_chat(system_prompt, user_prompt)
+        response = call_openai_chat(QUESTION_SYSTEM_PROMPT, user_prompt, use_cache=True)
     except Exception as e:
         logger.error(f"💥 OpenAI API call failed: {e}")
         raise
@@ -25,6 +38,24 @@ def generate_llm_question(position, game_state, related_knowledge):
     logger.info("Returning generated question.")
     return response
 
+
+async def generate_llm_question_async(position, game_state, related_knowledge):
+    """Async counterpart of generate_llm_question (does not hold a worker thread while waiting)."""
+    user_prompt = build_llm_prompt_from_context(position, game_state, related_knowledge)
+
+    logger.info("Generating LLM question (async)...")
+    response = await call_openai_chat_async(QUESTION_SYSTEM_PROMPT, user_prompt, use_cache=True)
+    logger.info("LLM question generated successfully.")
+    return response
+
+
+async def stream_llm_question(position, game_state, related_knowledge):
+    """Yield the LLM question in pieces as they arrive."""
+    user_prompt = build_llm_prompt_from_context(position, game_state, related_knowledge)
+    async for piece in stream_openai_chat_async(QUESTION_SYSTEM_PROMPT, user_prompt, use_cache=True):
+        yield piece
+
+
 def build_llm_prompt_from_context(position, game_state, context: dict) -> str:
     return f"""
 The player is a {position} in the situation: {game_state}.
@@ -43,19 +74,15 @@ Ask one thoughtful, age-appropriate Socratic question to guide the player’s de
 """.strip()
 
 
-def evaluate_answer_with_llm(payload: dict) -> dict:
-    system_prompt = "You are a smart and encouraging baseball coach helping a young player reason through a defensive play."
+def build_evaluation_prompt(payload: dict) -> str:
+    # The play's fixed context and the instructions come first and the conversation last, so every
+    # answer in a play shares the same prompt prefix (which the API can serve from its prompt cache)
     concepts = payload.get("concepts", [])
-    user_prompt = f"""
+    return f"""
 The player is a {payload['position']}.
 The situation is: {payload['game_state']}.
 Relevant concepts: {', '.join(concepts)}
 
-Here is the conversation so far:
-{payload['conversation_history']}
-
-They just gave this answer: "{payload['player_answer']}"
-
 Recommended actions:
 {', '.join(payload['recommended_actions'])}
 
@@ -67,19 +94,61 @@ Evaluate the player's latest answer. Either confirm if it's correct, or guide th
 Be sure to carry forward the original intent of the play. Give credit if the player's answer aligns with either the original or your follow-up prompts.
 
 End your response with: [CORRECT], [PARTIAL], or [INCORRECT]
+
+Here is the conversation so far:
+{payload['conversation_history']}
+
+They just gave this answer: "{payload['player_answer']}"
 """.strip()
-    
-    logger.info("Evaluating answer with LLM...")
-    logger.debug(f"LLM Evaluation User prompt: {user_prompt}")
-    feedback = call_openai_chat(system_prompt, user_prompt, model="gpt-4")
-    logger.info("LLM evaluation completed successfully.")
-    
+
+
+def build_compact_evaluation_prompt(payload: dict) -> str:
+    """build_evaluation_prompt() with the conversation history compacted to the prompt budget."""
+    user_prompt, raw_tokens, prompt_tokens = history_compactor.build_prompt(payload, build_evaluation_prompt)
+    EVALUATION_PROMPT_TOKENS.labels("raw").observe(raw_tokens)
+    EVALUATION_PROMPT_TOKENS.labels("sent").observe(prompt_tokens)
+    logger.debug("Evaluation prompt: %d tokens (%d before compaction)", prompt_tokens, raw_tokens)
+    return user_prompt
+
+
+def parse_evaluation(feedback: str) -> dict:
     # Extract tag
     match = re.search(r"\[(CORRECT|PARTIAL|INCORRECT)\]", feedback.upper())
     evaluation = match.group(1).lower() if match else "unknown"
 
     return {
-        "evaluation": evaluation,  
+        "evaluation": evaluation,
         "llm_feedback": feedback
     }
 
+
+def evaluate_answer_with_llm(payload: dict) -> dict:
+    user_prompt = build_compact_evaluation_prompt(payload)
+
+    logger.info("Evaluating answer with LLM...")
+    logger.debug("LLM Evaluation User prompt: %s", user_prompt)
+    feedback = call_openai_chat(EVALUATION_SYSTEM_PROMPT, user_prompt, model=EVALUATION_MODEL)
+    logger.info("LLM evaluation completed successfully.")
+
+    return parse_evaluation(feedback)
+
+
+async def evaluate_answer_with_llm_async(payload: dict) -> dict:
+    """Async counterpart of evaluate_answer_with_llm."""
+    user_prompt = build_compact_evaluation_prompt(payload)
+
+    logger.info("Evaluating answer with LLM (async)...")
+    logger.debug("LLM Evaluation User prompt: %s", user_prompt)
+    feedback = await call_openai_chat_async(EVALUATION_SYSTEM_PROMPT, user_prompt, model=EVALUATION_MODEL)
+    logger.info("LLM evaluation completed successfully.")
+
+    return parse_evaluation(feedback)
+
+
+async def stream_evaluation_with_llm(payload: dict):
+    """Yield the coach's feedback in pieces; parse_evaluation() the joined text for the tag."""
+    user_prompt = build_compact_evaluation_prompt(payload)
+
+    logger.info("Evaluating answer with LLM (streaming)...")
+    async for piece in stream_openai_chat_async(EVALUATION_SYSTEM_PROMPT, user_prompt, model=EVALUATION_MODEL):
+        yield piece
@@ -1,70 +1,86 @@
+from itertools import chain
+
+from src.utils.kg.kg_index import get_adjacency_index, get_situation_index
 from src.utils.logging.logging import setup_logger
 logger = setup_logger()
 
 def generate_question(position, game_state, graph):
 
-    logger.info("Generating questions based on the position and game state using rules...")
+    logger.debug("Generating questions based on the position and game state using rules...")
 
     questions = []
+    index = get_adjacency_index(graph)
 
-    # u = source; v = target; d = data (edge attributes where predicate is defined in kg_builder.py)
-    for u, v, d in graph.edges(data=True):
-        pred = d.get("predicate")
+    # Only the edges next to the position and game-state nodes can produce a question
+    # (predicates are defined in kg_loader.py / kg_builder.py)
 
-        # Role responsibility
-        if u == position and pred == "hasResponsibilityIn" and v == game_state:
-            questions.append(f"As a {position}, what is your responsibility in {game_state}?")
+    # Role responsibility
+    if game_state in index.out(position, "hasResponsibilityIn"):
+        questions.append(f"As a {position}, what is your responsibility in {game_state}?")
 
-        # Game state triggers play
-        if u == game_state and pred == "triggers":
-            questions.append(f"When it’s {game_state}, and the play is '{v}', what should the {position} do?")
+    # Game state triggers play
+    for v in index.out(game_state, "triggers"):
+        questions.append(f"When it’s {game_state}, and the play is '{v}', what should the {position} do?")
 
-        # Negative reasoning
-        if pred == "isNotRecommended" and v == game_state:
-            questions.append(f"Why might '{u}' not be the best option in {v}?")
+    # Negative reasoning
+    for u in index.in_(game_state, "isNotRecommended"):
+        questions.append(f"Why might '{u}' not be the best option in {game_state}?")
 
-        # Position covers base
-        if u == position and pred == "covers":
-            questions.append(f"Why does the {position} cover {v} in this situation?")
+    # Position covers base
+    for v in index.out(position, "covers"):
+        questions.append(f"Why does the {position} cover {v} in this situation?")
 
-        # Required understanding
-        if pred == "requiresUnderstandingOf":
-            if u == position:
-                questions.append(f"What does the {position} need to understand about '{v}'?")
-            elif u == game_state:
-                questions.append(f"What do you need to understand about '{v}' in the context of {game_state}?")
+    # Required understanding
+    for v in index.out(position, "requiresUnderstandingOf"):
+        questions.append(f"What does the {position} need to understand about '{v}'?")
+    if game_state != position:
+        for v in index.out(game_state, "requiresUnderstandingOf"):
+            questions.append(f"What do you need to understand about '{v}' in the context of {game_state}?")
 
-        if u == "GameState_2outs_Runner3" and pred == "triggers":
-            questions.append(f"What should the {position} do when it's {game_state} and the play is '{v}'?")
+    for v in index.out("GameState_2outs_Runner3", "triggers"):
+        questions.append(f"What should the {position} do when it's {game_state} and the play is '{v}'?")
 
     if not questions:
         questions.append(f"What should the {position} be thinking about in {game_state}?")
 
-    logger.info(f"Generated {len(questions)} questions.")
-    logger.info("Questions generated successfully.")
+    logger.debug("Generated %d questions.", len(questions))
 
     return questions
 
 
 def get_related_knowledge(position, game_state, graph):
 
-    logger.info("Retrieving related knowledge from the graph...")
+    logger.debug("Retrieving related knowledge from the graph...")
 
     facts = []
+    index = get_adjacency_index(graph)
 
-    for u, v, d in graph.edges(data=True):
-        pred = d.get("predicate")
-        if u in [position, game_state] or v in [position, game_state]:
-            facts.append(f"{u} --[{pred}]--> {v}")
+    seen = set()
+    for node in dict.fromkeys([position, game_state]):
+        for u, pred, v in chain(index.out_edges(node), index.in_edges(node)):
+            if (u, v) not in seen:
+                seen.add((u, v))
+                facts.append(f"{u} --[{pred}]--> {v}")
 
-    logger.info(f"Found {len(facts)} related facts.")
-    logger.info("Related knowledge retrieval complete.")
+    logger.debug("Found %d related facts.", len(facts))
     
     return "; ".join(facts)
 
 
 def get_rich_context(position, game_state, graph):
-    context = {
+    # Fast path: graphs built by load_kg_from_yaml carry a (position, game_state) index
+    situation_index = get_situation_index(graph)
+    if situation_index is not None:
+        situation = situation_index.get((position, game_state))
+        if situation is not None:
+            return situation.to_dict()
+        return _empty_context(position, game_state)
+
+    return _walk_rich_context(position, game_state, graph)
+
+
+def _empty_context(position, game_state):
+    return {
         "position": position,
         "game_state": game_state,
         "play": None,
@@ -73,6 +89,11 @@ def get_rich_context(position, game_state, graph):
         "explanation": None,
     }
 
+
+def _walk_rich_context(position, game_state, graph):
+    """Build the context by walking the graph (for graphs without a situation index)."""
+    context = _empty_context(position, game_state)
+
     # 1. Find play node triggered by game_state
     play_node = None
     for _, v, d in graph.edges(game_state, data=True):
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.utils.kg.kg_compact import CompactKG
+from src.utils.kg.kg_index import get_situation_index
+from src.utils.kg.kg_loader import resolve_kg_path
+from src.utils.kg.kg_shared import POINTER_NAME, ensure_published, open_kg_file
+from src.utils.kg.kg_snapshot import hash_file, load_kg
+from src.utils.metrics.metrics import Histogram
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+KG_RELOAD_SECONDS = Histogram(
+    "kg_reload_seconds", "Time to rebuild and swap in the knowledge graph.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+class ReloadInProgress(Exception):
+    """Raised when a reload is requested while another one is still running."""
+
+
+@dataclass(frozen=True)
+class KGVersion:
+    """One loaded knowledge graph and what was derived from it. Never mutated once published."""
+    version: int
+    graph: object
+    local_grader: object
+    source_hash: str
+    loaded_at: float
+    load_seconds: float
+    shared_file: str = None  # the mapped .kgmap file, in shared mode
+
+
+def diff_situations(old_index, new_index) -> dict:
+    """(position, game_state) keys added, removed and changed between two situation indexes."""
+    old_index = old_index or {}
+    return {
+        "added": [key for key in new_index if key not in old_index],
+        "removed": [key for key in old_index if key not in new_index],
+        "changed": [key for key, context in new_index.items() if key in old_index and old_index[key] != context],
+    }
+
+
+class KGHolder:
+    """Holds the current KGVersion and swaps in a rebuilt one when the source file changes.
+
+    Requests read `current` once and use that version throughout, so a reload never
+    changes the graph under them. A reload builds the new graph (and grader) on the
+    calling thread, the watcher thread or a worker thread of the admin endpoint,
+    then publishes it with a single reference assignment. Only one reload runs at a time.
+
+    With a shared_dir, the graph is the KG file published there (see kg_shared.py),
+    memory-mapped and shared with the other worker processes. The watcher then also
+    follows the directory's pointer file, so a version published by another worker
+    is picked up too.
+    """
+
+    def __init__(self, filename, build_grader=None, watch_interval=10.0, compact=False, shared_dir=None):
+        self.filename = filename
+        self.build_grader = build_grader  # graph -> LocalGrader (or None)
+        self.watch_interval = watch_interval
+        self.compact = compact  # serve a read-only CompactKG instead of the networkx graph
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        self.ready = threading.Event()
+        self.load_error = None
+        self.last_diff = None
+        self.stats = {"reloads": 0, "unchanged": 0, "failures": 0, "last_error": None}
+
+        self._current = None
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, filename, build_grader=None):
+        return cls(filename, build_grader=build_grader,
+                   watch_interval=float(os.getenv("KG_WATCH_SECONDS", "10")),
+                   compact=os.getenv("KG_COMPACT", "1") == "1",
+                   shared_dir=os.getenv("KG_SHARED_DIR") or None)
+
+    @property
+    def current(self) -> KGVersion:
+        return self._current
+
+    def on_swap(self, callback):
+        """Call callback(version, diff) after every swap (on the reloading thread)."""
+        self._listeners.append(callback)
+
+    def reload(self, force=False) -> dict:
+        """Rebuild the KG if its source file changed (always, with force) and swap it in.
+
+        Raises ReloadInProgress if another reload is running. If the rebuild fails the
+        current version stays in place and the error is re-raised.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgress("A knowledge graph reload is already running")
+        try:
+            return self._reload(force)
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, force):
+        old = self._current
+        path = resolve_kg_path(self.filename)
+        start = time.perf_counter()
+        try:
+            shared_file = None
+            if self.shared_dir is not None:
+                pointer = ensure_published(self.filename, self.shared_dir)
+                source_hash, shared_file = pointer["source_hash"], pointer["file"]
+                unchanged = old is not None and shared_file == old.shared_file
+            else:
+                source_hash = hash_file(path)
+                unchanged = old is not None and source_hash == old.source_hash
+            if unchanged and not force:
+                self.stats["unchanged"] += 1
+                return {"reloaded": False, "version": old.version}
+            if shared_file is not None:
+                graph = open_kg_file(self.shared_dir / shared_file)
+            else:
+                graph = load_kg(filename=self.filename)
+                if self.compact:
+                    graph = CompactKG.from_networkx(graph)
+            new_index = get_situation_index(graph) or {}
+            if old is not None and not new_index:
+                raise ValueError(f"{path.name} has no valid situations")
+            grader = self.build_grader(graph) if self.build_grader else None
+        except Exception as e:
+            self.stats["failures"] += 1
+            self.stats["last_error"] = str(e)
+            if old is None:
+                self.load_error = str(e)
+            logger.error(f"💥 Knowledge graph reload failed: {e}")
+            raise
+
+        diff = diff_situations(get_situation_index(old.graph) if old else None, new_index)
+        seconds = time.perf_counter() - start
+        version = KGVersion(
+            version=old.version + 1 if old else 1,
+            graph=graph,
+            local_grader=grader,
+            source_hash=source_hash,
+            loaded_at=time.time(),
+            load_seconds=seconds,
+            shared_file=shared_file,
+        )
+        self._current = version
+        self.last_diff = diff
+        self.load_error = None
+        self.stats["reloads"] += 1
+        self.stats["last_error"] = None
+        KG_RELOAD_SECONDS.observe(seconds)
+        self.ready.set()
+
+        counts = {name: len(keys) for name, keys in diff.items()}
+        logger.info(f"🔄 Knowledge graph version {version.version} live in {seconds:.2f}s: {counts}")
+        for callback in self._listeners:
+            try:
+                callback(version, diff)
+            except Exception as e:
+                logger.warning(f"⚠️ KG swap listener failed: {e}")
+        return {"reloaded": True, "version": version.version, "seconds": seconds, "diff": counts}
+
+    def summary(self) -> dict:
+        current = self._current
+        info = {
+            "version": None,
+            "reloading": self._reload_lock.locked(),
+            "watch_interval": self.watch_interval,
+            "compact": self.compact,
+            "shared_dir": str(self.shared_dir) if self.shared_dir else None,
+            **self.stats,
+        }
+        if current is not None:
+            info.update(
+                version=current.version,
+                source_hash=current.source_hash[:12],
+                loaded_at=current.loaded_at,
+                load_seconds=current.load_seconds,
+                shared_file=current.shared_file,
+                situations=len(get_situation_index(current.graph) or {}),
+                nodes=current.graph.number_of_nodes(),
+                edges=current.graph.number_of_edges(),
+            )
+        if self.last_diff is not None:
+            info["last_diff"] = {name: len(keys) for name, keys in self.last_diff.items()}
+        return info
+
+    # --- file watcher ---
+
+    def start_watching(self):
+        """Poll the source file every `watch_interval` seconds and reload when it changes (0 disables)."""
+        if self.watch_interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="kg-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"👀 Watching {self.filename} for changes every {self.watch_interval:g}s")
+
+    def stop_watching(self):
+        self._stop.set()
+        self._watcher = None
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _watched(self):
+        paths = [resolve_kg_path(self.filename)]
+        if self.shared_dir is not None:
+            paths.append(self.shared_dir / POINTER_NAME)
+        return tuple(self._stat(path) for path in paths)
+
+    def _watch(self):
+        last_seen = None  # the first check hashes the file; reload() skips it if nothing changed
+        while not self._stop.wait(self.watch_interval):
+            seen = self._watched()
+            if seen[0] is None or seen == last_seen or not self.ready.is_set():
+                continue
+            # Let an editor or generator finish writing before reading the file
+            if self._stop.wait(min(1.0, self.watch_interval)) or self._watched() != seen:
+                continue
+            try:
+                self.reload()
+                last_seen = seen
+            except ReloadInProgress:
+                pass
+            except Exception:
+                last_seen = seen  # already logged; wait for the next edit rather than retry a broken file
@@ -1,26 +1,152 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, List, Optional
 
 from src.utils.kg.kg_builder import build_baseball_kg
-from src.utils.kg.kg_loader import load_kg_from_yaml
 from src.models.socratic_engine import generate_question, get_related_knowledge, get_rich_context
-from src.models.llm_socratic import generate_llm_question
-from src.utils.players.player_tracker import load_player, save_player, log_concepts
-from src.models.llm_socratic import evaluate_answer_with_llm
-from src.utils.kg.kg_questiongen import get_random_situation
+from src.models.evaluate_answers import LocalGrader, local_correct_feedback
+from src.models.llm_openai import close_async_client, response_cache
+from src.models.llm_socratic import generate_llm_question_async, stream_llm_question
+from src.utils.players.player_tracker import get_player_store, load_player, save_player, log_concepts
+from src.models.llm_socratic import evaluate_answer_with_llm_async, parse_evaluation, stream_evaluation_with_llm
+from src.models.llm_socratic import history_compactor
+from src.utils.kg.kg_index import get_situation_questions
+from src.utils.kg.kg_sampler import get_situation_sampler
+from src.server.kg_holder import KGHolder, ReloadInProgress
+from src.server.play_selector import PlaySelector
+from src.server.question_pool import QuestionPool
+from src.server.request_context import RequestIdMiddleware, RequestMetricsMiddleware
+from src.server.session_store import SessionStore
+from src.server.sse import SSE_HEADERS, single_piece, stream_sse
+from src.utils.metrics.metrics import REGISTRY, Gauge, Histogram
+from src.utils.output.graph_viz import renderer as graph_renderer
 
-from src.utils.logging.logging import setup_logger
+from src.utils.logging.logging import get_log_level, set_log_level, setup_logger
 logger = setup_logger()
 
 logger.info("FastAPI app starting...")
 
-app = FastAPI()
-logger.info("FastAPI app started")
+KG_FILENAME = os.getenv("KG_FILENAME", "batch_situations.yaml")
+# With KG_BACKGROUND_LOAD=1 the server starts answering /health right away and
+# loads the knowledge graph in a thread; /ready reports when it can serve plays.
+KG_BACKGROUND_LOAD = os.getenv("KG_BACKGROUND_LOAD", "0") == "1"
+
+# Batch grading: largest batch accepted and how many of its LLM calls may run at once
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+# When set, /admin endpoints require this value in the X-Admin-Token header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Local fast-path grader for /evaluate_answer, built with the KG (LOCAL_GRADER_ENABLED=0 disables it)
+LOCAL_GRADER_ENABLED = os.getenv("LOCAL_GRADER_ENABLED", "1") == "1"
+LOCAL_GRADE_SECONDS = Histogram(
+    "local_grader_seconds", "Time to grade one answer locally.",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+
+# Time spent in each step of building a play (the LLM step only when the question pool misses)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds", "Time per question pipeline stage.", labelnames=("stage",),
+)
+KG_SIZE = Gauge("kg_size", "Size of the live knowledge graph.", labelnames=("kind",))
+KG_VERSION = Gauge("kg_version", "Version number of the live knowledge graph.")
+
+# Pre-generated LLM questions per situation (QUESTION_POOL_DEPTH=0 disables the warmer)
+question_pool = QuestionPool.from_env()
+
+
+def load_player_profile(name, history_limit=20):
+    """Struggled concepts and recently played situations, to seed the adaptive sampler."""
+    player = get_player_store().load_player(name, history_limit=history_limit)
+    return player["struggled_concepts"], [(h["position"], h["game_state"]) for h in player["history"]]
+
+
+# Play context and conversation per session, so answers only carry the session ID
+session_store = SessionStore.from_env()
+
+# Chooses the next play: uniform, position-balanced, or adapted to a player's weak concepts
+play_selector = PlaySelector.from_env(load_profile=load_player_profile,
+                                      shared_games=session_store if session_store.shared else None)
+
+
+def build_local_grader(graph):
+    """Build the grader for a new KG version, carrying the running counters over from the old one."""
+    grader = LocalGrader.from_graph(graph)
+    current = kg_holder.current
+    if current is not None and current.local_grader is not None:
+        grader.stats = current.local_grader.stats
+    return grader
+
+
+# The live knowledge graph; reloaded when KG_FILENAME changes (KG_WATCH_SECONDS) or via /admin/reload
+kg_holder = KGHolder.from_env(KG_FILENAME, build_grader=build_local_grader if LOCAL_GRADER_ENABLED else None)
+# Pooled questions for situations that changed or disappeared are stale after a reload
+kg_holder.on_swap(lambda version, diff: question_pool.invalidate(diff["removed"] + diff["changed"]))
+
+
+def record_kg_size(version, diff):
+    graph = version.graph
+    KG_SIZE.labels("nodes").set(graph.number_of_nodes())
+    KG_SIZE.labels("edges").set(graph.number_of_edges())
+    KG_SIZE.labels("situations").set(len(graph.graph.get("situation_index", ())))
+    KG_VERSION.set(version.version)
+
+
+kg_holder.on_swap(record_kg_size)
+# Lay out each new KG version on the reloading thread rather than on the first /kg/view
+kg_holder.on_swap(lambda version, diff: graph_renderer.layout(version.graph))
+
+
+def load_graph():
+    """Load the knowledge graph (with pregenerated situations by LLM), from its snapshot when fresh."""
+    kg_holder.reload(force=True)
+    logger.info("Knowledge graph loaded successfully")
+
+
+def require_graph():
+    if not kg_holder.ready.is_set():
+        raise HTTPException(status_code=503, detail="Knowledge graph is still loading")
+    return kg_holder.current.graph
+
+
+def current_local_grader():
+    current = kg_holder.current
+    return current.local_grader if current is not None else None
+
+
+def require_admin(token):
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
 
-# Load the knowledge graph (with pregenerated situations by LLM)
-graph = load_kg_from_yaml(filename="batch_situations.yaml")
-logger.info("Knowledge graph loaded successfully")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if KG_BACKGROUND_LOAD:
+        threading.Thread(target=load_graph, name="kg-loader", daemon=True).start()
+    question_pool.start(lambda: kg_holder.current.graph if kg_holder.ready.is_set() else None)
+    kg_holder.start_watching()
+    yield
+    kg_holder.stop_watching()
+    await question_pool.stop()
+    await close_async_client()
+
+
+if not KG_BACKGROUND_LOAD:
+    load_graph()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+logger.info("FastAPI app started")
 
 
 class QuestionRequest(BaseModel):
@@ -37,51 +163,368 @@ class LogConceptsRequest(BaseModel):
     game_state: str
     concepts: List[str]
 
+
+# What an answer without a session_id must carry
+PLAY_CONTEXT_FIELDS = ("position", "game_state", "recommended_actions", "explanation",
+                       "conversation_history", "concepts")
+
+
 class EvaluateAnswerRequest(BaseModel):
-    #player_name: str
-    position: str
-    game_state: str
+    """An answer: with the session_id of its play, or (without one) with the whole play context."""
+    session_id: Optional[str] = None
+    player_name: Optional[str] = None  # when set, the result adapts this player's next plays
     player_answer: str
-    recommended_actions: List[str]
-    explanation: str
-    conversation_history: str
-    concepts: List[str]
+    position: Optional[str] = None
+    game_state: Optional[str] = None
+    recommended_actions: Optional[List[str]] = None
+    explanation: Optional[str] = None
+    conversation_history: Optional[str] = None
+    concepts: Optional[List[str]] = None
 
 
 @app.get("/health")
 def health():
-    logger.info("Health check endpoint called")
+    """Liveness: the process is up (the knowledge graph may still be loading)."""
+    logger.debug("Health check endpoint called")
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness: the knowledge graph is loaded and plays can be served."""
+    if kg_holder.load_error:
+        raise HTTPException(status_code=503, detail=f"Knowledge graph failed to load: {kg_holder.load_error}")
+    kg = require_graph()
+    return {"status": "ready", "version": kg_holder.current.version,
+            "nodes": kg.number_of_nodes(), "edges": kg.number_of_edges()}
+
+
+@app.get("/kg/version")
+def kg_version():
+    """Current knowledge graph version, when and how fast it was loaded, and the last reload's diff."""
+    return kg_holder.summary()
+
+
+@app.get("/kg/view", response_class=HTMLResponse)
+def kg_view(node: List[str] = Query(default=[]), hops: int = Query(default=None, ge=0, le=4),
+            max_nodes: int = Query(default=None, ge=1, le=1000)):
+    """Interactive view of the KG around the given nodes (repeat `node`), `hops` edges out."""
+    return graph_renderer.render(require_graph(), node, hops=hops, max_nodes=max_nodes)
+
+
+@app.get("/kg/view/stats")
+def kg_view_stats():
+    return graph_renderer.summary()
+
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: str = Header(None)):
+    """Reload the knowledge graph from disk if it changed (always with ?force=true).
+
+    The rebuild runs in a worker thread; requests keep using the current version until the swap.
+    """
+    require_admin(x_admin_token)
+    try:
+        return await asyncio.to_thread(kg_holder.reload, force)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version "
+                                                    f"{kg_holder.summary()['version']}: {e}")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of the in-process metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/log-level")
+def admin_get_log_level(x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    return {"level": get_log_level()}
+
+
+@app.put("/admin/log-level")
+def admin_set_log_level(level: str, x_admin_token: str = Header(None)):
+    """Change the app log level (DEBUG, INFO, WARNING, ERROR) without a restart."""
+    require_admin(x_admin_token)
+    try:
+        return {"level": set_log_level(level)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/llm-cache/stats")
+def llm_cache_stats():
+    """Hit/miss counters of the LLM response cache and the LLM time it saved."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.summary()}
+
+
+@app.get("/local-grader/stats")
+def local_grader_stats():
+    """How many answers were graded locally (bypassing GPT-4) and how long local grading takes."""
+    local_grader = current_local_grader()
+    if local_grader is None:
+        return {"enabled": False}
+    return {"enabled": True, **local_grader.summary()}
+
+
+@app.get("/question-pool/stats")
+def question_pool_stats():
+    """Depth of the pre-generated question pools and how often /question was served from them."""
+    return question_pool.summary()
+
+
 @app.get("/random-situation")
-def random_situation():
-    position, game_state = get_random_situation(graph)
+def random_situation(mode: str = None, player: str = None, game_id: str = None):
+    position, game_state = pick_situation(require_graph(), mode, player, game_id)
     return {"position": position, "game_state": game_state}
 
 
+@app.get("/play-selector/stats")
+def play_selector_stats():
+    """How many plays each sampling mode picked, and how many players and games are tracked."""
+    return play_selector.summary()
+
+
+@app.get("/sessions/stats")
+def sessions_stats():
+    """Live, expired and evicted play sessions (live counts every worker's with a shared SESSION_DB)."""
+    return session_store.summary()
+
+
+@app.get("/history-compaction/stats")
+def history_compaction_stats():
+    """Evaluation prompt sizes before and after conversation history compaction."""
+    return history_compactor.summary()
+
+
+def pick_situation(kg, mode, player, game_id):
+    """The next play's (position, game_state); see PlaySelector for the modes.
+
+    May read the player store (a new adaptive sampler loads the player's profile), so
+    async handlers run it with asyncio.to_thread.
+    """
+    try:
+        return play_selector.pick(get_situation_sampler(kg), mode=mode, player=player, game_id=game_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def off_loop(fn, *args):
+    """Run fn on a worker thread when the session store is a database, else inline."""
+    if session_store.shared:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+def resolve_answer(req: EvaluateAnswerRequest):
+    """(LLM payload, session, player name) for an answer; the payload comes from the session if it has one."""
+    if req.session_id is None:
+        missing = [f for f in PLAY_CONTEXT_FIELDS if getattr(req, f) is None]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Send a session_id or the play context "
+                                                        f"(missing: {', '.join(missing)})")
+        return req.dict(exclude={"player_name", "session_id"}), None, req.player_name
+    session = session_store.get(req.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session; start a new play")
+    return session.payload(req.player_answer), session, req.player_name or session.player_name
+
+
+def record_result(payload, session, player_name, result):
+    """Store the result in the player's profile, adapt their next plays to it, and add the exchange to the session.
+
+    Writes to the player store, so async handlers run it with asyncio.to_thread.
+    """
+    if "evaluation" not in result:
+        return result
+    if player_name and result["evaluation"] != "unknown":
+        correct = result["evaluation"] == "correct"
+        play_selector.record(get_situation_sampler(require_graph()), player_name,
+                             (payload["position"], payload["game_state"]), correct)
+        # Struggled concepts seed the adaptive sampler after a restart or on another worker
+        get_player_store().log_result(player_name, payload["game_state"], payload["position"],
+                                      payload.get("concepts") or [], correct)
+    if session is not None:
+        session_store.add_turn(session, payload["player_answer"], result["llm_feedback"])
+    return result
+
+
 @app.post("/question")
-def get_question(req: QuestionRequest):
-    logger.info(f"Received question request for player: position: {req.position}, game_state: {req.game_state}")
-    related_knowledge = get_rich_context(req.position, req.game_state, graph)
-    static_questions = generate_question(req.position, req.game_state, graph)
-    llm_question = generate_llm_question(req.position, req.game_state, related_knowledge)
-    
-    logger.info("Question generation completed successfully.")
+async def get_question(req: QuestionRequest):
+    logger.info("Received question request for position: %s, game_state: %s", req.position, req.game_state)
+    return await build_question_response(req.position, req.game_state, require_graph())
+
+
+@app.post("/question/stream")
+async def stream_question(req: QuestionRequest):
+    """Like /question, but streams the LLM question as server-sent events.
 
+    `token` events carry text pieces; the final `done` event carries the same body as /question.
+    """
+    return stream_question_response(req.position, req.game_state, require_graph(), "/question/stream")
+
+
+@app.post("/next-play")
+async def next_play(mode: str = None, player: str = None, game_id: str = None):
+    """Pick a random situation and return its context and LLM question in one round-trip."""
+    kg = require_graph()
+    position, game_state = await asyncio.to_thread(pick_situation, kg, mode, player, game_id)
+    return await build_question_response(position, game_state, kg, player)
+
+
+@app.post("/next-play/stream")
+async def stream_next_play(mode: str = None, player: str = None, game_id: str = None):
+    """Like /next-play, but streams the LLM question as server-sent events."""
+    kg = require_graph()
+    position, game_state = await asyncio.to_thread(pick_situation, kg, mode, player, game_id)
+    return stream_question_response(position, game_state, kg, "/next-play/stream", player)
+
+
+def build_question_context(position, game_state, kg):
+    with PIPELINE_STAGE_SECONDS.labels("rich_context").time():
+        related_knowledge = get_rich_context(position, game_state, kg)
+    with PIPELINE_STAGE_SECONDS.labels("rule_questions").time():
+        precomputed = get_situation_questions(kg)
+        static_questions = precomputed.get((position, game_state)) if precomputed is not None else None
+        if static_questions is None:
+            static_questions = generate_question(position, game_state, kg)
     return {
-        "position": req.position,
-        "game_state": req.game_state,
+        "position": position,
+        "game_state": game_state,
         "related_knowledge": related_knowledge,
         "questions": static_questions,
-        "llm_question": llm_question,
     }
 
+
+def with_session(response, llm_question, player=None):
+    """The play response with its LLM question and the ID of a new session for answering it."""
+    session = session_store.create(response["position"], response["game_state"], response["related_knowledge"],
+                                   llm_question, player_name=player)
+    return {**response, "llm_question": llm_question, "session_id": session.session_id}
+
+
+async def build_question_response(position, game_state, kg, player=None):
+    response = build_question_context(position, game_state, kg)
+    llm_question = question_pool.pop(position, game_state)
+    if llm_question is None:
+        with PIPELINE_STAGE_SECONDS.labels("llm_question").time():
+            llm_question = await generate_llm_question_async(position, game_state, response["related_knowledge"])
+
+    logger.debug("Question generation completed successfully.")
+    return await off_loop(with_session, response, llm_question, player)
+
+
+def stream_question_response(position, game_state, kg, endpoint, player=None):
+    started_at = time.perf_counter()
+    response = build_question_context(position, game_state, kg)
+
+    pooled = question_pool.pop(position, game_state)
+    if pooled is not None:
+        pieces = single_piece(pooled)
+    else:
+        pieces = stream_llm_question(position, game_state, response["related_knowledge"])
+
+    return StreamingResponse(stream_sse(endpoint, started_at, pieces, lambda text: with_session(response, text, player)),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def grade_locally(payload):
+    """Return a [CORRECT] evaluation when the local grader is sure of it, else None (ask the LLM)."""
+    local_grader = current_local_grader()
+    if local_grader is None:
+        return None
+    result = local_grader.grade(payload["player_answer"], payload["recommended_actions"])
+    LOCAL_GRADE_SECONDS.observe(result["seconds"])
+    if not result["is_correct"]:
+        return None
+    logger.info("Answer graded locally (score %.2f), skipping the LLM.", result["score"])
+    return {**parse_evaluation(local_correct_feedback(payload["recommended_actions"])), "graded_by": "local"}
+
+
 @app.post("/evaluate_answer")
-def evaluate_answer_llm(req: EvaluateAnswerRequest):
-    feedback = evaluate_answer_with_llm(req.dict())
-    logger.info("Answer evaluation completed successfully.")
-    return feedback
+async def evaluate_answer_llm(req: EvaluateAnswerRequest):
+    payload, session, player_name = await off_loop(resolve_answer, req)
+    local = grade_locally(payload)
+    if local is not None:
+        return await asyncio.to_thread(record_result, payload, session, player_name, local)
+    with PIPELINE_STAGE_SECONDS.labels("llm_evaluation").time():
+        feedback = await evaluate_answer_with_llm_async(payload)
+    logger.debug("Answer evaluation completed successfully.")
+    return await asyncio.to_thread(record_result, payload, session, player_name, {**feedback, "graded_by": "llm"})
+
+
+@app.post("/evaluate_answers")
+async def evaluate_answers_batch(items: List[Any]):
+    """Grade many EvaluateAnswerRequest payloads at once (e.g. a whole team answering a play).
+
+    Answers are pre-graded locally; the rest go to the LLM with at most
+    BATCH_LLM_CONCURRENCY calls in flight, and identical payloads share one call.
+    Results come back in request order, each with either the evaluation or an
+    `error`, so one bad item does not fail the batch.
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} answers per batch")
+
+    results = [None] * len(items)
+    answers = {}  # index -> (payload, session, player name)
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[i] = {"error": f"Invalid request: expected an object, got {type(item).__name__}"}
+            continue
+        try:
+            answers[i] = await off_loop(resolve_answer, EvaluateAnswerRequest(**item))
+        except ValidationError as e:
+            results[i] = {"error": f"Invalid request: {e.errors()}"}
+        except HTTPException as e:
+            results[i] = {"error": e.detail}
+
+    # Local pre-grading, then one LLM call per distinct remaining payload
+    llm_calls = {}  # payload key -> (payload, [indices])
+    for i, (payload, _, _) in answers.items():
+        local = grade_locally(payload)
+        if local is not None:
+            results[i] = await asyncio.to_thread(record_result, *answers[i], local)
+            continue
+        key = json.dumps(payload, sort_keys=True)
+        llm_calls.setdefault(key, (payload, []))[1].append(i)
+
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+    async def evaluate(payload, indices):
+        async with semaphore:
+            try:
+                result = {**await evaluate_answer_with_llm_async(payload), "graded_by": "llm"}
+            except Exception as e:
+                logger.error("💥 Batch evaluation failed for items %s: %s", indices, e)
+                result = {"error": str(e)}
+        for i in indices:
+            results[i] = await asyncio.to_thread(record_result, *answers[i], result)
+
+    await asyncio.gather(*(evaluate(payload, indices) for payload, indices in llm_calls.values()))
+    logger.info("Batch of %d answers evaluated (%d LLM calls).", len(items), len(llm_calls))
+    return {"results": [{"index": i, **result} for i, result in enumerate(results)]}
+
+
+@app.post("/evaluate_answer/stream")
+async def stream_evaluate_answer(req: EvaluateAnswerRequest):
+    """Like /evaluate_answer, but streams the feedback; the `done` event carries the parsed evaluation tag."""
+    started_at = time.perf_counter()
+    payload, session, player_name = await off_loop(resolve_answer, req)
+    local = grade_locally(payload)
+    if local is not None:
+        pieces, graded_by = single_piece(local["llm_feedback"]), "local"
+    else:
+        pieces, graded_by = stream_evaluation_with_llm(payload), "llm"
+    return StreamingResponse(
+        stream_sse("/evaluate_answer/stream", started_at, pieces,
+                   lambda text: record_result(payload, session, player_name,
+                                              {**parse_evaluation(text), "graded_by": graded_by})),
+        media_type="text/event-stream", headers=SSE_HEADERS)
 
 """
 @app.post("/player/log")
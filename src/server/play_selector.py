@@ -0,0 +1,145 @@
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from src.utils.kg.kg_sampler import AdaptiveSampler
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+MODES = ("uniform", "balanced", "adaptive")
+
+
+class PlaySelector:
+    """Picks the situation for the next play from the KG's SituationSampler.
+
+    Modes: "uniform" (every situation equally likely), "balanced" (every position equally
+    likely, via an alias table) and "adaptive" (weighted by the player's struggled concepts
+    and recent results; the default when a player is given). With a game_id no situation
+    repeats within that game until all have been played. Per-player samplers and per-game
+    played sets are kept for the most recent `max_players` / `max_games`, and rebuilt
+    when the KG is reloaded.
+
+    With several workers, pass `shared_games` (a SessionStore with a database) so each
+    game's plays are shared and no-repeat holds whichever worker serves the play. The
+    adaptive weights stay per worker: each seeds them from the player's stored profile
+    and updates them with the answers it grades.
+    """
+
+    def __init__(self, load_profile=None, max_players=1000, max_games=10_000, shared_games=None):
+        self.load_profile = load_profile  # name -> (struggled concepts, recent (position, game_state) pairs)
+        self.shared_games = shared_games
+        self.max_players = max_players
+        self.max_games = max_games
+        self._players = OrderedDict()  # name -> AdaptiveSampler
+        self._games = OrderedDict()  # game_id -> (sampler, set of played situation ids)
+        self._lock = threading.Lock()
+        self.stats = {"uniform": 0, "balanced": 0, "adaptive": 0, "results": 0, "profiles_loaded": 0}
+
+    @classmethod
+    def from_env(cls, load_profile=None, shared_games=None):
+        return cls(
+            load_profile=load_profile,
+            shared_games=shared_games,
+            max_players=int(os.getenv("PLAY_SELECTOR_MAX_PLAYERS", "1000")),
+            max_games=int(os.getenv("PLAY_SELECTOR_MAX_GAMES", "10000")),
+        )
+
+    def pick(self, sampler, mode=None, player=None, game_id=None, rng=random):
+        """Return the (position, game_state) for the next play. Raises ValueError for an unknown mode."""
+        mode = mode or ("adaptive" if player else "uniform")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}")
+        if mode == "adaptive" and not player:
+            raise ValueError("Adaptive mode needs a player")
+
+        adaptive = self._adaptive(sampler, player) if mode == "adaptive" else None
+        elsewhere = self._played_elsewhere(sampler, game_id)
+        with self._lock:
+            self.stats[mode] += 1
+            if adaptive is not None:
+                adaptive.start_game(game_id)
+                for j in elsewhere:
+                    adaptive.mark_played(j)
+                i = adaptive.draw(rng)
+                adaptive.mark_played(i)
+            else:
+                played = self._played(sampler, game_id)
+                if played is not None:
+                    played.update(elsewhere)
+                    if len(played) >= len(sampler):
+                        played.clear()
+                if mode == "balanced":
+                    i = sampler.weighted(sampler.balanced_table(), rng, exclude=played or ())
+                else:
+                    i = sampler.uniform(rng, exclude=played or ())
+                if played is not None:
+                    played.add(i)
+        situation = sampler.situations[i]
+        if self.shared_games is not None and game_id is not None:
+            self.shared_games.record_play(game_id, situation)
+        return situation
+
+    def record(self, sampler, player, situation, correct: bool):
+        """Feed a graded answer back into the player's weights (if they have an adaptive sampler)."""
+        with self._lock:
+            adaptive = self._players.get(player)
+            i = sampler.ids.get(situation)
+            if adaptive is None or adaptive.sampler is not sampler or i is None:
+                return
+            adaptive.record(i, correct)
+            self.stats["results"] += 1
+
+    def _adaptive(self, sampler, player):
+        with self._lock:
+            adaptive = self._players.get(player)
+            if adaptive is not None and adaptive.sampler is sampler:
+                self._players.move_to_end(player)
+                return adaptive
+
+        # Built outside the lock: loading the profile reads the player store
+        struggled, recent = (), ()
+        if self.load_profile is not None:
+            try:
+                struggled, recent = self.load_profile(player)
+                self.stats["profiles_loaded"] += 1
+            except Exception as e:
+                logger.warning("⚠️ Could not load profile for %s, sampling without it: %s", player, e)
+        adaptive = AdaptiveSampler(sampler, struggled=struggled, recent=recent)
+
+        with self._lock:
+            current = self._players.get(player)
+            if current is not None and current.sampler is sampler:
+                return current  # another request built it first
+            self._players[player] = adaptive
+            self._players.move_to_end(player)
+            while len(self._players) > self.max_players:
+                self._players.popitem(last=False)
+        return adaptive
+
+    def _played_elsewhere(self, sampler, game_id):
+        """Ids of the situations already played in the game, as recorded by any worker."""
+        if self.shared_games is None or game_id is None:
+            return []
+        ids = [sampler.ids.get(tuple(situation)) for situation in self.shared_games.played_in_game(game_id)]
+        ids = [i for i in ids if i is not None]
+        if len(ids) >= len(sampler):  # all played: start the next round
+            self.shared_games.reset_game(game_id)
+            return []
+        return ids
+
+    def _played(self, sampler, game_id):
+        if game_id is None:
+            return None
+        entry = self._games.get(game_id)
+        if entry is None or entry[0] is not sampler:
+            entry = (sampler, set())
+            self._games[game_id] = entry
+            while len(self._games) > self.max_games:
+                self._games.popitem(last=False)
+        self._games.move_to_end(game_id)
+        return entry[1]
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {**self.stats, "players": len(self._players), "games": len(self._games)}
@@ -0,0 +1,139 @@
+import asyncio
+import os
+from collections import deque
+
+from src.models.llm_socratic import generate_llm_question_async
+from src.models.socratic_engine import get_rich_context
+from src.utils.kg.kg_questiongen import iter_situations
+from src.utils.ratelimit.token_bucket import TokenBucket
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+
+class QuestionPool:
+    """Pre-generated LLM questions per (position, game_state), kept topped up by a background task.
+
+    The warmer walks the KG's hasResponsibilityIn situations and fills each pool
+    up to `depth` questions, one question per situation per pass so every
+    situation gets a question early. LLM calls go through a token bucket so the
+    warmer stays within our OpenAI quota. After a full pass it sleeps for
+    `refill_interval` seconds, or until a pop() drains a pool below target.
+    """
+
+    def __init__(self, depth=3, refill_interval=60.0, rate_per_second=1.0, burst=5):
+        self.depth = depth
+        self.refill_interval = refill_interval
+        self.bucket = TokenBucket(rate_per_second, capacity=burst)
+        self._pools = {}  # (position, game_state) -> deque of questions
+        self._task = None
+        self._wake = None
+        self._loop = None
+        self._get_graph = None
+        self.stats = {"served": 0, "empty": 0, "generated": 0, "errors": 0, "passes": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            depth=int(os.getenv("QUESTION_POOL_DEPTH", "3")),
+            refill_interval=float(os.getenv("QUESTION_POOL_REFILL_SECONDS", "60")),
+            rate_per_second=float(os.getenv("QUESTION_POOL_RATE", "1.0")),
+            burst=int(os.getenv("QUESTION_POOL_BURST", "5")),
+        )
+
+    def pop(self, position, game_state):
+        """Return a pre-generated question, or None if this situation's pool is empty."""
+        pool = self._pools.get((position, game_state))
+        if not pool:
+            self.stats["empty"] += 1
+            return None
+        self.stats["served"] += 1
+        if self._wake is not None:
+            self._wake.set()
+        return pool.popleft()
+
+    def invalidate(self, keys):
+        """Drop pooled questions for these situations (e.g. after a KG reload changed them).
+
+        Safe to call from another thread; wakes the warmer to refill them from the current KG.
+        """
+        for key in keys:
+            self._pools.pop(key, None)
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def summary(self) -> dict:
+        depths = [len(pool) for pool in self._pools.values()]
+        return {
+            "target_depth": self.depth,
+            "situations": len(depths),
+            "questions": sum(depths),
+            "empty_situations": sum(1 for d in depths if d == 0),
+            "min_depth": min(depths, default=0),
+            "running": self._task is not None and not self._task.done(),
+            **self.stats,
+        }
+
+    async def fill(self, graph):
+        """Top up every situation's pool to the target depth (one pass of the warmer)."""
+        situations = list(dict.fromkeys(iter_situations(graph)))
+
+        # Drop pools for situations that are no longer in the KG
+        for key in set(self._pools) - set(situations):
+            del self._pools[key]
+
+        while True:
+            needy = [key for key in situations if len(self._pools.setdefault(key, deque())) < self.depth]
+            if not needy:
+                break
+            generated_before = self.stats["generated"]
+            for position, game_state in needy:
+                await self.bucket.acquire_async()
+                try:
+                    context = get_rich_context(position, game_state, graph)
+                    question = await generate_llm_question_async(position, game_state, context)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.warning(f"⚠️ Question pool could not generate for ({position}, {game_state}): {e}")
+                    continue
+                if self._get_graph is not None and self._get_graph() is not graph:
+                    return  # the KG was reloaded mid-pass; start over with the new one
+                self._pools.setdefault((position, game_state), deque()).append(question)
+                self.stats["generated"] += 1
+            if self.stats["generated"] == generated_before:
+                break  # every call failed; retry on the next pass rather than spin
+        self.stats["passes"] += 1
+
+    async def run(self, get_graph):
+        """Warm the pools forever; get_graph() returns the current KG, or None while it is loading."""
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._get_graph = get_graph
+        while True:
+            graph = get_graph()
+            if graph is None:
+                await asyncio.sleep(1)
+                continue
+            self._wake.clear()
+            try:
+                await self.fill(graph)
+                logger.info(f"✅ Question pool warm: {self.summary()}")
+            except Exception as e:
+                logger.error(f"💥 Question pool pass failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, get_graph):
+        if self.depth > 0 and self._task is None:
+            self._task = asyncio.create_task(self.run(get_graph))
+            logger.info(f"🔥 Question pool warmer started (depth {self.depth})")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
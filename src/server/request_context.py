@@ -0,0 +1,88 @@
+import time
+import uuid
+
+from starlette.routing import Match
+
+from src.utils.logging.logging import request_id_var
+from src.utils.metrics.metrics import Histogram, endpoint_var
+
+
+class RequestIdMiddleware:
+    """Tag every request with an id (the caller's X-Request-ID, or a new one).
+
+    The id is set in the logging context for the whole request, streamed bodies
+    included, and echoed back in the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Request duration by route, until the last body byte is sent.",
+    labelnames=("method", "endpoint", "status"),
+)
+
+
+class RequestMetricsMiddleware:
+    """Time every request into HTTP_REQUEST_SECONDS and set the metrics endpoint context.
+
+    The endpoint label is the matched route template (so /player/{name} is one series);
+    requests that match no route share the "unmatched" label. The route is matched
+    before the request runs, so the token and LLM metrics recorded while handling it
+    (labelled through endpoint_var) use the same label as the HTTP histogram.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        endpoint = route_template(scope)
+        token = endpoint_var.set(endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(scope["method"], endpoint, str(status)).observe(time.perf_counter() - start)
+            endpoint_var.reset(token)
+
+
+def route_template(scope) -> str:
+    """The path_format of the app route matching the request, or "unmatched"."""
+    for route in getattr(getattr(scope.get("app"), "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path_format", "unmatched")
+    return "unmatched"
@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    last_used REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used);
+CREATE TABLE IF NOT EXISTS game_plays (
+    game_id TEXT NOT NULL,
+    position TEXT NOT NULL,
+    game_state TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    PRIMARY KEY (game_id, position, game_state)
+);
+CREATE INDEX IF NOT EXISTS game_plays_played_at ON game_plays (played_at);
+"""
+PURGE_INTERVAL = 60.0  # seconds between deletes of expired rows in the shared database
+
+
+@dataclass
+class PlaySession:
+    """Everything the evaluation prompt needs about one play, kept on the server between answers."""
+    session_id: str
+    position: str
+    game_state: str
+    recommended_actions: List[str]
+    explanation: str
+    concepts: List[str]
+    conversation_history: str
+    player_name: Optional[str] = None
+    last_used: float = field(default_factory=time.time)
+
+    def payload(self, player_answer) -> dict:
+        """The evaluation payload for a new answer (what clients used to send in full)."""
+        return {
+            "position": self.position,
+            "game_state": self.game_state,
+            "player_answer": player_answer,
+            "recommended_actions": self.recommended_actions,
+            "explanation": self.explanation,
+            "conversation_history": self.conversation_history,
+            "concepts": self.concepts,
+        }
+
+
+class SessionStore:
+    """Play sessions with a TTL, in memory or in a SQLite database shared by every worker.
+
+    Without a `db_path`, sessions live in this process only, in least-recently-used
+    order: expired ones are always at the front and are dropped as new sessions arrive,
+    and beyond `max_sessions` the least recently used are dropped too. That is only
+    right with a single worker (or sticky routing).
+
+    With a `db_path` the database is the source of truth: sessions are written when
+    created and on every turn, and each lookup reads the row, so an answer can land on
+    any worker. It also records the situations played in each game (see PlaySelector)
+    so no-repeat holds across workers. Expired rows are purged every PURGE_INTERVAL.
+    """
+
+    def __init__(self, ttl_seconds=7200, max_sessions=10_000, db_path=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> PlaySession, least recently used first
+        self._lock = threading.Lock()
+        self._db = None
+        self._next_purge = 0.0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")  # no fsync per commit; WAL keeps it consistent
+            self._db.executescript(SCHEMA)
+            self._db.commit()
+        self.stats = {"created": 0, "hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "7200")),
+            max_sessions=int(os.getenv("SESSION_MAX", "10000")),
+            db_path=os.getenv("SESSION_DB") or None,
+        )
+
+    @property
+    def shared(self) -> bool:
+        return self._db is not None
+
+    def create(self, position, game_state, context, question, player_name=None) -> PlaySession:
+        """Open a session for a play just served (context is its related_knowledge)."""
+        session = PlaySession(
+            session_id=uuid.uuid4().hex,
+            position=position,
+            game_state=game_state,
+            recommended_actions=[a["action"] for a in context.get("recommended_actions", [])],
+            explanation=context.get("explanation", ""),
+            concepts=list(context.get("key_concepts", [])),
+            conversation_history=f"Coach: {question}\n",
+            player_name=player_name,
+        )
+        with self._lock:
+            self.stats["created"] += 1
+            if self._db is not None:
+                self._write(session)
+                self._purge(session.last_used)
+            else:
+                self._sessions[session.session_id] = session
+                self._evict(session.last_used)
+        return session
+
+    def get(self, session_id) -> Optional[PlaySession]:
+        """The live session, or None if it is unknown or has expired."""
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                session = self._read(session_id)
+            else:
+                session = self._sessions.get(session_id)
+            if session is None:
+                self.stats["misses"] += 1
+                return None
+            if now - session.last_used > self.ttl_seconds:
+                self._forget(session_id)
+                self.stats["expired"] += 1
+                return None
+            session.last_used = now  # written back with the next turn
+            self.stats["hits"] += 1
+            if self._db is None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def add_turn(self, session, player_answer, feedback):
+        """Append an answer and the coach's reply to the session's conversation.
+
+        In the database the append is one UPDATE of the stored row rather than a write of
+        this copy, so answers to the same session graded on different workers are all kept.
+        """
+        turn = f"Player: {player_answer}\nCoach: {feedback}\n"
+        with self._lock:
+            session.last_used = time.time()
+            history = self._append(session, turn) if self._db is not None else None
+            if history is not None:
+                session.conversation_history = history
+                return
+            session.conversation_history += turn
+            if self._db is not None:  # purged while the answer was being graded
+                self._write(session)
+            elif session.session_id in self._sessions:
+                self._sessions.move_to_end(session.session_id)
+            else:  # evicted while the answer was being graded
+                self._sessions[session.session_id] = session
+                self._evict(session.last_used)
+
+    # --- situations played per game (shared database only) ---
+
+    def played_in_game(self, game_id) -> list:
+        """(position, game_state) of every situation played in the game so far."""
+        with self._lock:
+            return self._db.execute("SELECT position, game_state FROM game_plays WHERE game_id = ?",
+                                    (game_id,)).fetchall()
+
+    def record_play(self, game_id, situation):
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO game_plays (game_id, position, game_state, played_at) "
+                             "VALUES (?, ?, ?, ?)", (game_id, *situation, time.time()))
+            self._db.commit()
+
+    def reset_game(self, game_id):
+        """Forget the game's plays (once all situations have been played)."""
+        with self._lock:
+            self._db.execute("DELETE FROM game_plays WHERE game_id = ?", (game_id,))
+            self._db.commit()
+
+    # --- storage ---
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_used > self.ttl_seconds:
+                self.stats["expired"] += 1
+            elif len(self._sessions) > self.max_sessions:
+                self.stats["evicted"] += 1
+            else:
+                break
+            del self._sessions[session_id]
+
+    def _write(self, session):
+        self._db.execute("INSERT OR REPLACE INTO sessions (session_id, last_used, data) VALUES (?, ?, ?)",
+                         (session.session_id, session.last_used, json.dumps(asdict(session))))
+        self._db.commit()
+
+    def _append(self, session, turn):
+        """Append to the stored conversation; returns it, or None if the row is gone."""
+        cursor = self._db.execute(
+            "UPDATE sessions SET last_used = ?, data = json_set(data, '$.last_used', ?, '$.conversation_history', "
+            "json_extract(data, '$.conversation_history') || ?) WHERE session_id = ?",
+            (session.last_used, session.last_used, turn, session.session_id))
+        row = self._db.execute("SELECT json_extract(data, '$.conversation_history') FROM sessions "
+                               "WHERE session_id = ?", (session.session_id,)).fetchone() if cursor.rowcount else None
+        self._db.commit()
+        return row[0] if row is not None else None
+
+    def _read(self, session_id):
+        row = self._db.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return PlaySession(**json.loads(row[0])) if row is not None else None
+
+    def _forget(self, session_id):
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+        else:
+            self._sessions.pop(session_id, None)
+
+    def _purge(self, now):
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL
+        cursor = self._db.execute("DELETE FROM sessions WHERE last_used < ?", (now - self.ttl_seconds,))
+        self.stats["expired"] += cursor.rowcount
+        self._db.execute("DELETE FROM game_plays WHERE played_at < ?", (now - self.ttl_seconds,))
+        self._db.commit()
+
+    def summary(self) -> dict:
+        with self._lock:
+            live = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] if self._db else len(self._sessions)
+            return {**self.stats, "live": live, "shared": self.shared,
+                    "ttl_seconds": self.ttl_seconds, "max_sessions": self.max_sessions}
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import time
+
+from src.utils.metrics.metrics import Histogram
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+SSE_TIME_TO_FIRST_TOKEN = Histogram(
+    "sse_time_to_first_token_seconds",
+    "Time from receiving a streaming request to sending its first token.",
+    labelnames=("endpoint",),
+)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event; data is JSON so newlines in tokens are safe."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def single_piece(text):
+    yield text
+
+
+async def stream_sse(endpoint, started_at, pieces, build_final):
+    """Relay text pieces as `token` events, then send `done` with build_final(full_text).
+
+    build_final runs on a worker thread, as it may write to the session database.
+
+    If the LLM call fails mid-stream the client gets an `error` event instead of `done`.
+    """
+    text = []
+    try:
+        async for piece in pieces:
+            if not text:
+                SSE_TIME_TO_FIRST_TOKEN.labels(endpoint).observe(time.perf_counter() - started_at)
+            text.append(piece)
+            yield sse_event("token", {"text": piece})
+        yield sse_event("done", await asyncio.to_thread(build_final, "".join(text).strip()))
+    except Exception as e:
+        logger.error(f"💥 Streaming {endpoint} failed: {e}")
+        yield sse_event("error", {"detail": str(e)})
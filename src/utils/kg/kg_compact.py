@@ -0,0 +1,453 @@
+"""Read-only, array-backed knowledge graph.
+
+A CompactKG interns node names to integer IDs and stores the edges of each predicate
+as CSR arrays (out- and in-adjacency). Edge and node attributes are integer columns,
+with their text in a string table held once as UTF-8 bytes. It answers the
+AdjacencyIndex queries of the question engine directly and the parts of the
+networkx DiGraph API that the loaders, the sampler and graph_viz use. Use
+to_networkx() for anything else, e.g. the notebooks.
+"""
+import zlib
+from collections.abc import Mapping
+
+import networkx as nx
+import numpy as np
+
+from src.utils.kg.kg_index import ADJACENCY_INDEX_KEY, AdjacencyIndex
+
+INT_MISSING = np.iinfo(np.int32).min  # "no value" in integer attribute columns
+INT32_RANGE = (np.iinfo(np.int32).min + 1, np.iinfo(np.int32).max)
+
+
+def string_hash(s: str) -> int:
+    """Stable across processes (unlike hash()), so lookup tables can be shared through a file."""
+    return zlib.crc32(s.encode("utf-8"))
+
+
+class StringTable:
+    """Strings stored back to back as UTF-8, found by ID (position) or, via hashes, by value."""
+
+    RECENT_LOOKUPS = 4096  # by-value lookups remembered (positions and game states repeat a lot)
+
+    def __init__(self, data, offsets, hashes=None, by_hash=None):
+        self.data = data  # bytes-like
+        self.offsets = offsets  # int64, len(table) + 1
+        self._starts = memoryview(offsets)  # indexes to plain ints, much faster than numpy scalars
+        self._hashes = hashes  # sorted string_hash values ...
+        self._by_hash = by_hash  # ... and the string ID of each
+        self._recent = {}
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i) -> str:
+        return str(self.data[self._starts[i]:self._starts[i + 1]], "utf-8")
+
+    def __iter__(self):
+        # Slices of a memoryview, so a mapped table (kg_shared) is never copied whole
+        data, starts = memoryview(self.data), self._starts
+        for start, end in zip(starts, starts[1:]):
+            yield str(data[start:end], "utf-8")
+
+    def __getstate__(self):
+        return {"data": bytes(self.data), "offsets": self.offsets}
+
+    def __setstate__(self, state):
+        self.__init__(state["data"], state["offsets"])
+
+    def lookup_arrays(self):
+        """(sorted hashes, string IDs in that order), built on first use."""
+        if self._hashes is None:
+            hashes = np.fromiter((string_hash(s) for s in self), dtype=np.uint32, count=len(self))
+            self._by_hash = np.argsort(hashes, kind="stable").astype(np.int32)
+            self._hashes = hashes[self._by_hash]
+        return self._hashes, self._by_hash
+
+    def id(self, s) -> int:
+        """ID of the string, or -1 if it is not in the table."""
+        i = self._recent.get(s)
+        if i is not None:
+            return i
+        hashes, by_hash = self.lookup_arrays()
+        h = string_hash(s)
+        i = int(hashes.searchsorted(h))
+        found = -1
+        while i < len(hashes) and hashes[i] == h:
+            candidate = int(by_hash[i])
+            if self[candidate] == s:
+                found = candidate
+                break
+            i += 1
+        if len(self._recent) >= self.RECENT_LOOKUPS:
+            self._recent.clear()
+        self._recent[s] = found
+        return found
+
+
+class AttributeColumn:
+    """One attribute for every edge (or node): string IDs, int32 values, or a plain list otherwise."""
+
+    def __init__(self, kind, values):
+        self.kind = kind  # "str", "int" or "obj"
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values, intern):
+        present = [v for v in values if v is not None]
+        if all(isinstance(v, str) for v in present):
+            return cls("str", np.array([-1 if v is None else intern(v) for v in values], dtype=np.int32))
+        if all(isinstance(v, int) and not isinstance(v, bool) and INT32_RANGE[0] <= v <= INT32_RANGE[1]
+               for v in present):
+            return cls("int", np.array([INT_MISSING if v is None else v for v in values], dtype=np.int32))
+        return cls("obj", list(values))
+
+    def get(self, i, strings):
+        value = self.values[i]
+        if self.kind == "str":
+            return None if value < 0 else strings[value]
+        if self.kind == "int":
+            return None if value == INT_MISSING else int(value)
+        return value
+
+    def to_list(self, strings: list) -> list:
+        """Every value, decoded (None where missing)."""
+        if self.kind == "str":
+            return [strings[v] if v >= 0 else None for v in self.values.tolist()]
+        if self.kind == "int":
+            return [v if v != INT_MISSING else None for v in self.values.tolist()]
+        return list(self.values)
+
+    def take(self, order):
+        if self.kind == "obj":
+            return AttributeColumn(self.kind, [self.values[i] for i in order])
+        return AttributeColumn(self.kind, self.values[order])
+
+
+class PredicateCSR:
+    """The edges of one predicate: out-adjacency (with edge attributes) and in-adjacency, as CSR."""
+
+    def __init__(self, out_ptr, out_idx, in_ptr, in_idx, attrs):
+        self.out_ptr, self.out_idx = out_ptr, out_idx
+        self.in_ptr, self.in_idx = in_ptr, in_idx
+        self.attrs = attrs  # name -> AttributeColumn, aligned with out_idx
+
+    @classmethod
+    def from_edges(cls, n_nodes, src, dst, attrs):
+        """Rows keep each node's edges in insertion order (a stable sort by source / target)."""
+        src, dst = np.asarray(src, dtype=np.int32), np.asarray(dst, dtype=np.int32)
+        by_src = np.argsort(src, kind="stable")
+        by_dst = np.argsort(dst, kind="stable")
+        return cls(_row_pointers(src, n_nodes), dst[by_src], _row_pointers(dst, n_nodes), src[by_dst],
+                   {name: column.take(by_src) for name, column in attrs.items()})
+
+    def __len__(self):
+        return len(self.out_idx)
+
+
+def _row_pointers(rows, n_nodes):
+    ptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_nodes), out=ptr[1:])
+    return ptr
+
+
+class Neighbours:
+    """Node names at one CSR row; membership tests compare integer IDs."""
+
+    def __init__(self, kg, ids):
+        self._kg = kg
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        names = self._kg.names
+        return (names[i] for i in self._ids.tolist())
+
+    def __contains__(self, node):
+        i = self._kg.node_id(node)
+        return i >= 0 and bool((self._ids == i).any())
+
+
+class _NodeView:
+    """graph.nodes: iterate, test membership, read attributes; graph.nodes(data=True) for pairs."""
+
+    def __init__(self, kg):
+        self._kg = kg
+
+    def __iter__(self):
+        return iter(self._kg.names)
+
+    def __len__(self):
+        return self._kg.number_of_nodes()
+
+    def __contains__(self, node):
+        return self._kg.node_id(node) >= 0
+
+    def __getitem__(self, node):
+        i = self._kg.node_id(node)
+        if i < 0:
+            raise KeyError(node)
+        return self._kg.node_attrs(i)
+
+    def get(self, node, default=None):
+        i = self._kg.node_id(node)
+        return default if i < 0 else self._kg.node_attrs(i)
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self)
+        return ((name, self._kg.node_attrs(i)) for i, name in enumerate(self._kg.names))
+
+
+class _Successors(Mapping):
+    """graph.succ[node]: target -> edge data, read from the CSR rows without copying them."""
+
+    def __init__(self, kg, i):
+        self._kg = kg
+        self._i = i
+
+    def _find(self, node):
+        j = self._kg.node_id(node)
+        if j >= 0:
+            for predicate, csr in self._kg.csr.items():
+                start = csr.out_ptr[self._i]
+                hits = np.flatnonzero(csr.out_idx[start:csr.out_ptr[self._i + 1]] == j)
+                if len(hits):
+                    return predicate, csr, start + hits[0]
+        return None
+
+    def __getitem__(self, node):
+        found = self._find(node)
+        if found is None:
+            raise KeyError(node)
+        return self._kg._edge_data(*found)
+
+    def __contains__(self, node):
+        return self._find(node) is not None
+
+    def __iter__(self):
+        return (v for _, _, v in self._kg.out_edges(self._kg.names[self._i]))
+
+    def __len__(self):
+        return sum(int(csr.out_ptr[self._i + 1] - csr.out_ptr[self._i]) for csr in self._kg.csr.values())
+
+
+class _SuccessorView:
+    """graph.succ[node] -> read-only mapping of target -> edge data."""
+
+    def __init__(self, kg):
+        self._kg = kg
+
+    def __getitem__(self, node):
+        i = self._kg.node_id(node)
+        if i < 0:
+            raise KeyError(node)
+        return _Successors(self._kg, i)
+
+
+class CompactKG:
+    """Read-only KG: interned node IDs, per-predicate CSR adjacency and attribute columns.
+
+    `graph` holds the same lookup indexes as the networkx graph it was built from (the
+    situation index and sampler are shared, not copied), and the CompactKG serves as its
+    own adjacency index. Between any two nodes there is at most one edge, as in a DiGraph.
+    """
+
+    def __init__(self, names: StringTable, strings: StringTable, predicates, csr, node_attrs, graph=None):
+        self.names = names  # node ID -> name
+        self.strings = strings  # attribute text (explanations, sources, ...)
+        self.predicates = list(predicates)
+        self.csr = csr  # predicate -> PredicateCSR
+        self._node_attrs = node_attrs  # attribute -> AttributeColumn over node IDs
+        self.graph = dict(graph or {})
+        self.graph[ADJACENCY_INDEX_KEY] = self
+        self.nodes = _NodeView(self)
+        self.succ = _SuccessorView(self)
+
+    @classmethod
+    def from_networkx(cls, G: nx.DiGraph) -> "CompactKG":
+        names = list(G.nodes())
+        ids = {name: i for i, name in enumerate(names)}
+        strings, string_ids = [], {}
+
+        def intern(s):
+            i = string_ids.get(s)
+            if i is None:
+                i = string_ids[s] = len(strings)
+                strings.append(s)
+            return i
+
+        edges = {}  # predicate -> (src, dst, [edge data])
+        for u, v, d in G.edges(data=True):
+            src, dst, data = edges.setdefault(d.get("predicate"), ([], [], []))
+            src.append(ids[u])
+            dst.append(ids[v])
+            data.append(d)
+        csr = {}
+        for predicate, (src, dst, data) in edges.items():
+            keys = dict.fromkeys(k for d in data for k in d if k != "predicate")
+            attrs = {k: AttributeColumn.from_values([d.get(k) for d in data], intern) for k in keys}
+            csr[predicate] = PredicateCSR.from_edges(len(names), src, dst, attrs)
+
+        node_data = [d for _, d in G.nodes(data=True)]
+        keys = dict.fromkeys(k for d in node_data for k in d)
+        node_attrs = {k: AttributeColumn.from_values([d.get(k) for d in node_data], intern) for k in keys}
+
+        graph = {k: v for k, v in G.graph.items() if k != ADJACENCY_INDEX_KEY}
+        return cls(StringTable.from_strings(names), StringTable.from_strings(strings), csr.keys(), csr,
+                   node_attrs, graph)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """An equivalent networkx DiGraph (same nodes, edges, attributes and graph indexes)."""
+        G = nx.DiGraph()
+        G.add_nodes_from(self.nodes(data=True))
+        G.add_edges_from(self.edges(data=True))
+        G.graph.update((k, v) for k, v in self.graph.items() if k != ADJACENCY_INDEX_KEY)
+        G.graph[ADJACENCY_INDEX_KEY] = AdjacencyIndex.from_graph(G)
+        return G
+
+    # --- lookups ---
+
+    def node_id(self, node) -> int:
+        return self.names.id(node) if isinstance(node, str) else -1
+
+    def node_attrs(self, i) -> dict:
+        attrs = {}
+        for key, column in self._node_attrs.items():
+            value = column.get(i, self.strings)
+            if value is not None:
+                attrs[key] = value
+        return attrs
+
+    def _out_ids(self, i, csr):
+        return csr.out_idx[csr.out_ptr[i]:csr.out_ptr[i + 1]]
+
+    def _in_ids(self, i, csr):
+        return csr.in_idx[csr.in_ptr[i]:csr.in_ptr[i + 1]]
+
+    # --- AdjacencyIndex queries ---
+
+    def out(self, node, predicate):
+        """Targets of the node's out-edges with this predicate."""
+        csr, i = self.csr.get(predicate), self.node_id(node)
+        if csr is None or i < 0:
+            return ()
+        return Neighbours(self, self._out_ids(i, csr))
+
+    def in_(self, node, predicate):
+        """Sources of the node's in-edges with this predicate."""
+        csr, i = self.csr.get(predicate), self.node_id(node)
+        if csr is None or i < 0:
+            return ()
+        return Neighbours(self, self._in_ids(i, csr))
+
+    def out_edges(self, node):
+        """Yield (node, predicate, target) for every out-edge of the node."""
+        i = self.node_id(node)
+        if i < 0:
+            return
+        for predicate, csr in self.csr.items():
+            for v in self._out_ids(i, csr).tolist():
+                yield node, predicate, self.names[v]
+
+    def in_edges(self, node):
+        """Yield (source, predicate, node) for every in-edge of the node."""
+        i = self.node_id(node)
+        if i < 0:
+            return
+        for predicate, csr in self.csr.items():
+            for u in self._in_ids(i, csr).tolist():
+                yield self.names[u], predicate, node
+
+    # --- networkx-style reads ---
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, node):
+        return self.node_id(node) >= 0
+
+    def number_of_nodes(self) -> int:
+        return len(self.names)
+
+    def number_of_edges(self) -> int:
+        return sum(len(csr) for csr in self.csr.values())
+
+    def _edge_data(self, predicate, csr, k):
+        data = {"predicate": predicate} if predicate is not None else {}
+        for key, column in csr.attrs.items():
+            value = column.get(k, self.strings)
+            if value is not None:
+                data[key] = value
+        return data
+
+    def edges(self, nbunch=None, data=False):
+        """(u, v) or (u, v, data) for every edge, or only for edges out of nbunch (a node or nodes).
+
+        The whole graph comes predicate by predicate; edges out of given nodes come node by node.
+        """
+        if nbunch is not None:
+            nodes = [nbunch] if nbunch in self else nbunch
+            for i in (i for i in map(self.node_id, nodes) if i >= 0):
+                u = self.names[i]
+                for predicate, csr in self.csr.items():
+                    for k in range(csr.out_ptr[i], csr.out_ptr[i + 1]):
+                        v = self.names[int(csr.out_idx[k])]
+                        yield (u, v, self._edge_data(predicate, csr, k)) if data else (u, v)
+            return
+
+        names = list(self.names)
+        strings = list(self.strings) if data else None
+        for predicate, csr in self.csr.items():
+            sources = np.repeat(np.arange(len(names)), np.diff(csr.out_ptr)).tolist()
+            targets = csr.out_idx.tolist()
+            if not data:
+                yield from ((names[u], names[v]) for u, v in zip(sources, targets))
+                continue
+            columns = [(key, column.to_list(strings)) for key, column in csr.attrs.items()]
+            for k, (u, v) in enumerate(zip(sources, targets)):
+                d = {"predicate": predicate} if predicate is not None else {}
+                for key, values in columns:
+                    if values[k] is not None:
+                        d[key] = values[k]
+                yield names[u], names[v], d
+
+    def successors(self, node):
+        return (v for _, _, v in self.out_edges(node))
+
+    def predecessors(self, node):
+        return (u for u, _, _ in self.in_edges(node))
+
+    def degree(self, node) -> int:
+        i = self.node_id(node)
+        if i < 0:
+            return 0
+        return sum(int(c.out_ptr[i + 1] - c.out_ptr[i] + c.in_ptr[i + 1] - c.in_ptr[i]) for c in self.csr.values())
+
+    def has_edge(self, u, v) -> bool:
+        return any(v in self.out(u, predicate) for predicate in self.predicates)
+
+    def nbytes(self) -> int:
+        """Bytes held by the arrays and string tables (not the shared graph indexes)."""
+        total = len(self.names.data) + self.names.offsets.nbytes + len(self.strings.data) + self.strings.offsets.nbytes
+        columns = list(self._node_attrs.values())
+        for csr in self.csr.values():
+            total += csr.out_ptr.nbytes + csr.out_idx.nbytes + csr.in_ptr.nbytes + csr.in_idx.nbytes
+            columns += csr.attrs.values()
+        return total + sum(c.values.nbytes for c in columns if c.kind != "obj")
+
+
+def as_networkx(graph) -> nx.DiGraph:
+    """The graph as a networkx DiGraph (for notebooks and debugging), converting a CompactKG."""
+    return graph.to_networkx() if isinstance(graph, CompactKG) else graph
@@ -0,0 +1,119 @@
+from dataclasses import dataclass, field
+
+# Keys under graph.graph where load_kg_from_yaml stores the lookup indexes
+SITUATION_INDEX_KEY = "situation_index"
+ADJACENCY_INDEX_KEY = "adjacency_index"
+SAMPLER_KEY = "situation_sampler"
+# Only on KGs mapped from a shared file (kg_shared.py): precomputed rule questions and graph layout
+QUESTIONS_KEY = "situation_questions"
+LAYOUT_KEY = "layout"
+
+
+@dataclass(frozen=True)
+class SituationContext:
+    """Precompiled context for one (position, game_state) situation."""
+    position: str
+    game_state: str
+    play: str
+    recommended_actions: tuple = ()  # actions in order
+    key_concepts: tuple = ()
+    explanation: str = None
+    situation_id: str = field(default=None, compare=False)
+
+    def to_dict(self) -> dict:
+        """Return the context in the shape get_rich_context has always returned."""
+        return {
+            "position": self.position,
+            "game_state": self.game_state,
+            "play": self.play,
+            "recommended_actions": [
+                {"action": a, "order": i} for i, a in enumerate(self.recommended_actions)
+            ],
+            "key_concepts": list(self.key_concepts),
+            "explanation": self.explanation,
+        }
+
+
+def situation_context_from_record(s: dict) -> SituationContext:
+    """Build a SituationContext from one situation record (as found in the YAML)."""
+    return SituationContext(
+        position=s["position"],
+        game_state=s["game_state"],
+        play=s["play"],
+        recommended_actions=tuple(s.get("recommended_actions", [])),
+        key_concepts=tuple(s.get("key_concepts", [])),
+        explanation=s.get("explanation"),
+        situation_id=s.get("situation_id"),
+    )
+
+
+def add_to_situation_index(index: dict, context: SituationContext) -> bool:
+    """Add a context to the index. The first situation for a (position, game_state) wins."""
+    key = (context.position, context.game_state)
+    if key in index:
+        return False
+    index[key] = context
+    return True
+
+
+def get_situation_index(graph):
+    """Return the situation index attached to the graph, or None if it was built without one."""
+    return graph.graph.get(SITUATION_INDEX_KEY)
+
+
+def get_situation_questions(graph):
+    """(position, game_state) -> precomputed rule-based questions, or None if the graph has none."""
+    return graph.graph.get(QUESTIONS_KEY)
+
+
+class AdjacencyIndex:
+    """In- and out-adjacency of the KG, bucketed by predicate.
+
+    Lets the question engine look at the edges next to a node for one predicate
+    without scanning every edge in the graph. Built once from a finished graph;
+    it does not follow later changes to that graph.
+    """
+
+    def __init__(self):
+        self._out = {}  # node -> {predicate: {neighbour: None}} (dict keeps insertion order)
+        self._in = {}
+
+    def add_edge(self, u, v, predicate):
+        self._out.setdefault(u, {}).setdefault(predicate, {})[v] = None
+        self._in.setdefault(v, {}).setdefault(predicate, {})[u] = None
+
+    def out(self, node, predicate):
+        """Targets of the node's out-edges with this predicate."""
+        return self._out.get(node, {}).get(predicate, {}).keys()
+
+    def in_(self, node, predicate):
+        """Sources of the node's in-edges with this predicate."""
+        return self._in.get(node, {}).get(predicate, {}).keys()
+
+    def out_edges(self, node):
+        """Yield (node, predicate, target) for every out-edge of the node."""
+        for predicate, targets in self._out.get(node, {}).items():
+            for v in targets:
+                yield node, predicate, v
+
+    def in_edges(self, node):
+        """Yield (source, predicate, node) for every in-edge of the node."""
+        for predicate, sources in self._in.get(node, {}).items():
+            for u in sources:
+                yield u, predicate, node
+
+    @classmethod
+    def from_graph(cls, graph):
+        index = cls()
+        for u, v, d in graph.edges(data=True):
+            index.add_edge(u, v, d.get("predicate"))
+        return index
+
+
+def get_adjacency_index(graph) -> AdjacencyIndex:
+    """Return the graph's adjacency index, building (and caching) it on first use."""
+    index = graph.graph.get(ADJACENCY_INDEX_KEY)
+    if index is None:
+        index = AdjacencyIndex.from_graph(graph)
+        graph.graph[ADJACENCY_INDEX_KEY] = index
+    return index
@@ -0,0 +1,183 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+
+# Use the libyaml-backed loader when PyYAML was built with it (several times faster)
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+# Records parsed together (one YAML/JSON parse per batch, one pool task per batch)
+BATCH_SIZE = 256
+# Files at least this big are parsed in a process pool
+PARALLEL_MIN_BYTES = int(float(os.getenv("KG_INGEST_PARALLEL_MIN_MB", "32")) * 1e6)
+# Only the first few bad records are kept for the report; the rest are just counted
+MAX_REPORTED_BAD = 50
+
+# field -> (type, required). List fields must hold strings.
+SITUATION_SCHEMA = {
+    "situation_id": (str, False),
+    "position": (str, True),
+    "game_state": (str, True),
+    "play": (str, True),
+    "recommended_actions": (list, False),
+    "key_concepts": (list, False),
+    "explanation": (str, False),
+    "source": (str, False),
+}
+
+
+def validate_situation(record) -> list:
+    """Return the list of schema problems with one situation record (empty if it is valid)."""
+    if not isinstance(record, dict):
+        return [f"expected a mapping, got {type(record).__name__}"]
+    errors = []
+    for name, (expected, required) in SITUATION_SCHEMA.items():
+        value = record.get(name)
+        if value is None:
+            if required:
+                errors.append(f"missing '{name}'")
+        elif not isinstance(value, expected):
+            errors.append(f"'{name}' should be {expected.__name__}, got {type(value).__name__}")
+        elif expected is list and not all(isinstance(v, str) for v in value):
+            errors.append(f"'{name}' should only hold strings")
+        elif required and not value.strip():
+            errors.append(f"'{name}' is empty")
+    return errors
+
+
+@dataclass
+class IngestReport:
+    """What happened while reading a situation file."""
+    source: str
+    records: int = 0
+    loaded: int = 0
+    bad_count: int = 0
+    bad: list = field(default_factory=list)  # (line, situation_id, errors) for the first MAX_REPORTED_BAD
+
+    def add_bad(self, line, record, errors):
+        self.bad_count += 1
+        if len(self.bad) < MAX_REPORTED_BAD:
+            sid = record.get("situation_id") if isinstance(record, dict) else None
+            self.bad.append((line, sid, errors))
+
+    def log(self, logger):
+        logger.info(f"✅ Loaded {self.loaded} of {self.records} situations from {self.source}.")
+        if self.bad_count:
+            logger.warning(f"⚠️ Skipped {self.bad_count} bad situation records in {self.source}:")
+            for line, sid, errors in self.bad:
+                logger.warning(f"   line {line} ({sid or 'no id'}): {'; '.join(errors)}")
+            if self.bad_count > len(self.bad):
+                logger.warning(f"   ... and {self.bad_count - len(self.bad)} more")
+
+
+def file_format(path) -> str:
+    return "jsonl" if Path(path).suffix.lower() in JSONL_SUFFIXES else "yaml"
+
+
+def iter_yaml_chunks(path):
+    """Yield (line, text) for each top-level list item of a YAML situation file, unparsed.
+
+    Items are split on lines starting with "- ", so only one record is held at a time.
+    YAML aliases that point into another item are therefore not supported.
+    """
+    start, lines = None, []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if line.startswith("-") and line[1:2] in (" ", "\n", "\r", ""):
+                if lines:
+                    yield start, "".join(lines)
+                start, lines = line_no, [line]
+            elif lines:
+                lines.append(line)
+            elif line.strip() and not line.startswith(("#", "---", "%")):
+                raise ValueError(f"{path}:{line_no}: expected a top-level YAML list of situations")
+    if lines:
+        yield start, "".join(lines)
+
+
+def iter_jsonl_chunks(path):
+    """Yield (line, text) for each non-blank line of a JSONL situation file."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if line.strip():
+                yield line_no, line
+
+
+def _one_line(error) -> str:
+    return " ".join(str(error).split())
+
+
+def _parse_one(fmt, line, text):
+    try:
+        if fmt == "jsonl":
+            record = json.loads(text)
+        else:
+            parsed = yaml.load(text, Loader=YAML_LOADER)
+            record = parsed[0] if isinstance(parsed, list) and parsed else parsed
+    except (ValueError, yaml.YAMLError) as e:
+        return line, None, [f"unparseable: {_one_line(e)}"]
+    return line, record, validate_situation(record)
+
+
+def parse_batch(fmt, batch):
+    """Parse and validate a batch of (line, text) chunks into (line, record, errors) triples.
+
+    YAML batches are parsed in one go; if that fails, each item is parsed alone to find the bad one.
+    """
+    if fmt == "yaml":
+        try:
+            records = yaml.load("".join(text for _, text in batch), Loader=YAML_LOADER)
+        except yaml.YAMLError:
+            records = None
+        if isinstance(records, list) and len(records) == len(batch):
+            return [(line, r, validate_situation(r)) for (line, _), r in zip(batch, records)]
+    return [_parse_one(fmt, line, text) for line, text in batch]
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def default_workers(path) -> int:
+    """One process for ordinary files; a pool for files over KG_INGEST_PARALLEL_MIN_MB."""
+    if Path(path).stat().st_size < PARALLEL_MIN_BYTES:
+        return 1
+    return min(os.cpu_count() or 1, 8)
+
+
+def iter_situation_records(path, workers=None, batch_size=BATCH_SIZE):
+    """Yield (line, record, errors) for every record of a YAML or JSONL situation file, in file order.
+
+    With more than one worker, batches are parsed and validated in a process pool, with at
+    most two batches per worker in flight so memory stays bounded however large the file is.
+    """
+    fmt = file_format(path)
+    chunks = iter_jsonl_chunks(path) if fmt == "jsonl" else iter_yaml_chunks(path)
+    workers = default_workers(path) if workers is None else workers
+
+    if workers <= 1:
+        for batch in _batched(chunks, batch_size):
+            yield from parse_batch(fmt, batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in _batched(chunks, batch_size):
+            pending.append(pool.submit(parse_batch, fmt, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
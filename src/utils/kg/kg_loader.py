@@ -1,53 +1,105 @@
-import yaml
 import networkx as nx
 from pathlib import Path
+from src.utils.kg.kg_index import (
+    ADJACENCY_INDEX_KEY,
+    SAMPLER_KEY,
+    SITUATION_INDEX_KEY,
+    AdjacencyIndex,
+    add_to_situation_index,
+    situation_context_from_record,
+)
+from src.utils.kg.kg_ingest import IngestReport, iter_situation_records, validate_situation
+from src.utils.kg.kg_sampler import SituationSampler
 from src.utils.logging.logging import setup_logger
 logger = setup_logger()
 
 # Get the project root (assumes this script is in src/ or notebooks/ folder)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent  # Adjust as needed
 
-def load_kg_from_yaml(filename=None) -> nx.DiGraph:
+def resolve_kg_path(filename=None) -> Path:
+    return PROJECT_ROOT / "data/game_situations" / filename if filename else PROJECT_ROOT / "data/game_situations/batch_situations.yaml"
+
+
+def load_kg_from_file(filename=None, workers=None) -> nx.DiGraph:
+    """Build the KG from a YAML or JSONL situation file (chosen by suffix), one record at a time.
 
-    load_path = PROJECT_ROOT / "data/game_situations" / filename if filename else PROJECT_ROOT / "data/game_situations/batch_situations.yaml"
+    Bad records are logged and skipped; see iter_situation_records for `workers`.
+    """
+    load_path = resolve_kg_path(filename)
     logger.info(f"📥 Loading knowledge graph from: {load_path}")
-    
+    G, _ = build_kg_from_records(iter_situation_records(load_path, workers), source=load_path.name)
+    return G
+
+
+def load_kg_from_yaml(filename=None) -> nx.DiGraph:
+    return load_kg_from_file(filename)
+
+
+def build_kg_from_situations(situations) -> nx.DiGraph:
+    """Build the KG (and its lookup indexes) from a list of situation records."""
+    records = ((i, s, validate_situation(s)) for i, s in enumerate(situations, 1))
+    G, _ = build_kg_from_records(records)
+    return G
+
+
+def build_kg_from_records(records, source="situation list"):
+    """Build the KG from (line, record, errors) triples, adding each valid record as it arrives.
+
+    Returns the graph and an IngestReport listing the records that were skipped.
+    """
     G = nx.DiGraph()
+    situation_index = {}  # (position, game_state) -> SituationContext
+    report = IngestReport(str(source))
+
+    for line, s, errors in records:
+        report.records += 1
+        if errors:
+            report.add_bad(line, s, errors)
+            continue
+        add_situation(G, s, situation_index)
+        report.loaded += 1
 
-    with open(load_path, "r") as f:
-        situations = yaml.safe_load(f)
-        logger.info(f"✅ Loaded {len(situations)} situations from YAML file.")
-        logger.debug(f"Situations: {situations}")
-
-    for s in situations:
-        sid = s.get("situation_id", "unknown_id")
-        position = s["position"]
-        game_state = s["game_state"]
-        play = s["play"]
-        actions = s.get("recommended_actions", [])
-        concepts = s.get("key_concepts", [])
-        explanation = s.get("explanation", "")
-        source = s.get("source", "llm") # Default to "llm" if not provided
-
-        # Core structure
-        G.add_edge(position, game_state, predicate="hasResponsibilityIn", source=source)
-        G.add_edge(game_state, play, predicate="triggers", source=source)
-
-        # Play-related edges
-        for i, a in enumerate(actions):
-            G.add_edge(play, a, predicate="suggests", source=source, order=i)
-
-        for c in concepts:
-            G.add_edge(play, c, predicate="requiresUnderstandingOf", source=source)
-
-        # Set explanation on the play node
-        if "explanation" in s:
-            G.nodes[play]["explanation"] = explanation
-        
-        # Attach source of the situation
-        G.nodes[play]["source"] = source
-
-        logger.debug(f"✅ Loaded situation: {sid}")
+    G.graph[SITUATION_INDEX_KEY] = situation_index
+    G.graph[ADJACENCY_INDEX_KEY] = AdjacencyIndex.from_graph(G)
+    G.graph[SAMPLER_KEY] = SituationSampler.from_situation_index(situation_index)
 
+    report.log(logger)
+    logger.info(f"✅ Indexed {len(situation_index)} situations")
     logger.info(f"✅ Graph loaded with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
-    return G
+    return G, report
+
+
+def add_situation(G, s, situation_index):
+    """Add one situation record to the graph and the situation index."""
+    sid = s.get("situation_id", "unknown_id")
+    position = s["position"]
+    game_state = s["game_state"]
+    play = s["play"]
+    actions = s.get("recommended_actions", [])
+    concepts = s.get("key_concepts", [])
+    explanation = s.get("explanation", "")
+    source = s.get("source", "llm") # Default to "llm" if not provided
+
+    # Core structure
+    G.add_edge(position, game_state, predicate="hasResponsibilityIn", source=source)
+    G.add_edge(game_state, play, predicate="triggers", source=source)
+
+    # Play-related edges
+    for i, a in enumerate(actions):
+        G.add_edge(play, a, predicate="suggests", source=source, order=i)
+
+    for c in concepts:
+        G.add_edge(play, c, predicate="requiresUnderstandingOf", source=source)
+
+    # Set explanation on the play node
+    if "explanation" in s:
+        G.nodes[play]["explanation"] = explanation
+
+    # Attach source of the situation
+    G.nodes[play]["source"] = source
+
+    # Index the situation so lookups don't have to walk the graph
+    if not add_to_situation_index(situation_index, situation_context_from_record(s)):
+        logger.debug("⚠️ Duplicate situation for (%s, %s) in %s; keeping the first one.", position, game_state, sid)
+
+    logger.debug("✅ Loaded situation: %s", sid)
@@ -1,9 +1,20 @@
 import random
 
-def get_random_situation(graph):
+from src.utils.kg.kg_sampler import get_situation_sampler
+
+
+def iter_situations(graph):
+    """Yield every (position, game_state) pair linked by a hasResponsibilityIn edge."""
+    for u, v, d in graph.edges(data=True):
+        if d.get("predicate") == "hasResponsibilityIn":
+            yield u, v
+
+
+def get_random_situation(graph, rng=random):
     """Return a random (position, game_state) pair based on KG edges."""
-    edges = [
-        (u, v) for u, v, d in graph.edges(data=True)
-        if d.get("predicate") == "hasResponsibilityIn"
-    ]
-    return random.choice(edges)  # returns (position, game_state)
+    sampler = get_situation_sampler(graph)
+    if sampler is not None:
+        return sampler.situations[sampler.uniform(rng)]
+    # Graphs built without the sampler: scan the edges
+    edges = list(iter_situations(graph))
+    return rng.choice(edges)  # returns (position, game_state)
@@ -0,0 +1,239 @@
+import random
+from array import array
+from collections.abc import Sequence
+
+from src.utils.kg.kg_index import SAMPLER_KEY
+
+# Adaptive weights: how much a struggled concept pulls its situations forward, and how far
+# a situation drops back after the player answers it correctly (or just saw it)
+FOCUS = 0.6
+CORRECT_FACTOR = 0.25
+SEEN_FACTOR = 0.5
+STRUGGLE_STEP = 1.0
+CONCEPT_DECAY = 0.5
+
+
+class AliasTable:
+    """Vose's alias method: O(n) to build from fixed weights, O(1) per weighted draw."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+        scaled = [w * n / total for w in weights]
+        self._n = n
+        self._prob = array("d", [1.0]) * n
+        self._alias = array("l", range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def __len__(self):
+        return self._n
+
+    def draw(self, rng=random) -> int:
+        u = rng.random() * self._n
+        i = int(u)
+        return i if u - i < self._prob[i] else self._alias[i]
+
+
+class FenwickTree:
+    """Weights with O(log n) updates and O(log n) draws proportional to weight."""
+
+    def __init__(self, weights):
+        self._n = len(weights)
+        self._weights = array("d", weights)
+        self._tree = array("d", [0.0]) + array("d", weights)
+        for i in range(1, self._n + 1):
+            j = i + (i & -i)
+            if j <= self._n:
+                self._tree[j] += self._tree[i]
+        self._top = 1 << max(0, self._n.bit_length() - 1)
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i) -> float:
+        return self._weights[i]
+
+    def __setitem__(self, i, weight):
+        delta = weight - self._weights[i]
+        self._weights[i] = weight
+        i += 1
+        while i <= self._n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def total(self) -> float:
+        total, i = 0.0, self._n
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def draw(self, rng=random):
+        """Index drawn with probability weight / total, or None if every weight is zero."""
+        target = rng.random() * self.total()
+        if target <= 0:
+            return None
+        pos, mask = 0, self._top
+        while mask:
+            nxt = pos + mask
+            if nxt <= self._n and self._tree[nxt] <= target:
+                target -= self._tree[nxt]
+                pos = nxt
+            mask >>= 1
+        return min(pos, self._n - 1)
+
+
+class SituationSampler:
+    """The KG's (position, game_state) situations in a flat list, for O(1) random draws.
+
+    Built once per KG (see build_kg_from_records). Also keeps, per concept, the ids of the
+    situations that teach it, which the adaptive per-player samplers draw from.
+    """
+
+    def __init__(self, situations, concepts=None, by_concept=None, ids=None):
+        # Sequences (e.g. views of a shared KG file) are used as they are, anything else is copied
+        self.situations = situations if isinstance(situations, Sequence) else list(situations)
+        if concepts is None:
+            concepts = [()] * len(self.situations)
+        self.concepts = concepts if isinstance(concepts, Sequence) else list(concepts)
+        self.by_concept = by_concept  # concept -> array of situation ids
+        if by_concept is None:
+            self.by_concept = {}
+            for i, situation_concepts in enumerate(self.concepts):
+                for c in situation_concepts:
+                    self.by_concept.setdefault(c, array("l")).append(i)
+        self._balanced = None
+        self._ids = ids
+
+    @property
+    def ids(self):
+        """situation -> id, built on first use (only the adaptive samplers need it)."""
+        if self._ids is None:
+            self._ids = {s: i for i, s in enumerate(self.situations)}
+        return self._ids
+
+    @classmethod
+    def from_situation_index(cls, situation_index):
+        return cls(situation_index.keys(), (s.key_concepts for s in situation_index.values()))
+
+    def __len__(self):
+        return len(self.situations)
+
+    def uniform(self, rng=random, exclude=()):
+        """A uniformly random situation id, avoiding the ids in exclude where possible."""
+        n = len(self.situations)
+        if n == 0:
+            raise IndexError("No situations to sample from")
+        if len(exclude) >= n:
+            exclude = ()
+        for _ in range(32):
+            i = int(rng.random() * n)
+            if i not in exclude:
+                return i
+        return rng.choice([i for i in range(n) if i not in exclude])
+
+    def weighted(self, table: AliasTable, rng=random, exclude=()):
+        """A situation id drawn from an alias table over this sampler's situations."""
+        if len(exclude) >= len(self.situations):
+            exclude = ()
+        for _ in range(32):
+            i = table.draw(rng)
+            if i not in exclude:
+                return i
+        return self.uniform(rng, exclude)
+
+    def balanced_table(self) -> AliasTable:
+        """Alias table giving every position the same chance, however many situations it has."""
+        if self._balanced is None:
+            per_position = {}
+            for position, _ in self.situations:
+                per_position[position] = per_position.get(position, 0) + 1
+            self._balanced = AliasTable([1.0 / per_position[position] for position, _ in self.situations])
+        return self._balanced
+
+
+class AdaptiveSampler:
+    """Per-player draws that favour the player's struggled concepts and skip what they just got right.
+
+    Two Fenwick trees hold the weights: one per situation (1.0, cut to CORRECT_FACTOR after
+    a correct answer, SEEN_FACTOR for situations in the recent history, 0 once played in
+    the current game) and one per concept (the player's weakness in it). With probability
+    FOCUS (less while the total weakness is under one struggle) a draw picks a weak concept,
+    then one of its situations (accepted in proportion to that situation's weight);
+    otherwise it draws from the situation weights. Each result updates only the answered
+    situation and its concepts, in O(log n) each.
+    """
+
+    def __init__(self, sampler: SituationSampler, struggled=(), recent=()):
+        self.sampler = sampler
+        self._concept_ids = {c: i for i, c in enumerate(sampler.by_concept)}
+        self._concept_names = list(sampler.by_concept)
+        self._situation_weights = FenwickTree([1.0] * len(sampler))
+        self._concept_weights = FenwickTree([0.0] * len(self._concept_ids))
+        for c in struggled:
+            if c in self._concept_ids:
+                self._concept_weights[self._concept_ids[c]] = STRUGGLE_STEP
+        for situation in recent:
+            i = sampler.ids.get(situation)
+            if i is not None:
+                self._situation_weights[i] = SEEN_FACTOR
+        self._game = None
+        self._played = {}  # situation id -> weight before it was played this game
+
+    def start_game(self, game_id):
+        """Forget the previous game's played situations (restoring their weights)."""
+        if game_id != self._game:
+            self._restore_played()
+            self._game = game_id
+
+    def _restore_played(self):
+        for i, weight in self._played.items():
+            self._situation_weights[i] = weight
+        self._played = {}
+
+    def draw(self, rng=random) -> int:
+        weights = self._situation_weights
+        weakness = self._concept_weights.total()
+        if weakness > 0 and rng.random() < FOCUS * min(1.0, weakness / STRUGGLE_STEP):
+            concept = self._concept_names[self._concept_weights.draw(rng)]
+            ids = self.sampler.by_concept[concept]
+            for _ in range(8):
+                i = int(ids[int(rng.random() * len(ids))])
+                if rng.random() < weights[i]:
+                    return i
+        i = weights.draw(rng)
+        if i is None:  # every situation played this game: allow repeats again
+            self._restore_played()
+            i = weights.draw(rng)
+        return i
+
+    def mark_played(self, i):
+        if self._game is not None and i not in self._played:
+            self._played[i] = self._situation_weights[i]
+            self._situation_weights[i] = 0.0
+
+    def record(self, i, correct: bool):
+        """Update the weights after the player answered situation i."""
+        weight = CORRECT_FACTOR if correct else 1.0
+        if i in self._played:
+            self._played[i] = weight  # applied when the game ends
+        else:
+            self._situation_weights[i] = weight
+        for c in self.sampler.concepts[i]:
+            j = self._concept_ids[c]
+            current = self._concept_weights[j]
+            self._concept_weights[j] = current * CONCEPT_DECAY if correct else current + STRUGGLE_STEP
+
+
+def get_situation_sampler(graph):
+    """Return the sampler attached to the graph, or None if it was built without one."""
+    return graph.graph.get(SAMPLER_KEY)
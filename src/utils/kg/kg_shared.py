@@ -0,0 +1,406 @@
+"""One compiled KG file, memory-mapped read-only by every worker process.
+
+    python -m src.utils.kg.kg_shared [situations file] [--dir data/kg_shared]   # publish before starting workers
+
+A published KG is a `kg-<version>-<hash>.kgmap` file in the shared directory plus a
+`current` pointer file naming it. The .kgmap file holds everything a worker needs as
+flat arrays: the CompactKG (names, CSR adjacency, attribute columns and string tables,
+with their lookup hashes), the situation index, the per-concept situation lists of the
+sampler, the rule-based questions of every situation and the graph layout. Workers map
+it with numpy (zero copy), so the pages are shared between processes through the page
+cache and only what each process creates on top of them is private.
+
+Publishing writes the new file and then atomically replaces the pointer. Workers poll
+the pointer (KGHolder's watcher) and map the new file when it changes. Whoever finds
+the published file stale rebuilds it under an exclusive file lock, so N workers starting
+together build the KG once.
+"""
+import argparse
+import fcntl
+import json
+import mmap
+import os
+import struct
+import time
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from src.models.socratic_engine import generate_question
+from src.utils.kg.kg_compact import AttributeColumn, CompactKG, PredicateCSR, StringTable
+from src.utils.kg.kg_index import (
+    LAYOUT_KEY,
+    QUESTIONS_KEY,
+    SAMPLER_KEY,
+    SITUATION_INDEX_KEY,
+    SituationContext,
+    get_situation_index,
+)
+from src.utils.kg.kg_loader import PROJECT_ROOT, resolve_kg_path
+from src.utils.kg.kg_sampler import SituationSampler
+from src.utils.kg.kg_snapshot import hash_file, load_kg
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+DEFAULT_SHARED_DIR = PROJECT_ROOT / "data/kg_shared"
+MAGIC = b"KGSHARE1"
+SCHEMA_VERSION = 1
+ALIGN = 64
+POINTER_NAME = "current"
+LOCK_NAME = ".publish.lock"
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _csr(lists, dtype=np.int32):
+    """(row pointers, flat values) for a list of lists."""
+    ptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(values) for values in lists], out=ptr[1:])
+    flat = np.fromiter((v for values in lists for v in values), dtype=dtype, count=int(ptr[-1]))
+    return ptr, flat
+
+
+# --- writing ---
+
+def write_kg_file(graph, path, source_hash, version):
+    """Compile graph (networkx or CompactKG, with its situation index) into a shareable file."""
+    from src.utils.output.graph_viz import compute_layout  # pyvis is only needed when publishing
+
+    compact = graph if isinstance(graph, CompactKG) else CompactKG.from_networkx(graph)
+    situation_index = get_situation_index(compact) or {}
+    strings = list(compact.strings)
+    string_ids = {s: i for i, s in enumerate(strings)}
+
+    def intern(s):
+        if s is None:
+            return -1
+        i = string_ids.get(s)
+        if i is None:
+            i = string_ids[s] = len(strings)
+            strings.append(s)
+        return i
+
+    arrays, meta = {}, {"predicates": compact.predicates, "csr": [], "node_attrs": {}}
+
+    def add_table(name, table):
+        hashes, by_hash = table.lookup_arrays()
+        arrays.update({f"{name}.data": np.frombuffer(bytes(table.data), dtype=np.uint8),
+                       f"{name}.offsets": table.offsets, f"{name}.hashes": hashes, f"{name}.by_hash": by_hash})
+
+    def add_column(prefix, column):
+        if column.kind == "obj":
+            raise ValueError(f"{prefix} holds values that are neither strings nor ints; it can't be shared")
+        arrays[prefix] = column.values
+        return column.kind
+
+    for k, predicate in enumerate(compact.predicates):
+        csr = compact.csr[predicate]
+        for part in ("out_ptr", "out_idx", "in_ptr", "in_idx"):
+            arrays[f"csr.{k}.{part}"] = getattr(csr, part)
+        meta["csr"].append({name: add_column(f"csr.{k}.attr.{name}", column) for name, column in csr.attrs.items()})
+    for name, column in compact._node_attrs.items():
+        meta["node_attrs"][name] = add_column(f"node.{name}", column)
+
+    # Situation index, in the sampler's order
+    contexts = list(situation_index.values())
+    for field in ("position", "game_state", "play", "explanation", "situation_id"):
+        arrays[f"sit.{field}"] = np.array([intern(getattr(c, field)) for c in contexts], dtype=np.int32)
+    arrays["sit.actions_ptr"], arrays["sit.actions"] = _csr([[intern(a) for a in c.recommended_actions]
+                                                            for c in contexts])
+    arrays["sit.concepts_ptr"], arrays["sit.concepts"] = _csr([[intern(a) for a in c.key_concepts]
+                                                              for c in contexts])
+    arrays["sit.questions_ptr"], arrays["sit.questions"] = _csr([
+        [intern(q) for q in generate_question(c.position, c.game_state, compact)] for c in contexts])
+    keys = arrays["sit.position"].astype(np.int64) * (1 << 32) + arrays["sit.game_state"]
+    arrays["sit.key_rows"] = np.argsort(keys, kind="stable").astype(np.int32)
+    arrays["sit.keys"] = keys[arrays["sit.key_rows"]]
+
+    # Sampler: situations teaching each concept
+    by_concept = {}
+    for i, c in enumerate(contexts):
+        for concept in c.key_concepts:
+            by_concept.setdefault(intern(concept), []).append(i)
+    arrays["concept.ids"] = np.array(list(by_concept), dtype=np.int32)
+    arrays["concept.ptr"], arrays["concept.situations"] = _csr(list(by_concept.values()))
+
+    layout = compute_layout(compact)
+    arrays["layout.layer"] = np.array([layout[n][0] for n in compact.names], dtype=np.int8)
+    arrays["layout.row"] = np.array([layout[n][1] for n in compact.names], dtype=np.int32)
+
+    add_table("names", compact.names)
+    add_table("strings", StringTable.from_strings(strings))
+
+    directory, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        directory[name] = [array.dtype.str, offset, len(array)]
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"schema_version": SCHEMA_VERSION, "source_hash": source_hash, "version": version,
+                         "arrays": directory, **meta}).encode()
+    base = _aligned(len(MAGIC) + 8 + len(header))
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(base + directory[name][1])
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+# --- reading ---
+
+class MappedSituationIndex(Mapping):
+    """(position, game_state) -> SituationContext, read from the shared file on each lookup."""
+
+    def __init__(self, strings, arrays):
+        self._strings = strings
+        self._a = arrays
+        self.rows = SituationRows(self)
+
+    def row(self, key) -> int:
+        position, game_state = key
+        p, g = self._strings.id(position), self._strings.id(game_state)
+        if p < 0 or g < 0:
+            return -1
+        k = p * (1 << 32) + g
+        keys = self._a["sit.keys"]
+        j = int(keys.searchsorted(k))
+        return int(self._a["sit.key_rows"][j]) if j < len(keys) and keys[j] == k else -1
+
+    def _text(self, field, i):
+        s = int(self._a[field][i])
+        return self._strings[s] if s >= 0 else None
+
+    def _list(self, field, i):
+        ptr = self._a[f"{field}_ptr"]
+        return tuple(self._strings[s] for s in self._a[field][ptr[i]:ptr[i + 1]].tolist())
+
+    def key(self, i):
+        return self._text("sit.position", i), self._text("sit.game_state", i)
+
+    def context(self, i) -> SituationContext:
+        return SituationContext(
+            position=self._text("sit.position", i),
+            game_state=self._text("sit.game_state", i),
+            play=self._text("sit.play", i),
+            recommended_actions=self._list("sit.actions", i),
+            key_concepts=self._list("sit.concepts", i),
+            explanation=self._text("sit.explanation", i),
+            situation_id=self._text("sit.situation_id", i),
+        )
+
+    def __getitem__(self, key):
+        i = self.row(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.context(i)
+
+    def __contains__(self, key):
+        return self.row(key) >= 0
+
+    def __iter__(self):
+        return (self.key(i) for i in range(len(self)))
+
+    def __len__(self):
+        return len(self._a["sit.position"])
+
+    def questions(self, key):
+        """The situation's rule-based questions, or None if it is not in the index."""
+        i = self.row(key)
+        return list(self._list("sit.questions", i)) if i >= 0 else None
+
+
+class SituationRows(Mapping):
+    """(position, game_state) -> sampler id, without building a dict of every situation."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getitem__(self, key):
+        i = self._index.row(key)
+        if i < 0:
+            raise KeyError(key)
+        return i
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class _SituationColumn(Sequence):
+    """A per-situation view (keys or concept tuples) for the sampler."""
+
+    def __init__(self, index, get):
+        self._index = index
+        self._get = get
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(len(self))[i]]
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return self._get(i % len(self))
+
+    def __len__(self):
+        return len(self._index)
+
+
+class _Questions:
+    def __init__(self, index):
+        self.get = index.questions
+
+
+class MappedLayout(Mapping):
+    """node -> (layer, row), as compute_layout returns it."""
+
+    def __init__(self, kg, layer, row):
+        self._kg = kg
+        self._layer = layer
+        self._row = row
+
+    def __getitem__(self, node):
+        i = self._kg.node_id(node)
+        if i < 0:
+            raise KeyError(node)
+        return int(self._layer[i]), int(self._row[i])
+
+    def __iter__(self):
+        return iter(self._kg.names)
+
+    def __len__(self):
+        return len(self._kg.names)
+
+
+def open_kg_file(path) -> CompactKG:
+    """Map a file written by write_kg_file; the arrays are read-only views of the mapping."""
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapping[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a shared KG file")
+    (header_size,) = struct.unpack("<Q", mapping[len(MAGIC):len(MAGIC) + 8])
+    header = json.loads(mapping[len(MAGIC) + 8:len(MAGIC) + 8 + header_size])
+    if header["schema_version"] != SCHEMA_VERSION:
+        raise ValueError(f"{path} has schema {header['schema_version']}, expected {SCHEMA_VERSION}")
+    base = _aligned(len(MAGIC) + 8 + header_size)
+    view = memoryview(mapping)
+    arrays = {name: np.frombuffer(mapping, dtype=np.dtype(dtype), count=length, offset=base + offset)
+              for name, (dtype, offset, length) in header["arrays"].items()}
+
+    def table(name):
+        _, offset, length = header["arrays"][f"{name}.data"]
+        return StringTable(view[base + offset:base + offset + length], arrays[f"{name}.offsets"],
+                           arrays[f"{name}.hashes"], arrays[f"{name}.by_hash"])
+
+    names, strings = table("names"), table("strings")
+    csr = {}
+    for k, (predicate, attr_kinds) in enumerate(zip(header["predicates"], header["csr"])):
+        attrs = {name: AttributeColumn(kind, arrays[f"csr.{k}.attr.{name}"]) for name, kind in attr_kinds.items()}
+        csr[predicate] = PredicateCSR(*(arrays[f"csr.{k}.{part}"] for part in ("out_ptr", "out_idx", "in_ptr", "in_idx")),
+                                      attrs)
+    node_attrs = {name: AttributeColumn(kind, arrays[f"node.{name}"]) for name, kind in header["node_attrs"].items()}
+
+    index = MappedSituationIndex(strings, arrays)
+    concept_ptr, concept_situations = arrays["concept.ptr"], arrays["concept.situations"]
+    by_concept = {strings[c]: concept_situations[concept_ptr[j]:concept_ptr[j + 1]]
+                  for j, c in enumerate(arrays["concept.ids"].tolist())}
+    sampler = SituationSampler(_SituationColumn(index, index.key),
+                               _SituationColumn(index, lambda i: index._list("sit.concepts", i)),
+                               by_concept=by_concept, ids=index.rows)
+
+    kg = CompactKG(names, strings, header["predicates"], csr, node_attrs,
+                   {SITUATION_INDEX_KEY: index, SAMPLER_KEY: sampler, QUESTIONS_KEY: _Questions(index)})
+    kg.graph[LAYOUT_KEY] = MappedLayout(kg, arrays["layout.layer"], arrays["layout.row"])
+    kg.graph["shared_file"] = {"path": str(path), "version": header["version"], "source_hash": header["source_hash"]}
+    return kg
+
+
+# --- publishing ---
+
+def read_pointer(shared_dir):
+    """The published version ({"file", "version", "source_hash", ...}), or None if there is none."""
+    try:
+        return json.loads((Path(shared_dir) / POINTER_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(pointer, shared_dir, source_hash):
+    return (pointer is not None and pointer.get("source_hash") == source_hash
+            and (Path(shared_dir) / pointer["file"]).exists())
+
+
+@contextmanager
+def _publish_lock(shared_dir):
+    with open(Path(shared_dir) / LOCK_NAME, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish(graph, shared_dir, source_hash, version) -> dict:
+    """Write graph as a new .kgmap file, point `current` at it, and delete files older than the previous one.
+
+    Workers that still map a deleted file keep reading it until they move on (POSIX unlink).
+    """
+    shared_dir = Path(shared_dir)
+    name = f"kg-{version:05d}-{source_hash[:12]}.kgmap"
+    start = time.perf_counter()
+    write_kg_file(graph, shared_dir / name, source_hash, version)
+    previous = read_pointer(shared_dir)
+    pointer = {"file": name, "version": version, "source_hash": source_hash, "published_at": time.time()}
+    tmp_path = shared_dir / f"{POINTER_NAME}.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps(pointer))
+    os.replace(tmp_path, shared_dir / POINTER_NAME)
+
+    keep = {name, previous["file"]} if previous else {name}
+    for old in shared_dir.glob("kg-*.kgmap"):
+        if old.name not in keep:
+            old.unlink(missing_ok=True)
+    logger.info(f"📣 Published shared KG {name} in {time.perf_counter() - start:.2f}s")
+    return pointer
+
+
+def ensure_published(filename=None, shared_dir=DEFAULT_SHARED_DIR, build=load_kg) -> dict:
+    """The pointer to a shared KG built from the current source file, building it if needed.
+
+    Only one process builds at a time; the others wait on the lock and then find it published.
+    """
+    shared_dir = Path(shared_dir)
+    shared_dir.mkdir(parents=True, exist_ok=True)
+    source_hash = hash_file(resolve_kg_path(filename))
+    pointer = read_pointer(shared_dir)
+    if _is_fresh(pointer, shared_dir, source_hash):
+        return pointer
+    with _publish_lock(shared_dir):
+        pointer = read_pointer(shared_dir)
+        if _is_fresh(pointer, shared_dir, source_hash):
+            return pointer
+        graph = build(filename=filename)
+        return publish(graph, shared_dir, source_hash, version=(pointer or {}).get("version", 0) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("filename", nargs="?", help="situations file (default: the app's KG_FILENAME)")
+    parser.add_argument("--dir", type=Path, default=Path(os.getenv("KG_SHARED_DIR") or DEFAULT_SHARED_DIR))
+    args = parser.parse_args()
+    pointer = ensure_published(args.filename or os.getenv("KG_FILENAME"), args.dir)
+    print(json.dumps(pointer, indent=2))
+
+
+if __name__ == "__main__":
+    main()
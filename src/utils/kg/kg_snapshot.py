@@ -0,0 +1,98 @@
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+
+import networkx as nx
+
+from src.utils.kg.kg_loader import load_kg_from_file, resolve_kg_path
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+# Bump whenever the graph layout or the indexes in graph.graph change shape,
+# so snapshots written by older code are rebuilt instead of loaded.
+SNAPSHOT_SCHEMA_VERSION = 2
+SNAPSHOT_SUFFIX = ".kgsnap"
+
+
+def snapshot_path_for(source_path) -> Path:
+    """The snapshot lives next to its source file, e.g. batch_situations.yaml.kgsnap."""
+    source_path = Path(source_path)
+    return source_path.with_name(source_path.name + SNAPSHOT_SUFFIX)
+
+
+def hash_file(path, chunk_size=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_snapshot(graph: nx.DiGraph, snapshot_path, source_hash: str):
+    """Write the compiled graph (with its indexes) to disk.
+
+    The file holds two pickles: a small header (schema version + source hash)
+    and the graph, so a stale snapshot is rejected without unpickling the graph.
+    Written to a temp file and renamed so readers never see a partial snapshot.
+    """
+    snapshot_path = Path(snapshot_path)
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    header = {"schema_version": SNAPSHOT_SCHEMA_VERSION, "source_hash": source_hash}
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_snapshot(snapshot_path, source_hash: str):
+    """Return the snapshot's graph, or None if it is missing, stale or unreadable.
+
+    Snapshots are only ever read from files this app wrote next to its own data.
+    """
+    snapshot_path = Path(snapshot_path)
+    if not snapshot_path.exists():
+        return None
+    try:
+        with open(snapshot_path, "rb") as f:
+            header = pickle.load(f)
+            if header.get("schema_version") != SNAPSHOT_SCHEMA_VERSION or header.get("source_hash") != source_hash:
+                logger.info(f"♻️ Snapshot {snapshot_path.name} is stale, rebuilding.")
+                return None
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read snapshot {snapshot_path}: {e}")
+        return None
+
+
+def load_kg(filename=None, use_snapshot=True) -> nx.DiGraph:
+    """Load the KG from its compiled snapshot if it matches the source file, else from the source (YAML or JSONL).
+
+    A fresh snapshot is written after every rebuild from source.
+    """
+    source_path = resolve_kg_path(filename)
+    start = time.perf_counter()
+
+    if not use_snapshot:
+        return load_kg_from_file(source_path)
+
+    source_hash = hash_file(source_path)
+    snapshot_path = snapshot_path_for(source_path)
+
+    graph = load_snapshot(snapshot_path, source_hash)
+    if graph is not None:
+        logger.info(f"⚡ Loaded knowledge graph snapshot {snapshot_path.name} in {time.perf_counter() - start:.2f}s")
+        return graph
+
+    graph = load_kg_from_file(source_path)
+    try:
+        save_snapshot(graph, snapshot_path, source_hash)
+        logger.info(f"💾 Wrote knowledge graph snapshot {snapshot_path.name}")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write snapshot {snapshot_path}: {e}")
+    logger.info(f"✅ Built knowledge graph from source in {time.perf_counter() - start:.2f}s")
+    return graph
@@ -1,64 +1,234 @@
-import os
+import atexit
 import json
+import os
+import queue
+import threading
+import time
+import uuid
 from datetime import datetime
 from pathlib import Path
 
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
 # Get the project root (assumes this script is in src/ or notebooks/ folder)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent  # Adjust as needed
 LOG_DIR = PROJECT_ROOT / "logs/conversations"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-def log_conversation_turn(position: str, game_state: str, turn_data: dict, recommended_actions: list[str]):
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = LOG_DIR / f"{timestamp}.jsonl"
+# Name of the file in LOG_DIR holding the name of the segment being written
+LATEST_POINTER = "LATEST"
+
+
+class ConversationLogWriter:
+    """Appends conversation records to rotating JSONL segments from a background thread.
+
+    Callers only put the record on a bounded queue; when the queue is full the record
+    is dropped (and counted) rather than blocking the caller. A segment is closed
+    and a new one started once it reaches `max_bytes` or is `max_seconds` old.
+    Segment names carry the UTC start time, the process id and a sequence number, so
+    processes never share a file. LATEST always names the segment being written.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, max_bytes=16 * 1024 * 1024, max_seconds=3600.0,
+                 queue_size=10_000, batch_size=256):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.batch_size = batch_size
+        self.stats = {"written": 0, "dropped": 0, "segments": 0}
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = 0.0
+        self._seq = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="convo-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(float(os.getenv("CONVO_LOG_MAX_MB", "16")) * 1024 * 1024),
+            max_seconds=float(os.getenv("CONVO_LOG_MAX_SECONDS", "3600")),
+            queue_size=int(os.getenv("CONVO_LOG_QUEUE_SIZE", "10000")),
+        )
+
+    def write(self, record: dict) -> bool:
+        """Queue one record; returns False if it was dropped because the queue is full or the writer is closed."""
+        if self._closed:
+            self.stats["dropped"] += 1
+            return False
+        # Serialised now so later changes to the caller's lists can't race the writer
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.stats["dropped"] += 1
+            if self.stats["dropped"] == 1 or self.stats["dropped"] % 1000 == 0:
+                logger.warning(f"⚠️ Conversation log queue full; {self.stats['dropped']} records dropped so far")
+            return False
+
+    def flush(self):
+        """Block until every queued record is on disk, or return once the writer thread has stopped."""
+        # Not Queue.join(): a record queued behind close() is never marked done
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks and self._thread.is_alive():
+                self._queue.all_tasks_done.wait(0.1)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def current_segment(self):
+        return Path(self._file.name) if self._file else None
+
+    # --- writer thread ---
+
+    def _run(self):
+        while True:
+            lines = [self._queue.get()]
+            while len(lines) < self.batch_size:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in lines
+            try:
+                self._write([line for line in lines if line is not None])
+            except Exception as e:
+                logger.error(f"💥 Conversation log write failed: {e}")
+            for _ in lines:
+                self._queue.task_done()
+            if stop:
+                if self._file:
+                    self._file.close()
+                return
+
+    def _write(self, lines):
+        if not lines:
+            return
+        if self._file is None or self._file.tell() >= self.max_bytes \
+                or time.monotonic() - self._opened_at >= self.max_seconds:
+            self._rotate()
+        self._file.write("".join(lines))
+        self._file.flush()
+        self.stats["written"] += len(lines)
 
-    entry = {
-        "timestamp": timestamp,
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        self._seq += 1
+        name = f"{datetime.utcnow():%Y%m%d_%H%M%S}_{os.getpid()}_{self._seq:04d}.jsonl"
+        self._file = open(self.log_dir / name, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+        self.stats["segments"] += 1
+
+        pointer = self.log_dir / LATEST_POINTER
+        tmp = pointer.with_name(f"{LATEST_POINTER}.{os.getpid()}.tmp")
+        tmp.write_text(name)
+        os.replace(tmp, pointer)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> ConversationLogWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ConversationLogWriter.from_env()
+        return _writer
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def log_conversation_turn(position: str, game_state: str, turn_data: dict, recommended_actions: list[str],
+                          session_id: str = None) -> str:
+    session_id = session_id or new_session_id()
+    get_log_writer().write({
+        "type": "turn",
+        "session_id": session_id,
+        "timestamp": datetime.utcnow().isoformat(),
         "position": position,
         "game_state": game_state,
         "recommended_actions": recommended_actions,
         **turn_data  # includes turn number, question, answer, feedback, eval
-    }
+    })
+    return session_id
+
+
+def latest_segment(log_dir=LOG_DIR):
+    """The segment being written, from the LATEST pointer (or the newest name if it is missing)."""
+    log_dir = Path(log_dir)
+    try:
+        return log_dir / (log_dir / LATEST_POINTER).read_text().strip()
+    except OSError:
+        return max(log_dir.glob("*.jsonl"), default=None)
+
+
+def tail_lines(path, count, block_size=64 * 1024):
+    """Return the last `count` lines of a file, reading backwards from its end."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(0, end - block_size)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return [line.decode("utf-8") for line in data.splitlines()[-count:] if line.strip()]
 
-    with open(filename, "a") as f:
-        f.write(json.dumps(entry) + "\n")
 
 def print_latest_log(max_lines: int = 10):
-    logs = sorted(LOG_DIR.glob(f"*.jsonl"), reverse=True)
-    if not logs:
+    if _writer is not None:
+        _writer.flush()
+    latest_log = latest_segment()
+    if latest_log is None or not latest_log.exists():
         print("No logs found for player.")
         return
 
-    latest_log = logs[0]
     print(f"\n🧾 Log File: {latest_log.name}\n")
 
-    with open(latest_log) as f:
-        for i, line in enumerate(f):
-            if i >= max_lines:
-                break
-            data = json.loads(line)
-            print(f"Turn {data['turn']}:")
-            print(f"  🧠 Question: {data['question']}")
-            print(f"  🧒 Answer: {data['answer']}")
-            print(f"  ✅ Eval: {data['eval']}")
-            print(f"  🔁 Feedback: {data['feedback']}")
-            print(f"  📋 Recommended: {data['recommended_actions']}")
-            print("")
-
-
-def log_conversation_session(position: str, game_state: str, recommended_actions: list[str], conversation: list[dict], concepts: list[str], outcome: str):
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = LOG_DIR / f"{timestamp}.json"
-
-    log_data = {
-        "timestamp": timestamp,
+    for line in tail_lines(latest_log, max_lines):
+        data = json.loads(line)
+        if data.get("type") == "session":
+            print(f"Session {data['session_id'][:8]} ({data['position']}, {data['game_state']}): {data['outcome']}")
+            turns = data["conversation"]
+        else:
+            turns = [data]
+        for turn in turns:
+            print(f"Turn {turn['turn']}:")
+            print(f"  🧠 Question: {turn['question']}")
+            print(f"  🧒 Answer: {turn['answer']}")
+            print(f"  ✅ Eval: {turn['eval']}")
+            print(f"  🔁 Feedback: {turn['feedback']}")
+        print(f"  📋 Recommended: {data['recommended_actions']}")
+        print("")
+
+
+def log_conversation_session(position: str, game_state: str, recommended_actions: list[str], conversation: list[dict],
+                             concepts: list[str], outcome: str, session_id: str = None) -> str:
+    session_id = session_id or new_session_id()
+    get_log_writer().write({
+        "type": "session",
+        "session_id": session_id,
+        "timestamp": datetime.utcnow().isoformat(),
         "position": position,
         "game_state": game_state,
         "recommended_actions": recommended_actions,
         "conversation": conversation,
         "concepts": concepts,
         "outcome": outcome  # "correct" or "3 strikes"
-    }
-
-    with open(filename, "w") as f:
-        json.dump(log_data, f, indent=2)
\ No newline at end of file
+    })
+    return session_id
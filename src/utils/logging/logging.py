@@ -1,22 +1,105 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
+import queue
+from datetime import datetime, timezone
 
-def setup_logger(name="socratic_coach"):
+APP_LOGGER = "socratic_coach"
+
+# Set per request by the server middleware; copied onto every record logged while handling it
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, message, request id (and exception text)."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves JSON formatting to the listener thread.
+
+    The caller's thread only merges the %-args into the message (so later changes to
+    them can't leak into the log) and renders any traceback.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def resolve_log_level(level: str):
+    """The numeric level for a name such as "debug", or None if logging doesn't know it."""
+    return logging.getLevelNamesMapping().get(level.upper())
+
+
+def setup_logger(name=APP_LOGGER):
+    """Return the app logger. Records go through a queue to a listener thread that writes JSON lines.
+
+    LOG_LEVEL (default INFO) sets the level; set_log_level() changes it at runtime.
+    """
+    global _listener
     logger = logging.getLogger(name)
     if logger.handlers:  # Prevent duplicate logs
         return logger
 
-    logger.setLevel(logging.DEBUG)
+    level = os.getenv("LOG_LEVEL", "INFO")
+    resolved = resolve_log_level(level)
+    logger.setLevel(resolved if resolved is not None else logging.INFO)
 
     log_dir = "logs"
     os.makedirs(log_dir, exist_ok=True)
 
     file_handler = logging.FileHandler(os.path.join(log_dir, "app.log"))
-    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(JsonFormatter())
 
-    formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s")
-    file_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
 
-    logger.addHandler(file_handler)
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # drains the queue before exit
 
+    if resolved is None:
+        logger.warning("⚠️ Unknown LOG_LEVEL %r, using INFO", level)
     return logger
+
+
+def set_log_level(level, name=APP_LOGGER) -> str:
+    """Change the app log level (e.g. "DEBUG") at runtime; returns the new level name."""
+    logger = logging.getLogger(name)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    return logging.getLevelName(logger.level)
+
+
+def get_log_level(name=APP_LOGGER) -> str:
+    return logging.getLevelName(logging.getLogger(name).level)
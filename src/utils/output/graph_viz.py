@@ -1,35 +1,177 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from itertools import chain, count
+
 from pyvis.network import Network
-import networkx as nx
-import tempfile
-import streamlit.components.v1 as components
 
+from src.utils.kg.kg_index import LAYOUT_KEY
 from src.utils.logging.logging import setup_logger
 logger = setup_logger()
 
+# Column of each node in the layout, by the predicate of an edge pointing at it (lowest wins)
+POSITION_LAYER = 0
+TARGET_LAYERS = {"hasResponsibilityIn": 1, "triggers": 2, "suggests": 3, "requiresUnderstandingOf": 4}
+OTHER_LAYER = 5
+LAYER_SPACING = 300  # px between columns
+ROW_SPACING = 70  # px between nodes in a column
 
-def visualize_graph(graph, highlight_nodes=None):
-
-    logger.info("Visualizing the graph...")
+HIGHLIGHT_COLOR = "#ffcc00"
+NODE_COLOR = "#97c2fc"
 
-    net = Network(height="600px", width="100%", directed=True)
-    net.barnes_hut()  # for physics layout (spreading out the nodes in a nice way)
 
-    highlight_nodes = set(highlight_nodes or [])
+def compute_layout(graph) -> dict:
+    """node -> (layer, row): a left-to-right layout (positions, game states, plays, actions, concepts).
 
-    # add and color nodes
+    One pass over the edges, so it is cheap enough to precompute for every KG version.
+    Rows follow the graph's insertion order, which keeps a situation's nodes close together.
+    Graphs mapped from a shared KG file carry this layout already.
+    """
+    precomputed = graph.graph.get(LAYOUT_KEY)
+    if precomputed is not None:
+        return precomputed
+    layers = {}
+    for u, v, d in graph.edges(data=True):
+        predicate = d.get("predicate")
+        if predicate == "hasResponsibilityIn":
+            layers[u] = POSITION_LAYER
+        layer = TARGET_LAYERS.get(predicate, OTHER_LAYER)
+        if layer < layers.get(v, OTHER_LAYER + 1):
+            layers[v] = layer
+    rows = [0] * (OTHER_LAYER + 1)
+    layout = {}
     for node in graph.nodes():
-        color = "#ffcc00" if node in highlight_nodes else "#97c2fc"
-        net.add_node(node, label=node, color=color)
-    logger.info("Nodes added to the graph.")
+        layer = layers.get(node, OTHER_LAYER)
+        layout[node] = (layer, rows[layer])
+        rows[layer] += 1
+    return layout
 
-    # add edges and labels
-    for u, v, d in graph.edges(data=True):
-        label = d.get("predicate", "")
-        net.add_edge(u, v, label=label)
-    logger.info("Edges added to the graph.")
-
-    # Save to temp file and display in Streamlit
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-        net.show(tmp_file.name, notebook=False)
-        components.html(open(tmp_file.name, 'r').read(), height=600, scrolling=True)
-    logger.info("Graph visualization complete.")
+
+def ego_nodes(graph, centers, hops=2, max_nodes=150) -> list:
+    """Nodes within `hops` edges (either direction) of the centers, breadth first, at most max_nodes."""
+    seen = dict.fromkeys(c for c in centers if c in graph)
+    frontier = list(seen)
+    for _ in range(hops):
+        next_frontier = []
+        for node in frontier:
+            for neighbour in chain(graph.successors(node), graph.predecessors(node)):
+                if len(seen) >= max_nodes:
+                    return list(seen)
+                if neighbour not in seen:
+                    seen[neighbour] = None
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return list(seen)
+
+
+def subgraph_edges(graph, nodes):
+    """Edges of the graph between the given nodes, without walking the whole adjacency of hub nodes."""
+    node_set = set(nodes)
+    for u in nodes:
+        successors = graph.succ[u]
+        if len(successors) <= len(node_set):
+            candidates = (v for v in successors if v in node_set)
+        else:
+            candidates = (v for v in node_set if v in successors)
+        for v in candidates:
+            yield u, v, successors[v]
+
+
+class GraphRenderer:
+    """Renders KG neighbourhoods to pyvis HTML with fixed, precomputed positions (physics off).
+
+    Layouts are computed once per graph object (i.e. per KG version) and dropped with the
+    graph. Rendered HTML is kept in an LRU keyed by (graph, highlight set, hops, max_nodes),
+    so rerendering the same view is a dict lookup.
+    """
+
+    def __init__(self, cache_size=64, max_nodes=150, hops=2):
+        self.cache_size = cache_size
+        self.max_nodes = max_nodes
+        self.hops = hops
+        self._layouts = weakref.WeakKeyDictionary()  # graph -> (token, layout)
+        self._tokens = count(1)
+        self._html = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "layouts": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            cache_size=int(os.getenv("GRAPH_VIZ_CACHE_SIZE", "64")),
+            max_nodes=int(os.getenv("GRAPH_VIZ_MAX_NODES", "150")),
+            hops=int(os.getenv("GRAPH_VIZ_HOPS", "2")),
+        )
+
+    def layout(self, graph):
+        """(token, layout) for the graph, computing the layout on first use."""
+        with self._lock:
+            entry = self._layouts.get(graph)
+        if entry is None:
+            entry = (next(self._tokens), compute_layout(graph))
+            with self._lock:
+                entry = self._layouts.setdefault(graph, entry)
+                self.stats["layouts"] += 1
+        return entry
+
+    def render(self, graph, highlight_nodes=None, hops=None, max_nodes=None, height="600px") -> str:
+        """HTML for the neighbourhood of highlight_nodes (of the best-connected node if none are given)."""
+        hops = self.hops if hops is None else hops
+        max_nodes = max_nodes or self.max_nodes
+        highlight = frozenset(n for n in (highlight_nodes or ()) if n in graph)
+        token, layout = self.layout(graph)
+        key = (token, highlight, hops, max_nodes, height)
+        with self._lock:
+            html = self._html.get(key)
+            if html is not None:
+                self._html.move_to_end(key)
+                self.stats["hits"] += 1
+                return html
+            self.stats["misses"] += 1
+
+        centers = highlight or ([max(graph.nodes(), key=graph.degree)] if len(graph) else [])
+        nodes = ego_nodes(graph, sorted(centers, key=str), hops, max_nodes)
+        html = self._build_html(graph, nodes, highlight, layout, height)
+        logger.debug("Rendered %d of %d KG nodes around %s", len(nodes), len(graph), sorted(centers, key=str))
+
+        with self._lock:
+            self._html[key] = html
+            while len(self._html) > self.cache_size:
+                self._html.popitem(last=False)
+        return html
+
+    @staticmethod
+    def _build_html(graph, nodes, highlight, layout, height):
+        net = Network(height=height, width="100%", directed=True, cdn_resources="remote")
+        net.toggle_physics(False)
+
+        # Keep the precomputed column and row order, but close the gaps left by nodes not drawn
+        by_layer = {}
+        for node in nodes:
+            by_layer.setdefault(layout[node][0], []).append(node)
+        for layer, layer_nodes in by_layer.items():
+            layer_nodes.sort(key=lambda n: layout[n][1])
+            offset = (len(layer_nodes) - 1) * ROW_SPACING / 2
+            for row, node in enumerate(layer_nodes):
+                net.add_node(node, label=str(node), color=HIGHLIGHT_COLOR if node in highlight else NODE_COLOR,
+                             x=layer * LAYER_SPACING, y=row * ROW_SPACING - offset, physics=False)
+
+        for u, v, d in subgraph_edges(graph, nodes):
+            net.add_edge(u, v, label=d.get("predicate", ""))
+        return net.generate_html()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {**self.stats, "cached_views": len(self._html), "graphs": len(self._layouts)}
+
+
+renderer = GraphRenderer.from_env()
+
+
+def visualize_graph(graph, highlight_nodes=None, hops=None, max_nodes=None):
+    """Show the neighbourhood of highlight_nodes in Streamlit (see GraphRenderer.render)."""
+    import streamlit.components.v1 as components
+
+    components.html(renderer.render(graph, highlight_nodes, hops=hops, max_nodes=max_nodes),
+                    height=600, scrolling=True)
@@ -0,0 +1,268 @@
+"""SQLite-backed player profiles.
+
+    python -m src.utils.players.player_store import [data/players]   # import the old JSON files
+"""
+import atexit
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.logging.logging import setup_logger
+logger = setup_logger()
+
+# Get the project root (assumes this script is in src/utils/players)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+DEFAULT_PLAYER_DIR = PROJECT_ROOT / "data/players"
+DEFAULT_DB_PATH = DEFAULT_PLAYER_DIR / "players.sqlite"
+
+MASTERED = "mastered"
+STRUGGLED = "struggled"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    last_active TEXT
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    game_state TEXT,
+    position TEXT,
+    concepts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_player ON history (player, id);
+CREATE TABLE IF NOT EXISTS concepts (
+    player TEXT NOT NULL,
+    concept TEXT NOT NULL,
+    status TEXT NOT NULL,
+    since TEXT NOT NULL,
+    PRIMARY KEY (player, status, concept)
+);
+"""
+
+
+class PlayerStore:
+    """Player profiles in SQLite (WAL): an append-only history table and per-player concept sets.
+
+    Writes are write-behind: log_concepts() updates an in-memory concept cache and queues
+    rows, and a background thread commits the queue in one transaction every
+    `flush_interval` seconds or once `batch_size` rows are waiting. Reads flush first, so
+    they always see earlier writes. Each answer costs a few row inserts however long the
+    player's history is. Updates for one player are serialised by a per-player lock.
+    Rows still queued when the process is killed (not exited) are lost.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, flush_interval=0.5, batch_size=500):
+        self.db_path = Path(db_path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+        self._pending = []  # (sql, params) rows waiting for the next commit
+        self._pending_lock = threading.Lock()
+        self._concepts = {}  # (player, status) -> set of concepts (cache of the concepts table)
+        self._player_locks = {}
+        self._player_locks_lock = threading.Lock()
+        self.stats = {"answers": 0, "flushes": 0, "rows_written": 0}
+
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._writer = threading.Thread(target=self._write_behind, name="player-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- writes ---
+
+    def log_concepts(self, name, game_state, position, concepts, struggled=(), timestamp=None, mastered=True):
+        """Record one answer: append it to the history and add its concepts to the player's sets.
+
+        With mastered=False the concepts only go into the history. Returns the concepts
+        that were newly mastered.
+        """
+        now = timestamp or datetime.utcnow().isoformat()
+        with self._player_lock(name):
+            new_mastered = self._add_concepts(name, MASTERED, concepts, now) if mastered else []
+            self._add_concepts(name, STRUGGLED, struggled, now)
+            self._queue(
+                ("INSERT INTO history (player, timestamp, game_state, position, concepts) VALUES (?, ?, ?, ?, ?)",
+                 (name, now, game_state, position, json.dumps(list(concepts)))),
+                ("INSERT INTO players (name, last_active) VALUES (?, ?) "
+                 "ON CONFLICT(name) DO UPDATE SET last_active = excluded.last_active",
+                 (name, now)),
+            )
+        self.stats["answers"] += 1
+        return new_mastered
+
+    def log_result(self, name, game_state, position, concepts, correct: bool):
+        """Record a graded answer: its concepts are mastered if it was correct, else struggled."""
+        return self.log_concepts(name, game_state, position, concepts, struggled=() if correct else concepts,
+                                 mastered=correct)
+
+    def touch(self, name):
+        """Mark the player active now."""
+        self._queue(("INSERT INTO players (name, last_active) VALUES (?, ?) "
+                     "ON CONFLICT(name) DO UPDATE SET last_active = excluded.last_active",
+                     (name, datetime.utcnow().isoformat())))
+
+    def _add_concepts(self, name, status, concepts, now):
+        known = self._concept_set(name, status)
+        new = [c for c in dict.fromkeys(concepts) if c not in known]
+        known.update(new)
+        self._queue(*[("INSERT OR IGNORE INTO concepts (player, concept, status, since) VALUES (?, ?, ?, ?)",
+                       (name, c, status, now)) for c in new])
+        return new
+
+    def _concept_set(self, name, status):
+        key = (name, status)
+        known = self._concepts.get(key)
+        if known is None:
+            with self._db_lock:
+                rows = self._db.execute(
+                    "SELECT concept FROM concepts WHERE player = ? AND status = ?", (name, status)).fetchall()
+            # Concepts still queued for this player are already in the cache, so the DB view is enough
+            known = self._concepts.setdefault(key, {r[0] for r in rows})
+        return known
+
+    def _player_lock(self, name):
+        with self._player_locks_lock:
+            return self._player_locks.setdefault(name, threading.Lock())
+
+    def _queue(self, *rows):
+        if not rows:
+            return
+        with self._pending_lock:
+            self._pending.extend(rows)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Commit every queued row in one transaction."""
+        # Taking the DB lock first keeps batches committing in the order they were queued
+        with self._db_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return
+            with self._db:
+                for sql, params in rows:
+                    self._db.execute(sql, params)
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(rows)
+
+    def _write_behind(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"💥 Player store flush failed: {e}")
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+    # --- reads ---
+
+    def load_player(self, name, history_limit=None):
+        """Return the player in the shape of the old JSON files (a new, empty player if unknown).
+
+        history_limit keeps only the most recent entries.
+        """
+        self.flush()
+        with self._db_lock:
+            row = self._db.execute("SELECT last_active FROM players WHERE name = ?", (name,)).fetchone()
+            if history_limit is None:
+                history = self._db.execute(
+                    "SELECT timestamp, game_state, position, concepts FROM history WHERE player = ? ORDER BY id",
+                    (name,)).fetchall()
+            else:
+                history = self._db.execute(
+                    "SELECT timestamp, game_state, position, concepts FROM "
+                    "(SELECT * FROM history WHERE player = ? ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (name, history_limit)).fetchall()
+            concepts = self._db.execute(
+                "SELECT concept, status FROM concepts WHERE player = ? ORDER BY since, rowid", (name,)).fetchall()
+        return {
+            "name": name,
+            "history": [{"timestamp": ts, "game_state": gs, "position": pos, "concepts": json.loads(c)}
+                        for ts, gs, pos, c in history],
+            "mastered_concepts": [c for c, status in concepts if status == MASTERED],
+            "struggled_concepts": [c for c, status in concepts if status == STRUGGLED],
+            "last_active": row[0] if row else None,
+        }
+
+    def player_exists(self, name) -> bool:
+        self.flush()
+        with self._db_lock:
+            return self._db.execute("SELECT 1 FROM players WHERE name = ?", (name,)).fetchone() is not None
+
+    def summary(self) -> dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {**self.stats, "pending_rows": pending, "cached_players": len(self._player_locks)}
+
+    # --- import of the old per-player JSON files ---
+
+    def import_player(self, data) -> bool:
+        """Import one player dict (old JSON format). Players already in the store are skipped."""
+        name = data["name"]
+        if self.player_exists(name):
+            return False
+        with self._db_lock:
+            with self._db:
+                self._db.execute("INSERT INTO players (name, last_active) VALUES (?, ?)",
+                                 (name, data.get("last_active")))
+                self._db.executemany(
+                    "INSERT INTO history (player, timestamp, game_state, position, concepts) VALUES (?, ?, ?, ?, ?)",
+                    [(name, h.get("timestamp") or "", h.get("game_state"), h.get("position"),
+                      json.dumps(h.get("concepts", []))) for h in data.get("history", [])])
+                since = data.get("last_active") or datetime.utcnow().isoformat()
+                for status, key in ((MASTERED, "mastered_concepts"), (STRUGGLED, "struggled_concepts")):
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO concepts (player, concept, status, since) VALUES (?, ?, ?, ?)",
+                        [(name, c, status, since) for c in data.get(key, [])])
+        for status in (MASTERED, STRUGGLED):
+            self._concepts.pop((name, status), None)
+        return True
+
+    def import_json_dir(self, player_dir=DEFAULT_PLAYER_DIR) -> int:
+        """Import every <name>.json player file in a directory; returns how many were imported."""
+        imported = 0
+        for path in sorted(Path(player_dir).glob("*.json")):
+            try:
+                with open(path) as f:
+                    imported += self.import_player(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ Could not import player file {path.name}: {e}")
+        logger.info(f"✅ Imported {imported} players from {player_dir}")
+        return imported
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "import":
+        sys.exit(__doc__)
+    start = time.perf_counter()
+    store = PlayerStore()
+    count = store.import_json_dir(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PLAYER_DIR)
+    store.close()
+    print(f"Imported {count} players into {store.db_path} in {time.perf_counter() - start:.2f}s")
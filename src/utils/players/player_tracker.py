@@ -1,56 +1,57 @@
-import os
-import json
+import threading
 from datetime import datetime
 
+from src.utils.players.player_store import DEFAULT_DB_PATH, DEFAULT_PLAYER_DIR, PlayerStore
 from src.utils.logging.logging import setup_logger
 logger = setup_logger()
 
 logger.info("Initializing player tracker...")
-PLAYER_DIR = "data/players"
-os.makedirs(PLAYER_DIR, exist_ok=True)
+PLAYER_DIR = str(DEFAULT_PLAYER_DIR)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_player_store() -> PlayerStore:
+    """The shared player store, opened on first use.
+
+    A new database is seeded from the old data/players/<name>.json files.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            is_new = not DEFAULT_DB_PATH.exists()
+            _store = PlayerStore(DEFAULT_DB_PATH)
+            if is_new:
+                _store.import_json_dir(DEFAULT_PLAYER_DIR)
+        return _store
+
 
 def load_player(player_name):
-    path = os.path.join(PLAYER_DIR, f"{player_name}.json")
-    if os.path.exists(path):
-        logger.info(f"Loading player data for {player_name} from {path}")
-        with open(path, "r") as f:
-            logger.info("Player data loaded successfully.")
-            return json.load(f)
-    else:
-        logger.warning(f"Player {player_name} not found, creating new player data.")
-        logger.info("Creating new player data for player: {}".format(player_name))
-        return {
-            "name": player_name,
-            "history": [],
-            "mastered_concepts": [],
-            "struggled_concepts": [],
-            "last_active": None,
-        }
+    logger.info(f"Loading player data for {player_name}")
+    return get_player_store().load_player(player_name)
+
 
 def save_player(player_data):
-    logger.info(f"Saving player data for {player_data['name']} to {PLAYER_DIR}")
-    player_data["last_active"] = datetime.utcnow().isoformat()
-    path = os.path.join(PLAYER_DIR, f"{player_data['name']}.json")
-    with open(path, "w") as f:
-        json.dump(player_data, f, indent=2)
-        logger.info("Player data saved successfully.")
+    """History and concepts are stored as they are logged; this only marks the player active."""
+    logger.info(f"Saving player data for {player_data['name']}")
+    get_player_store().touch(player_data["name"])
+
 
 def log_concepts(player_data, game_state, position, concepts):
     logger.info(f"Logging concepts for player {player_data['name']}...")
-    entry = {
-        "timestamp": datetime.utcnow().isoformat(),
+    timestamp = datetime.utcnow().isoformat()
+    new_mastered = get_player_store().log_concepts(player_data["name"], game_state, position, concepts,
+                                                   timestamp=timestamp)
+
+    # Keep the caller's copy in step with what was stored
+    player_data["history"].append({
+        "timestamp": timestamp,
         "game_state": game_state,
         "position": position,
-        "concepts": concepts
-    }
-    player_data["history"].append(entry)
-    logger.info(f"Logged concepts: {entry}")
-
-    # Optional: update mastery/trouble logic
-    for concept in concepts:
-        if concept not in player_data["mastered_concepts"]:
-            player_data["mastered_concepts"].append(concept)
-    logger.info(f"Updated mastered concepts: {player_data['mastered_concepts']}")
-    
-    return player_data
+        "concepts": concepts,
+    })
+    player_data["mastered_concepts"].extend(new_mastered)
+    logger.info(f"Newly mastered concepts: {new_mastered}")
 
+    return player_data
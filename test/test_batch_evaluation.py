@@ -0,0 +1,32 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.server import main  # noqa: E402
+
+PLAY = {"position": "Shortstop", "game_state": "1 out", "recommended_actions": ["Throw to 2nd"],
+        "explanation": "Get the lead runner.", "conversation_history": "", "concepts": ["Force out"]}
+
+
+def test_bad_items_get_their_own_error_and_identical_answers_share_a_call(monkeypatch):
+    calls = []
+
+    async def fake_llm(payload):
+        calls.append(payload["player_answer"])
+        return {"llm_feedback": "[CORRECT] Yes.", "evaluation": "correct"}
+
+    monkeypatch.setattr(main, "evaluate_answer_with_llm_async", fake_llm)
+    monkeypatch.setattr(main, "current_local_grader", lambda: None)
+    items = [{**PLAY, "player_answer": "Second"}, "not an object", {**PLAY, "player_answer": "Second"},
+             {"player_answer": "Home"}, 7]
+    response = TestClient(main.app).post("/evaluate_answers", json=items)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["index"] for r in results] == list(range(5))
+    assert results[0]["evaluation"] == results[2]["evaluation"] == "correct" and calls == ["Second"]
+    assert results[1]["error"] == "Invalid request: expected an object, got str"
+    assert results[4]["error"] == "Invalid request: expected an object, got int"
+    assert "missing" in results[3]["error"]
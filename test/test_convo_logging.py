@@ -0,0 +1,51 @@
+import json
+import threading
+
+from src.utils.logging.convo_logging import ConversationLogWriter, latest_segment, tail_lines
+
+
+def test_segments_rotate_by_size_and_latest_pointer_follows(tmp_path):
+    writer = ConversationLogWriter(tmp_path, max_bytes=200, batch_size=1)
+    for i in range(20):
+        writer.write({"session_id": f"s{i}", "outcome": "correct"})
+    writer.flush()
+
+    segments = sorted(tmp_path.glob("*.jsonl"))
+    assert len(segments) > 1
+    assert latest_segment(tmp_path) == writer.current_segment()
+    records = [json.loads(line) for segment in segments for line in segment.read_text().splitlines()]
+    assert [r["session_id"] for r in records] == [f"s{i}" for i in range(20)]
+    assert json.loads(tail_lines(latest_segment(tmp_path), 1)[0])["session_id"] == "s19"
+    writer.close()
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    writer = ConversationLogWriter(tmp_path, queue_size=1, batch_size=1)
+    busy, release = threading.Event(), threading.Event()
+    write = writer._write
+
+    def slow_write(lines):
+        busy.set()
+        release.wait()
+        write(lines)
+
+    writer._write = slow_write
+    assert writer.write({"n": 0}) is True
+    busy.wait()  # the writer thread holds n=0, so n=1 fills the queue
+    assert writer.write({"n": 1}) is True
+    assert writer.write({"n": 2}) is False
+    assert writer.stats["dropped"] == 1
+    release.set()
+    writer.flush()
+    assert writer.stats["written"] == 2
+    writer.close()
+
+
+def test_writes_after_close_are_dropped_and_flush_returns(tmp_path):
+    writer = ConversationLogWriter(tmp_path)
+    writer.write({"n": 1})
+    writer.close()
+    assert writer.write({"n": 2}) is False
+    assert writer.stats == {"written": 1, "dropped": 1, "segments": 1}
+    writer._queue.put("stray\n")  # as if queued while close() was running
+    writer.flush()  # returns although nothing will write it
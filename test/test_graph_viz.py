@@ -0,0 +1,18 @@
+from benchmarks.synthetic import make_situations
+from src.utils.kg.kg_loader import build_kg_from_situations
+from src.utils.output.graph_viz import GraphRenderer, compute_layout, ego_nodes
+
+
+def test_ego_view_is_capped_laid_out_and_cached():
+    graph = build_kg_from_situations(make_situations(500))
+    layout = compute_layout(graph)
+    assert layout["Shortstop"][0] == 0 and layout["Force out"][0] == 4
+
+    nodes = ego_nodes(graph, ["Shortstop"], hops=2, max_nodes=40)
+    assert nodes[0] == "Shortstop" and len(nodes) == 40
+
+    renderer = GraphRenderer(max_nodes=40)
+    html = renderer.render(graph, ["Shortstop"])
+    assert '"physics": false' in html and "Shortstop" in html
+    assert renderer.render(graph, ["Shortstop"]) is html
+    assert renderer.summary()["hits"] == 1 and renderer.summary()["layouts"] == 1
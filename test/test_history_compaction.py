@@ -0,0 +1,69 @@
+import os
+import threading
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.models.history_compaction import HistoryCompactor, count_tokens, parse_turns  # noqa: E402
+from src.models.llm_socratic import build_evaluation_prompt  # noqa: E402
+
+
+def payload(exchanges):
+    history = "Coach: Where do you throw with a runner on first and one out?\n"
+    for i in range(exchanges):
+        history += f"Player: Maybe base number {i}?\nCoach: Not quite. Think about the force play at second. Which base is closest?\n"
+    return {
+        "position": "Shortstop",
+        "game_state": "1 out, runner on 1st",
+        "concepts": ["Force out"],
+        "conversation_history": history,
+        "player_answer": "Second base",
+        "recommended_actions": ["Throw to 2nd"],
+        "explanation": "Get the lead runner.",
+    }
+
+
+def test_prompt_tokens_stay_flat_as_the_conversation_grows():
+    assert len(parse_turns(payload(2)["conversation_history"])) == 5
+
+    compactor = HistoryCompactor(keep_turns=4, summary_tokens=60, prompt_budget=400)
+    short, _, _ = compactor.build_prompt(payload(1), build_evaluation_prompt)
+    assert short == build_evaluation_prompt(payload(1))
+
+    sizes = []
+    for exchanges in (5, 20, 80):
+        prompt, raw_tokens, prompt_tokens = compactor.build_prompt(payload(exchanges), build_evaluation_prompt)
+        assert prompt_tokens == count_tokens(prompt) <= 400 and prompt_tokens < raw_tokens
+        assert "Where do you throw" in prompt and "Maybe base number %d?" % (exchanges - 1) in prompt
+        sizes.append(prompt_tokens)
+    assert max(sizes) - min(sizes) < 30 and raw_tokens > 5 * max(sizes)
+    assert compactor.summary()["summary_hits"] == 2 and compactor.summary()["cached_sessions"] == 1
+
+
+def test_hard_budget_truncates_when_summarising_is_not_enough():
+    compactor = HistoryCompactor(keep_turns=2, prompt_budget=140)  # 121 with no explanation or history
+    big = {**payload(3), "explanation": "Get the lead runner. " * 100}
+    prompt, _, prompt_tokens = compactor.build_prompt(big, build_evaluation_prompt)
+    assert prompt_tokens <= 140 and "Get the lead runner." in prompt
+    assert compactor.stats["over_budget"] == 1
+    assert prompt.endswith('answer: "Second base"')
+
+    huge = {**payload(30), "explanation": "Get the lead runner before anything else. " * 5000}
+    prompt, raw_tokens, prompt_tokens = compactor.build_prompt(huge, build_evaluation_prompt)
+    assert raw_tokens > 40_000 and prompt_tokens == count_tokens(prompt) <= 140
+    assert prompt.endswith('answer: "Second base"') and "Get the lead runner" in prompt
+
+    # Even with no explanation left the answer alone is too long: the prompt itself is clipped
+    prompt, _, prompt_tokens = compactor.build_prompt({**huge, "player_answer": "second " * 500},
+                                                      build_evaluation_prompt)
+    assert prompt_tokens <= 140 and prompt.endswith("…")
+
+
+def test_stats_count_every_evaluation_across_threads():
+    compactor = HistoryCompactor(keep_turns=2, prompt_budget=400)
+    threads = [threading.Thread(target=lambda: [compactor.build_prompt(payload(6), build_evaluation_prompt)
+                                                for _ in range(50)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert compactor.summary()["evaluations"] == compactor.stats["compacted"] == 400
@@ -0,0 +1,24 @@
+from benchmarks.synthetic import make_situations
+from src.models.socratic_engine import _walk_rich_context, generate_question, get_related_knowledge, get_rich_context
+from src.utils.kg.kg_compact import CompactKG, as_networkx
+from src.utils.kg.kg_loader import build_kg_from_situations
+from src.utils.kg.kg_questiongen import get_random_situation, iter_situations
+
+
+def test_compact_kg_answers_like_the_networkx_graph_and_converts_back():
+    graph = build_kg_from_situations(make_situations(200))
+    compact = CompactKG.from_networkx(graph)
+    assert compact.number_of_nodes() == graph.number_of_nodes()
+    assert compact.number_of_edges() == graph.number_of_edges()
+    assert get_random_situation(compact) in graph.graph["situation_index"]
+
+    for position, game_state in list(iter_situations(compact))[:50]:
+        assert generate_question(position, game_state, compact) == generate_question(position, game_state, graph)
+        assert get_related_knowledge(position, game_state, compact) == get_related_knowledge(position, game_state, graph)
+        assert get_rich_context(position, game_state, compact) == get_rich_context(position, game_state, graph)
+        assert _walk_rich_context(position, game_state, compact) == _walk_rich_context(position, game_state, graph)
+    assert "nowhere" not in compact and compact.nodes.get("nowhere") is None
+
+    back = as_networkx(compact)
+    assert {(u, v): d for u, v, d in back.edges(data=True)} == {(u, v): d for u, v, d in graph.edges(data=True)}
+    assert dict(back.nodes(data=True)) == dict(graph.nodes(data=True))
@@ -0,0 +1,39 @@
+import pytest
+import yaml
+from src.server.kg_holder import KGHolder
+
+SITUATIONS = [
+    {"situation_id": "p_1", "position": "Pitcher", "game_state": "0 outs, bases empty",
+     "play": "Comebacker", "recommended_actions": ["Throw to 1st base"]},
+    {"situation_id": "c_1", "position": "Catcher", "game_state": "2 outs, runner on 3rd",
+     "play": "Passed ball", "recommended_actions": ["Chase the ball"]},
+]
+
+
+def _write(path, situations):
+    path.write_text(yaml.dump(situations, sort_keys=False))
+
+
+def test_reload_diffs_and_swaps_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "situations.yaml"
+    _write(path, SITUATIONS)
+    holder = KGHolder(path, watch_interval=0)
+    holder.reload()
+    first = holder.current
+
+    assert holder.reload() == {"reloaded": False, "version": 1}
+
+    _write(path, [{**SITUATIONS[0], "play": "Bunt"},
+                  {**SITUATIONS[1], "game_state": "1 out, runner on 3rd"}])
+    result = holder.reload()
+    assert result["version"] == 2
+    assert result["diff"] == {"added": 1, "removed": 1, "changed": 1}
+    assert holder.last_diff["changed"] == [("Pitcher", "0 outs, bases empty")]
+    assert first.graph.has_node("Comebacker")  # requests holding the old version still see it whole
+
+    # A broken file leaves the current version serving
+    path.write_text("- position: [unclosed\n")
+    with pytest.raises(ValueError):
+        holder.reload()
+    assert holder.current.version == 2
+    assert holder.summary()["failures"] == 1
@@ -0,0 +1,55 @@
+import yaml
+from src.utils.kg.kg_loader import load_kg_from_yaml
+from src.models.socratic_engine import get_related_knowledge, get_rich_context
+
+SITUATIONS = [
+    {
+        "situation_id": "ss_1",
+        "position": "Shortstop",
+        "game_state": "0 outs, runner on 1st",
+        "play": "Ground ball to Shortstop",
+        "recommended_actions": ["Field the ball", "Throw to 2nd base"],
+        "key_concepts": ["Force out"],
+        "explanation": "Get the lead runner.",
+    },
+    {
+        "situation_id": "cf_1",
+        "position": "Center Field",
+        "game_state": "0 outs, runner on 1st",
+        "play": "Fly ball to Center Field",
+        "recommended_actions": ["Catch the ball", "Throw to 2nd base"],
+        "key_concepts": ["Hit the cutoff"],
+        "explanation": "Keep the runner at 1st.",
+    },
+]
+
+
+def _write_corpus(tmp_path):
+    path = tmp_path / "situations.yaml"
+    path.write_text(yaml.dump(SITUATIONS, sort_keys=False))
+    return path
+
+
+def test_rich_context_uses_position_specific_play(tmp_path):
+    G = load_kg_from_yaml(_write_corpus(tmp_path))
+    context = get_rich_context("Center Field", "0 outs, runner on 1st", G)
+    assert context["play"] == "Fly ball to Center Field"
+    assert [a["action"] for a in context["recommended_actions"]] == ["Catch the ball", "Throw to 2nd base"]
+    assert context["key_concepts"] == ["Hit the cutoff"]
+    assert context["explanation"] == "Keep the runner at 1st."
+
+
+def test_rich_context_unknown_situation_is_empty(tmp_path):
+    G = load_kg_from_yaml(_write_corpus(tmp_path))
+    context = get_rich_context("Pitcher", "0 outs, runner on 1st", G)
+    assert context["play"] is None
+    assert context["recommended_actions"] == []
+
+
+def test_related_knowledge_only_touches_neighbouring_edges(tmp_path):
+    G = load_kg_from_yaml(_write_corpus(tmp_path))
+    facts = get_related_knowledge("Shortstop", "0 outs, runner on 1st", G).split("; ")
+    assert "Shortstop --[hasResponsibilityIn]--> 0 outs, runner on 1st" in facts
+    assert "0 outs, runner on 1st --[triggers]--> Fly ball to Center Field" in facts
+    assert "Center Field --[hasResponsibilityIn]--> 0 outs, runner on 1st" in facts
+    assert not any("Catch the ball" in f for f in facts)
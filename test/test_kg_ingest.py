@@ -0,0 +1,46 @@
+import json
+
+import yaml
+from src.utils.kg.kg_ingest import iter_situation_records, parse_batch
+from src.utils.kg.kg_loader import build_kg_from_records, load_kg_from_file
+
+GOOD = {
+    "situation_id": "c_1",
+    "position": "Catcher",
+    "game_state": "2 outs, runner on 3rd",
+    "play": "Passed ball",
+    "recommended_actions": ["Chase the ball", "Flip to the pitcher covering home"],
+    "key_concepts": ["Covering home"],
+    "explanation": "The pitcher covers home while the catcher retrieves the ball.",
+}
+BAD = [
+    {"situation_id": "no_position", "game_state": "0 outs, bases empty", "play": "Pop up"},
+    {**GOOD, "situation_id": "bad_actions", "recommended_actions": "Throw home"},
+]
+
+
+def test_yaml_and_jsonl_build_the_same_graph_and_report_bad_records(tmp_path):
+    records = [GOOD, BAD[0], {**GOOD, "situation_id": "c_2", "game_state": "1 out, bases empty"}, BAD[1]]
+    records = json.loads(json.dumps(records))  # no shared lists, so yaml.dump writes no aliases
+    yaml_path = tmp_path / "situations.yaml"
+    yaml_path.write_text("# corpus\n" + yaml.dump(records, sort_keys=False))
+    jsonl_path = tmp_path / "situations.jsonl"
+    jsonl_path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    G_yaml, report = build_kg_from_records(iter_situation_records(yaml_path, batch_size=3))
+    G_jsonl = load_kg_from_file(jsonl_path)
+
+    assert set(G_yaml.edges) == set(G_jsonl.edges)
+    assert G_yaml.graph["situation_index"] == G_jsonl.graph["situation_index"]
+    assert (report.records, report.loaded, report.bad_count) == (4, 2, 2)
+    assert [(sid, errors) for _, sid, errors in report.bad] == [
+        ("no_position", ["missing 'position'"]),
+        ("bad_actions", ["'recommended_actions' should be list, got str"]),
+    ]
+
+
+def test_unparseable_item_does_not_sink_its_batch():
+    batch = [(1, "- position: Catcher\n  game_state: a\n  play: b\n"), (4, "- position: [unclosed\n")]
+    (_, good, good_errors), (line, bad, bad_errors) = parse_batch("yaml", batch)
+    assert good["position"] == "Catcher" and good_errors == []
+    assert line == 4 and bad is None and bad_errors[0].startswith("unparseable")
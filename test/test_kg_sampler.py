@@ -0,0 +1,85 @@
+import random
+from collections import Counter
+
+from src.server.play_selector import PlaySelector
+from src.utils.kg.kg_loader import build_kg_from_situations
+from src.utils.kg.kg_questiongen import get_random_situation, iter_situations
+from src.utils.kg.kg_sampler import AdaptiveSampler, AliasTable, FenwickTree, get_situation_sampler
+from src.utils.players.player_store import PlayerStore
+
+
+def situations():
+    records = []
+    for i in range(12):
+        records.append({
+            "situation_id": f"s{i}",
+            "position": "Pitcher" if i < 9 else "Catcher",
+            "game_state": f"state {i}",
+            "play": f"play {i}",
+            "recommended_actions": ["Throw to 1st"],
+            "key_concepts": ["Tag out"] if i == 3 else ["Force out"],
+        })
+    return records
+
+
+def test_alias_and_fenwick_draws_follow_weights():
+    rng = random.Random(1)
+    table = AliasTable([1, 0, 3])
+    counts = Counter(table.draw(rng) for _ in range(20000))
+    assert counts[1] == 0 and 2.7 < counts[2] / counts[0] < 3.3
+
+    tree = FenwickTree([1.0, 1.0, 1.0, 1.0, 1.0])
+    tree[1] = 0.0
+    tree[4] = 6.0
+    assert tree.total() == 9.0
+    counts = Counter(tree.draw(rng) for _ in range(20000))
+    assert counts[1] == 0 and 5.4 < counts[4] / counts[0] < 6.6
+
+
+def test_graph_sampler_draws_known_situations_and_balances_positions():
+    graph = build_kg_from_situations(situations())
+    sampler = get_situation_sampler(graph)
+    assert set(sampler.situations) == set(iter_situations(graph))
+    assert get_random_situation(graph) in sampler.situations
+
+    rng = random.Random(2)
+    positions = Counter(sampler.situations[sampler.weighted(sampler.balanced_table(), rng)][0] for _ in range(10000))
+    assert 0.9 < positions["Catcher"] / positions["Pitcher"] < 1.1  # 3 vs 9 situations, equal chance
+
+
+def test_adaptive_sampler_favours_struggled_concepts_and_never_repeats_in_a_game():
+    sampler = get_situation_sampler(build_kg_from_situations(situations()))
+    tag_out = sampler.ids[("Pitcher", "state 3")]
+    rng = random.Random(3)
+
+    adaptive = AdaptiveSampler(sampler, struggled=["Tag out"])
+    assert Counter(adaptive.draw(rng) for _ in range(2000))[tag_out] > 1000
+    adaptive.record(tag_out, correct=True)
+    adaptive.record(tag_out, correct=True)
+    assert Counter(adaptive.draw(rng) for _ in range(2000))[tag_out] < 1000
+
+    selector = PlaySelector()
+    picks = [selector.pick(sampler, mode=mode, game_id="g1", rng=rng) for mode in ["uniform", "balanced"] * 6]
+    assert len(set(picks)) == len(sampler)
+    picks = [selector.pick(sampler, player="alex", game_id="g2", rng=rng) for _ in range(len(sampler))]
+    assert len(set(picks)) == len(sampler)
+    assert selector.pick(sampler, rng=rng) in sampler.situations  # no game to avoid repeats in
+
+
+def test_struggled_answers_in_the_player_store_seed_a_new_selector(tmp_path):
+    sampler = get_situation_sampler(build_kg_from_situations(situations()))
+    tag_out = ("Pitcher", "state 3")
+    store = PlayerStore(tmp_path / "players.db")
+    store.log_result("alex", "state 3", "Pitcher", ["Tag out"], correct=False)
+    store.log_result("alex", "state 0", "Pitcher", ["Force out"], correct=True)
+
+    def load_profile(name):
+        player = store.load_player(name, history_limit=20)
+        return player["struggled_concepts"], [(h["position"], h["game_state"]) for h in player["history"]]
+
+    assert store.load_player("alex")["struggled_concepts"] == ["Tag out"]
+    selector = PlaySelector(load_profile=load_profile)  # as after a restart: no sampler in memory yet
+    rng = random.Random(5)
+    picks = Counter(selector.pick(sampler, player="alex", rng=rng) for _ in range(600))
+    assert picks[tag_out] > 200  # 1 in 12 without the profile
+    store.close()
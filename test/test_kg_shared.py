@@ -0,0 +1,37 @@
+from benchmarks.synthetic import make_situations, write_situations
+from src.models.socratic_engine import generate_question, get_rich_context
+from src.server.kg_holder import KGHolder
+from src.utils.kg.kg_index import get_situation_index, get_situation_questions
+from src.utils.kg.kg_questiongen import get_random_situation
+from src.utils.kg.kg_shared import read_pointer
+from src.utils.kg.kg_snapshot import load_kg
+from src.utils.output.graph_viz import compute_layout
+
+
+def test_workers_map_one_published_file_and_follow_new_versions(tmp_path):
+    source = write_situations(make_situations(150), tmp_path / "situations.yaml")
+    shared_dir = tmp_path / "shared"
+    graph = load_kg(source, use_snapshot=False)
+    first, second = KGHolder(source, watch_interval=0, shared_dir=shared_dir), \
+        KGHolder(source, watch_interval=0, shared_dir=shared_dir)
+    first.reload()
+    second.reload()  # finds it already published
+    assert first.current.shared_file == second.current.shared_file == read_pointer(shared_dir)["file"]
+    assert len(list(shared_dir.glob("*.kgmap"))) == 1
+
+    kg = second.current.graph
+    index = get_situation_index(graph)
+    assert dict(get_situation_index(kg).items()) == dict(index)
+    for key in list(index)[:40]:
+        assert get_situation_questions(kg).get(key) == generate_question(*key, graph)
+        assert get_rich_context(*key, kg) == get_rich_context(*key, graph)
+    assert get_situation_questions(kg).get(("Nobody", "never")) is None
+    assert get_random_situation(kg) in index
+    assert dict(kg.graph["layout"]) == compute_layout(graph)
+
+    # A new source file is published once; the other worker maps it on its next check
+    write_situations(make_situations(160), source)
+    assert first.reload()["reloaded"] and read_pointer(shared_dir)["version"] == 2
+    assert second.reload()["reloaded"] and second.current.shared_file == first.current.shared_file
+    assert len(get_situation_index(second.current.graph)) == len(get_situation_index(load_kg(source, use_snapshot=False)))
+    assert first.reload() == {"reloaded": False, "version": 2}
@@ -0,0 +1,27 @@
+import yaml
+from src.models.socratic_engine import get_rich_context
+from src.utils.kg.kg_snapshot import load_kg, snapshot_path_for
+
+SITUATION = {
+    "situation_id": "p_1",
+    "position": "Pitcher",
+    "game_state": "1 out, runner on 3rd",
+    "play": "Comebacker to the mound",
+    "recommended_actions": ["Look the runner back", "Throw to 1st base"],
+    "key_concepts": ["Holding the runner"],
+    "explanation": "Freeze the runner before taking the sure out.",
+}
+
+
+def test_snapshot_is_written_reused_and_invalidated(tmp_path):
+    path = tmp_path / "situations.yaml"
+    path.write_text(yaml.dump([SITUATION], sort_keys=False))
+
+    G = load_kg(path)
+    assert snapshot_path_for(path).exists()
+    assert get_rich_context("Pitcher", "1 out, runner on 3rd", load_kg(path)) == \
+        get_rich_context("Pitcher", "1 out, runner on 3rd", G)
+
+    # Editing the YAML changes its hash, so the stale snapshot must not be used
+    path.write_text(yaml.dump([{**SITUATION, "play": "Bunt back to the mound"}], sort_keys=False))
+    assert get_rich_context("Pitcher", "1 out, runner on 3rd", load_kg(path))["play"] == "Bunt back to the mound"
@@ -0,0 +1,64 @@
+from src.models.llm_cache import LLMResponseCache
+
+
+def _cache(tmp_path, **kwargs):
+    return LLMResponseCache(db_path=tmp_path / "cache.sqlite", **kwargs)
+
+
+def test_collects_variants_then_serves_them_and_refreshes(tmp_path):
+    cache = _cache(tmp_path, variants=2, refresh_after=3)
+    key = cache.make_key("gpt-3.5-turbo", 0.7, "system", "user")
+
+    assert cache.get(key) is None
+    cache.put(key, "q1")
+    assert cache.get(key) is None  # still collecting variants
+    cache.put(key, "q2")
+
+    assert [cache.get(key) for _ in range(3)] == ["q1", "q2", "q1"]
+    assert cache.get(key) is None  # refresh after 3 hits
+    cache.put(key, "q3")
+    assert {cache.get(key), cache.get(key)} == {"q2", "q3"}
+
+    stats = cache.summary()
+    assert stats["memory_hits"] == 5
+    assert stats["misses"] == 3
+    assert stats["refreshes"] == 1
+
+
+def test_disk_tier_survives_restart_and_ttl_expires(tmp_path):
+    cache = _cache(tmp_path, variants=1, refresh_after=0)
+    key = cache.make_key("gpt-3.5-turbo", 0.7, "system", "user")
+    cache.put(key, "question")
+
+    reopened = _cache(tmp_path, variants=1, refresh_after=0)
+    assert reopened.get(key) == "question"
+    assert reopened.summary()["disk_hits"] == 1
+
+    expired = _cache(tmp_path, variants=1, refresh_after=0, ttl_seconds=0)
+    assert expired.get(key) is None
+
+
+def test_memory_tier_is_lru_bounded(tmp_path):
+    cache = LLMResponseCache(db_path=None, variants=1, refresh_after=0, max_memory_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, k.upper())
+    assert cache.get("a") is None
+    assert cache.get("c") == "C"
+
+
+def test_disk_reads_batch_access_times_and_async_lookups_work(tmp_path):
+    import asyncio
+    import sqlite3
+
+    cache = _cache(tmp_path, variants=1, refresh_after=0)
+    key = cache.make_key("gpt-3.5-turbo", 0.7, "system", "user")
+    asyncio.run(cache.aput(key, "question"))
+
+    reopened = _cache(tmp_path, variants=1, refresh_after=0)
+    accessed = lambda: sqlite3.connect(tmp_path / "cache.sqlite").execute(  # noqa: E731
+        "SELECT accessed_at FROM llm_cache WHERE key = ?", (key,)).fetchone()[0]
+    before = accessed()
+    assert asyncio.run(reopened.aget(key)) == "question"
+    assert accessed() == before  # a read doesn't commit
+    reopened.put("other", "answer")
+    assert accessed() > before
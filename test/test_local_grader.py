@@ -0,0 +1,34 @@
+from src.models.evaluate_answers import LocalGrader
+
+ACTIONS = [
+    ["Catch the ball and throw to 1st base"],
+    ["Field the ball and throw to 3rd base"],
+    ["Catch the ball and throw to home plate"],
+    ["Field the ball", "Throw to 2nd base"],
+]
+
+
+def test_clear_match_is_graded_locally():
+    grader = LocalGrader.from_actions(ACTIONS)
+    result = grader.grade("I'd catch the ball and throw to first base!", ACTIONS[0])
+    assert result["is_correct"]
+    assert result["best_match"] == ACTIONS[0][0]
+
+
+def test_uncertain_answers_are_escalated():
+    grader = LocalGrader.from_actions(ACTIONS)
+    assert not grader.grade("Catch the ball and throw to home plate", ACTIONS[0])["is_correct"]
+    assert not grader.grade("Don't catch the ball and throw to 1st base", ACTIONS[0])["is_correct"]
+    # Covering only one of several actions is not enough
+    assert not grader.grade("throw to second base", ACTIONS[3])["is_correct"]
+    assert grader.summary()["escalated"] == 3
+
+
+def test_contradicting_hedged_and_scrambled_answers_are_escalated():
+    grader = LocalGrader.from_actions(ACTIONS)
+    for answer in ("catch the ball and throw to 2nd base instead of 1st base",
+                   "catch the ball and throw to second base, third base, home, or first base",
+                   "ball base throw catch first",
+                   "catch the ball and throw to 1st base, then sprint to the dugout and sit down"):
+        assert not grader.grade(answer, ACTIONS[0])["is_correct"], answer
+    assert grader.score("ball base throw catch first", ACTIONS[0])[0] < grader.threshold
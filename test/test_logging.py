@@ -0,0 +1,33 @@
+import json
+import logging
+import queue
+
+from src.utils.logging.logging import (DeferredQueueHandler, JsonFormatter, RequestIdFilter, request_id_var,
+                                       resolve_log_level)
+
+
+def test_records_carry_request_id_and_format_as_json():
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    logger = logging.getLogger("test.structured")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    payload = {"answer": "throw home"}
+    token = request_id_var.set("req-1")
+    try:
+        logger.warning("Payload: %s", payload)
+    finally:
+        request_id_var.reset(token)
+    payload["answer"] = "changed later"  # the message was fixed when it was logged
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert entry["msg"] == "Payload: {'answer': 'throw home'}"
+    assert (entry["level"], entry["request_id"]) == ("WARNING", "req-1")
+
+
+def test_log_level_names_resolve_case_insensitively_and_unknown_ones_to_none():
+    assert resolve_log_level("debug") == logging.DEBUG
+    assert resolve_log_level("WARNING") == logging.WARNING
+    assert resolve_log_level("verbose") is None  # setup_logger falls back to INFO
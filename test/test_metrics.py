@@ -0,0 +1,52 @@
+import pytest
+
+from src.utils.metrics.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_counter_gauge_and_histogram_render():
+    registry = MetricsRegistry()
+    tokens = Counter("tokens_total", "Tokens.", labelnames=("model", "kind"), registry=registry)
+    in_flight = Gauge("in_flight", "Calls in flight.", registry=registry)
+    size = Gauge("size", "Graph size.", registry=registry)
+    latency = Histogram("stage_seconds", "Stage time.", labelnames=("stage",), buckets=(0.1, 1.0), registry=registry)
+
+    tokens.labels("gpt", "prompt").inc(90)
+    tokens.labels("gpt", "prompt").inc(10)
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    size.set_function(lambda: 42)
+    with latency.labels("llm").time():
+        pass
+    with pytest.raises(ValueError):
+        tokens.labels("gpt", "prompt").inc(-1)
+
+    text = registry.render()
+    assert "# TYPE tokens_total counter" in text
+    assert 'tokens_total{model="gpt",kind="prompt"} 100.0' in text
+    assert "in_flight 1.0" in text
+    assert "size 42" in text
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'stage_seconds_count{stage="llm"} 1' in text
+
+
+def test_request_endpoint_label_is_the_route_template():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.server.request_context import RequestMetricsMiddleware
+    from src.utils.metrics.metrics import REGISTRY, endpoint_var
+
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/items/{item_id:int}")
+    def item(item_id: int):
+        return {"endpoint": endpoint_var.get()}
+
+    client = TestClient(app)
+    assert client.get("/items/7").json() == {"endpoint": "/items/{item_id}"}
+    assert client.get("/items/8").status_code == 200 and client.get("/nowhere").status_code == 404
+    rendered = REGISTRY.render()
+    assert 'http_request_seconds_count{method="GET",endpoint="/items/{item_id}",status="200"} 2' in rendered
+    assert 'endpoint="unmatched",status="404"' in rendered
@@ -0,0 +1,50 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.models import llm_playbook_gen  # noqa: E402
+
+TEMPLATE = "Situations for {position}, batch {chunk} of {chunks}"
+
+
+def _reply(prompt):
+    position = prompt.split(" for ")[1].split(",")[0]
+    return f'- situation_id: s\n  position: "{position}"\n  game_state: "{prompt}"\n'
+
+
+def test_resumes_from_checkpoint_and_retries_bad_replies(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    calls = []
+
+    def flaky(prompt):
+        calls.append(prompt)
+        if prompt.startswith("Situations for Pitcher") and calls.count(prompt) == 1:
+            return "Sorry, I can't help with that."
+        return _reply(prompt)
+
+    monkeypatch.setattr(llm_playbook_gen, "call_gpt_for_situations", flaky)
+    monkeypatch.setattr(llm_playbook_gen.time, "sleep", lambda s: None)
+
+    first = llm_playbook_gen.batch_generate_situations(
+        ["Catcher"], TEMPLATE, chunks_per_position=2, rate_per_second=100, checkpoint_path=checkpoint)
+    assert [s["game_state"] for s in first] == [
+        "Situations for Catcher, batch 1 of 2", "Situations for Catcher, batch 2 of 2"]
+
+    # Simulate a crash mid-write, then resume with another position added
+    with open(checkpoint, "a") as f:
+        f.write('{"position": "Pitch')
+    calls.clear()
+    second = llm_playbook_gen.batch_generate_situations(
+        ["Catcher", "Pitcher"], TEMPLATE, chunks_per_position=2, rate_per_second=100, checkpoint_path=checkpoint)
+
+    assert all(c.startswith("Situations for Pitcher") for c in calls)  # Catcher came from the checkpoint
+    assert len(calls) == 4  # each Pitcher chunk retried once after an unparseable reply
+    assert [s["position"] for s in second] == ["Catcher", "Catcher", "Pitcher", "Pitcher"]
+    assert len(llm_playbook_gen.load_checkpoint(checkpoint)) == 4
+
+    # A changed prompt template must not reuse the checkpointed situations
+    calls.clear()
+    llm_playbook_gen.batch_generate_situations(
+        ["Catcher"], "Tricky situations for {position}, batch {chunk} of {chunks}", chunks_per_position=2,
+        rate_per_second=100, checkpoint_path=checkpoint)
+    assert len(calls) == 2
@@ -0,0 +1,47 @@
+import json
+import threading
+
+from src.utils.players.player_store import PlayerStore
+
+
+def test_history_is_appended_and_concepts_are_sets(tmp_path):
+    store = PlayerStore(tmp_path / "players.sqlite", flush_interval=60)
+    assert store.log_concepts("Ava", "0 outs, runner on 1st", "Shortstop", ["Force out", "Double play"]) == \
+        ["Force out", "Double play"]
+    assert store.log_concepts("Ava", "1 out, bases empty", "Shortstop", ["Force out", "Tag out"]) == ["Tag out"]
+
+    player = store.load_player("Ava")  # reads flush the write-behind queue first
+    assert [h["game_state"] for h in player["history"]] == ["0 outs, runner on 1st", "1 out, bases empty"]
+    assert player["mastered_concepts"] == ["Force out", "Double play", "Tag out"]
+    assert store.load_player("Ava", history_limit=1)["history"][0]["game_state"] == "1 out, bases empty"
+    store.close()
+
+    reopened = PlayerStore(tmp_path / "players.sqlite")
+    assert reopened.log_concepts("Ava", "2 outs", "Pitcher", ["Tag out"]) == []
+    reopened.close()
+
+
+def test_concurrent_answers_for_one_player_are_all_kept(tmp_path):
+    store = PlayerStore(tmp_path / "players.sqlite", batch_size=7)
+    threads = [threading.Thread(target=lambda i=i: [store.log_concepts("Ben", f"state {i}", "Catcher", [f"c{j % 5}"])
+                                                    for j in range(50)]) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    player = store.load_player("Ben")
+    assert len(player["history"]) == 200
+    assert sorted(player["mastered_concepts"]) == [f"c{j}" for j in range(5)]
+    store.close()
+
+
+def test_imports_old_json_files_once(tmp_path):
+    old = {"name": "Cy", "history": [{"timestamp": "2025-04-10T02:04:36", "game_state": "g", "position": "p",
+                                      "concepts": ["Backing up"]}],
+           "mastered_concepts": ["Backing up"], "struggled_concepts": [], "last_active": "2025-04-10T02:04:36"}
+    (tmp_path / "Cy.json").write_text(json.dumps(old))
+    store = PlayerStore(tmp_path / "players.sqlite")
+    assert store.import_json_dir(tmp_path) == 1
+    assert store.import_json_dir(tmp_path) == 0
+    assert store.load_player("Cy") == old
+    store.close()
@@ -0,0 +1,49 @@
+import time
+
+from src.server.play_selector import PlaySelector
+from src.server.session_store import SessionStore
+from src.utils.kg.kg_sampler import SituationSampler
+
+CONTEXT = {"recommended_actions": [{"action": "Throw to 2nd"}], "explanation": "Get the lead runner.",
+           "key_concepts": ["Force out"]}
+
+
+def test_sessions_expire_and_lru_evict_in_memory():
+    store = SessionStore(ttl_seconds=60, max_sessions=2)
+    first = store.create("Shortstop", "1 out", CONTEXT, "Where do you throw?")
+    second = store.create("Pitcher", "0 outs", CONTEXT, "Who covers first?")
+    assert store.get(first.session_id) is first
+    store.create("Catcher", "2 outs", CONTEXT, "Where is the play?")  # evicts `second`
+    assert store.get(second.session_id) is None and store.summary()["evicted"] == 1
+
+    first.last_used = time.time() - 61
+    assert store.get(first.session_id) is None
+    assert store.stats["expired"] == 1 and store.stats["misses"] == 1
+
+
+def test_workers_sharing_a_database_see_each_others_sessions_and_plays(tmp_path):
+    db = tmp_path / "sessions.sqlite"
+    worker_a, worker_b = SessionStore(ttl_seconds=60, db_path=db), SessionStore(ttl_seconds=60, db_path=db)
+    session = worker_a.create("Shortstop", "1 out", CONTEXT, "Where do you throw?", player_name="alex")
+
+    on_b = worker_b.get(session.session_id)  # the answer lands on the other worker
+    worker_b.add_turn(on_b, "First base", "Which runner is forced?")
+    payload = worker_a.get(session.session_id).payload("Second base")
+    assert payload["conversation_history"] == "Coach: Where do you throw?\nPlayer: First base\nCoach: Which runner is forced?\n"
+    assert payload["recommended_actions"] == ["Throw to 2nd"] and on_b.player_name == "alex"
+    assert worker_a.get("nope") is None and worker_a.stats["misses"] == 1
+    assert worker_a._db.total_changes == 1  # the miss wrote nothing
+
+    # Two answers to the same session, each graded from the copy its worker read
+    first, second = worker_a.get(session.session_id), worker_b.get(session.session_id)
+    worker_a.add_turn(first, "Second base", "Right!")
+    worker_b.add_turn(second, "Home", "Too late there.")
+    history = worker_a.get(session.session_id).conversation_history
+    assert history.endswith("Player: Second base\nCoach: Right!\nPlayer: Home\nCoach: Too late there.\n")
+    assert second.conversation_history == history
+
+    # No situation repeats within a game, whichever worker picks it
+    sampler = SituationSampler([("Pitcher", f"{outs} outs") for outs in range(6)])
+    selectors = [PlaySelector(shared_games=worker_a), PlaySelector(shared_games=worker_b)]
+    picks = [selectors[n % 2].pick(sampler, game_id="g1") for n in range(6)]
+    assert sorted(picks) == sorted(sampler.situations)